@@ -19,3 +19,5 @@ ZOOM_STEP = 1.1
 ZOOM_MIN = 1.0
 ZOOM_MAX = 10.0
 POSITION_EPSILON = 1e-6  # Small threshold for position changes
+DEFAULT_LIKELIHOOD_THRESHOLD = 0.6  # matches DeepLabCut's default pcutoff
+LIKELIHOOD_THRESHOLD_STEP = 0.05
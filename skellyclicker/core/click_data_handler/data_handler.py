@@ -1,22 +1,74 @@
 import json
 import logging
 from pathlib import Path
+from typing import Literal
 
 import numpy as np
 import pandas as pd
 from pydantic import BaseModel, ConfigDict
 
-from skellyclicker import VideoNameString, PointNameString
+from skellyclicker import VideoNameString, PointNameString, DEFAULT_LIKELIHOOD_THRESHOLD
 from skellyclicker.core.video_handler.video_models import ClickData, VideoPlaybackState, VideoMetadata, \
     VideoScalingParameters
 
 logger = logging.getLogger(__name__)
 
+SKELLYCLICKER_METADATA_FILE_NAME = "skellyclicker_metadata.json"
+LIKELIHOOD_SUFFIX = "_likelihood"
+INTERPOLATED_SUFFIX = "_interpolated"
+MAX_EDIT_HISTORY = 20
+# key of the (video, frame) indexed labels table in skellyclicker's .h5 label files
+LABELS_H5_KEY = "labels"
+
+InterpolationMethod = Literal["linear", "cubic", "spline"]
+# fewest keyframes a point needs for each method, points with fewer keyframes fall back to linear
+MIN_KEYFRAMES_FOR_INTERPOLATION = {"linear": 2, "cubic": 4, "spline": 4}
+
+
+def interpolated_flags_path(labels_path: str | Path) -> Path:
+    """Sidecar file next to a labels csv that records which labels were filled in by interpolation."""
+    labels_path = Path(labels_path)
+    return labels_path.with_name(f"{labels_path.stem}{INTERPOLATED_SUFFIX}.csv")
+
+
+def load_interpolated_flags(labels_path: str | Path) -> pd.DataFrame | None:
+    """Load the interpolated flags saved next to a labels csv: (video, frame) rows, bool columns per point."""
+    flags_path = interpolated_flags_path(labels_path)
+    if not flags_path.is_file():
+        return None
+    flags = pd.read_csv(flags_path)
+    flags["video"] = flags["video"].astype(str)
+    return flags.set_index(["video", "frame"]).astype(bool)
+
+
+def load_connections_for_labels(labels_path: str | Path) -> list[tuple[str, str]]:
+    """Read skeleton connections from the skellyclicker metadata saved next to a labels file, if there is one."""
+    metadata_path = Path(labels_path).parent / SKELLYCLICKER_METADATA_FILE_NAME
+    if not metadata_path.is_file():
+        return []
+    with open(metadata_path) as file:
+        metadata = json.load(file)
+    return [
+        (connection["parent"], connection["child"])
+        for connection in metadata.get("connections", [])
+    ]
+
+
+def load_connections_from_json(json_path: str | Path) -> list[tuple[str, str]]:
+    """Read skeleton connections from the "connections" list of a tracked points json, if it has one."""
+    json_path = Path(json_path)
+    if not json_path.is_file():
+        return []
+    with open(json_path) as file:
+        config = json.load(file)
+    return [tuple(connection) for connection in config.get("connections", [])]
+
 
 class DataHandlerConfig(BaseModel):
     num_frames: int
     video_names: list[str]
     tracked_point_names: list[str]
+    connections: list[tuple[str, str]] = []
 
     @classmethod
     def from_config_file(cls, videos: dict[VideoNameString, VideoPlaybackState], config_path: str):
@@ -29,13 +81,16 @@ class DataHandlerConfig(BaseModel):
             num_frames=next(iter(videos.values())).metadata.frame_count,
             video_names=sorted([video.name for video in videos.values()]),
             tracked_point_names=tracked_point_names,
+            connections=[tuple(connection) for connection in config.get("connections", [])],
         )
 
     @classmethod
-    def from_dataframe(cls, dataframe: pd.DataFrame):
+    def from_dataframe(cls, dataframe: pd.DataFrame, connections: list[tuple[str, str]] | None = None):
         tracked_point_names = []
         seen = set()
         for name in dataframe.columns:
+            if name.endswith(LIKELIHOOD_SUFFIX):
+                continue
             name = name.removesuffix("_x").removesuffix("_y")
             if name not in seen:
                 seen.add(name)
@@ -46,10 +101,19 @@ class DataHandlerConfig(BaseModel):
             num_frames=dataframe.index.get_level_values("frame").max(),
             video_names=sorted(dataframe.index.get_level_values("video").unique().tolist()),
             tracked_point_names=tracked_point_names,
+            connections=connections or [],
         )
 
 
 
+class LabelEdit(BaseModel):
+    """Values overwritten by a bulk edit, kept so the edit can be undone."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+    rows: pd.MultiIndex
+    columns: list[str]
+    previous_values: np.ndarray
+    previous_interpolated: np.ndarray | None = None
 
 
 class DataHandler(BaseModel):
@@ -58,6 +122,18 @@ class DataHandler(BaseModel):
     dataframe: pd.DataFrame
     active_point: PointNameString
 
+    # Machine labels only: per-point likelihoods (float16, columns are point names) and the coordinates before
+    # thresholding. `dataframe` holds the thresholded coordinates, so readers never see low-confidence points.
+    likelihoods: pd.DataFrame | None = None
+    unthresholded_dataframe: pd.DataFrame | None = None
+    likelihood_threshold: float = 0.0
+
+    # Human labels only: True where a point was filled in by `interpolate_labels` rather than clicked
+    # (bool, columns are point names). Created on first interpolation, saved as a sidecar next to the labels csv.
+    interpolated: pd.DataFrame | None = None
+
+    edit_history: list[LabelEdit] = []
+
     @classmethod
     def from_config(cls, config: DataHandlerConfig):
         dataframe = cls._create_dataframe(config)
@@ -68,16 +144,84 @@ class DataHandler(BaseModel):
         )
 
     @classmethod
-    def from_csv(cls, input_path: str | Path):
+    def from_file(cls, input_path: str | Path, likelihood_threshold: float = DEFAULT_LIKELIHOOD_THRESHOLD):
+        """Load labels from a .csv or a frame-indexed .h5 file."""
+        if Path(input_path).suffix == ".h5":
+            return cls.from_h5(input_path, likelihood_threshold=likelihood_threshold)
+        return cls.from_csv(input_path, likelihood_threshold=likelihood_threshold)
+
+    @classmethod
+    def from_csv(
+        cls,
+        input_path: str | Path,
+        likelihood_threshold: float = DEFAULT_LIKELIHOOD_THRESHOLD,
+        connections: list[tuple[str, str]] | None = None,
+    ):
+        """Load labels from a csv. Without `connections`, they are read from the metadata next to it, if any."""
         dataframe = pd.read_csv(input_path)
         dataframe["video"] = dataframe["video"].astype(str)
         dataframe = dataframe.set_index(["video", "frame"])
+        return cls._from_labels_dataframe(dataframe, input_path, likelihood_threshold, connections)
 
-        config = DataHandlerConfig.from_dataframe(dataframe)
-        return cls(
+    @classmethod
+    def from_h5(cls, input_path: str | Path, likelihood_threshold: float = DEFAULT_LIKELIHOOD_THRESHOLD):
+        """Load labels from an .h5 file, e.g. machine labels written by `merge_dlc_outputs`. Values stay typed."""
+        dataframe = pd.read_hdf(input_path, key=LABELS_H5_KEY)
+        return cls._from_labels_dataframe(dataframe, input_path, likelihood_threshold)
+
+    @classmethod
+    def _from_labels_dataframe(
+        cls,
+        dataframe: pd.DataFrame,
+        input_path: str | Path,
+        likelihood_threshold: float,
+        connections: list[tuple[str, str]] | None = None,
+    ):
+        likelihood_columns = [name for name in dataframe.columns if name.endswith(LIKELIHOOD_SUFFIX)]
+        likelihoods = None
+        if likelihood_columns:
+            likelihoods = dataframe[likelihood_columns].astype(np.float16)
+            likelihoods.columns = [name.removesuffix(LIKELIHOOD_SUFFIX) for name in likelihood_columns]
+            dataframe = dataframe.drop(columns=likelihood_columns)
+
+        if connections is None:
+            connections = load_connections_for_labels(input_path)
+        config = DataHandlerConfig.from_dataframe(dataframe, connections=connections)
+        data_handler = cls(
             config=config,
             dataframe=dataframe,
             active_point=config.tracked_point_names[0],
+            likelihoods=likelihoods,
+        )
+        if likelihoods is not None:
+            data_handler.set_likelihood_threshold(likelihood_threshold)
+
+        interpolated = load_interpolated_flags(input_path)
+        if interpolated is not None:
+            data_handler.interpolated = interpolated.reindex(
+                index=dataframe.index, columns=config.tracked_point_names, fill_value=False
+            )
+        return data_handler
+
+    def set_likelihood_threshold(self, likelihood_threshold: float):
+        """Hide points below `likelihood_threshold` with one vectorized mask over the unthresholded coordinates."""
+        if self.likelihoods is None:
+            logger.warning("No likelihoods loaded, ignoring likelihood threshold")
+            return
+        if self.unthresholded_dataframe is None:
+            column_names = [
+                f"{point_name}_{axis}" for point_name in self.config.tracked_point_names for axis in ("x", "y")
+            ]
+            self.unthresholded_dataframe = self.dataframe.reindex(columns=column_names)
+
+        self.likelihood_threshold = float(np.clip(likelihood_threshold, 0.0, 1.0))
+        likelihoods = self.likelihoods.reindex(columns=self.config.tracked_point_names).to_numpy()
+        # NaN likelihoods compare False, so missing predictions stay hidden
+        confident = np.repeat(likelihoods >= self.likelihood_threshold, 2, axis=1)
+        self.dataframe = self.unthresholded_dataframe.where(confident)
+        logger.debug(
+            f"Likelihood threshold set to {self.likelihood_threshold:.2f}, "
+            f"hiding {np.count_nonzero(~confident) // 2} of {confident.size // 2} points"
         )
 
     @staticmethod
@@ -132,6 +276,225 @@ class DataHandler(BaseModel):
         self.dataframe.loc[
             (video_name, click_data.frame_number), f"{point_name}_y"
         ] = click_data.y
+        self._clear_interpolated_flag(video_name, click_data.frame_number, point_name)
+
+    def adopt_labels(
+        self,
+        source: "DataHandler",
+        frame_numbers: list[int] | range,
+        video_indices: list[int] | None = None,
+        point_names: list[str] | None = None,
+        likelihood_threshold: float | None = None,
+    ) -> int:
+        """Copy labels from `source` (e.g. machine labels) for a block of frames, videos and points.
+
+        Videos are matched by index, like the single frame copy. Points that are missing in `source`, or below
+        `likelihood_threshold` when given, keep their current values. The block is written with a single array
+        assignment and recorded in `edit_history` so it can be undone. Returns the number of points copied.
+        """
+        if video_indices is None:
+            video_indices = list(range(len(self.config.video_names)))
+        if point_names is None:
+            point_names = self.config.tracked_point_names
+        point_names = [name for name in point_names if name in source.config.tracked_point_names]
+        if not point_names or not video_indices or len(frame_numbers) == 0:
+            return 0
+        column_names = [f"{point_name}_{axis}" for point_name in point_names for axis in ("x", "y")]
+
+        target_rows = pd.MultiIndex.from_product(
+            [[self.config.video_names[index] for index in video_indices], frame_numbers],
+            names=["video", "frame"],
+        )
+        source_rows = pd.MultiIndex.from_product(
+            [[source.config.video_names[index] for index in video_indices], frame_numbers],
+            names=["video", "frame"],
+        )
+        in_target = target_rows.isin(self.dataframe.index)
+        target_rows = target_rows[in_target]
+        source_rows = source_rows[in_target]
+
+        if likelihood_threshold is not None and source.likelihoods is not None:
+            source_dataframe = source.unthresholded_dataframe
+        else:
+            source_dataframe = source.dataframe
+        # TODO: There is some error in the DLC machine labels that sometimes returns duplicate data, this pulls the first occurence for each row
+        unique_rows = ~source_dataframe.index.duplicated(keep="first")
+        source_values = (
+            source_dataframe[unique_rows].reindex(index=source_rows, columns=column_names).to_numpy(dtype=float)
+        )
+        if likelihood_threshold is not None and source.likelihoods is not None:
+            likelihoods = (
+                source.likelihoods[unique_rows].reindex(index=source_rows, columns=point_names).to_numpy(dtype=float)
+            )
+            source_values[np.repeat(~(likelihoods >= likelihood_threshold), 2, axis=1)] = np.nan
+
+        current_values = self.dataframe.loc[target_rows, column_names].to_numpy(dtype=float)
+        copy_mask = np.repeat(~np.isnan(source_values).reshape(-1, len(point_names), 2).any(axis=2), 2, axis=1)
+        self._write_labels(
+            rows=target_rows,
+            point_names=point_names,
+            values=np.where(copy_mask, source_values, current_values),
+            interpolated=np.zeros((len(target_rows), len(point_names)), dtype=bool),
+            changed=copy_mask[:, ::2],
+        )
+
+        points_copied = int(np.count_nonzero(copy_mask)) // 2
+        logger.info(
+            f"Copied {points_copied} points across {len(frame_numbers)} frames and {len(video_indices)} videos"
+        )
+        return points_copied
+
+    def interpolate_labels(
+        self,
+        method: InterpolationMethod = "linear",
+        point_names: list[str] | None = None,
+        video_indices: list[int] | None = None,
+        start_frame: int = 0,
+        end_frame: int | None = None,
+        max_gap: int | None = None,
+    ) -> int:
+        """Fill unlabeled frames between labeled keyframes within [start_frame, end_frame).
+
+        All selected videos and points are interpolated together as one (frames, videos * points * 2) array.
+        Only gaps with a keyframe on both sides (and at most `max_gap` frames long, if given) are filled, existing
+        labels are never changed. Filled points are flagged in `interpolated` and the edit can be undone.
+        Returns the number of points filled.
+        """
+        if method not in MIN_KEYFRAMES_FOR_INTERPOLATION:
+            raise ValueError(f"Unknown interpolation method {method}, expected one of {list(MIN_KEYFRAMES_FOR_INTERPOLATION)}")
+        if video_indices is None:
+            video_indices = list(range(len(self.config.video_names)))
+        if point_names is None:
+            point_names = self.config.tracked_point_names
+        if end_frame is None:
+            end_frame = int(self.dataframe.index.get_level_values("frame").max()) + 1
+        frame_numbers = range(max(0, start_frame), end_frame)
+        if len(frame_numbers) < 3 or not video_indices or not point_names:
+            return 0
+        video_names = [self.config.video_names[index] for index in video_indices]
+        column_names = [f"{point_name}_{axis}" for point_name in point_names for axis in ("x", "y")]
+        num_videos, num_points, num_frames = len(video_names), len(point_names), len(frame_numbers)
+
+        rows = pd.MultiIndex.from_product([video_names, frame_numbers], names=["video", "frame"])
+        rows = rows[rows.isin(self.dataframe.index)]
+        current_values = self.dataframe.loc[rows, column_names].to_numpy(dtype=float)
+        # (frames, videos * points, 2) so every point track is one column pair, x and y are filled together
+        labels = np.full((num_videos * num_frames, num_points * 2), np.nan)
+        row_positions = (
+            pd.Index(video_names).get_indexer(rows.get_level_values("video")) * num_frames
+            + (rows.get_level_values("frame").to_numpy() - frame_numbers.start)
+        )
+        labels[row_positions] = current_values
+        tracks = labels.reshape(num_videos, num_frames, num_points, 2).transpose(1, 0, 2, 3)
+        tracks = tracks.reshape(num_frames, num_videos * num_points, 2)
+
+        keyframes = ~np.isnan(tracks).any(axis=2)
+        frame_positions = np.arange(num_frames)[:, np.newaxis]
+        previous_keyframe = np.maximum.accumulate(np.where(keyframes, frame_positions, -1), axis=0)
+        next_keyframe = np.minimum.accumulate(
+            np.where(keyframes, frame_positions, num_frames)[::-1], axis=0
+        )[::-1]
+        fill = ~keyframes & (previous_keyframe >= 0) & (next_keyframe < num_frames)
+        if max_gap is not None:
+            fill &= (next_keyframe - previous_keyframe - 1) <= max_gap
+        if not fill.any():
+            logger.info("No gaps between keyframes to interpolate")
+            return 0
+
+        keyframe_tracks = pd.DataFrame(
+            np.where(keyframes[:, :, np.newaxis], tracks, np.nan).reshape(num_frames, -1),
+            index=pd.Index(frame_numbers, name="frame"),
+        )
+        filled = keyframe_tracks.interpolate(method="linear", limit_area="inside").to_numpy()
+        if method != "linear":
+            keyframe_counts = np.repeat(keyframes.sum(axis=0), 2)
+            smooth_columns = keyframe_counts >= MIN_KEYFRAMES_FOR_INTERPOLATION[method]
+            if smooth_columns.any():
+                interpolate_kwargs = {"order": 3} if method == "spline" else {}
+                filled[:, smooth_columns] = keyframe_tracks.loc[:, smooth_columns].interpolate(
+                    method=method, limit_area="inside", **interpolate_kwargs
+                ).to_numpy()
+        filled = filled.reshape(num_frames, num_videos * num_points, 2)
+        tracks = np.where(fill[:, :, np.newaxis], filled, tracks)
+
+        # back to (video, frame) rows
+        new_values = tracks.reshape(num_frames, num_videos, num_points, 2).transpose(1, 0, 2, 3)
+        new_values = new_values.reshape(num_videos * num_frames, num_points * 2)[row_positions]
+        filled_points = fill.reshape(num_frames, num_videos, num_points).transpose(1, 0, 2)
+        filled_points = filled_points.reshape(num_videos * num_frames, num_points)[row_positions]
+
+        self._write_labels(
+            rows=rows,
+            point_names=point_names,
+            values=new_values,
+            interpolated=filled_points,
+            changed=filled_points,
+        )
+        points_filled = int(np.count_nonzero(filled_points))
+        logger.info(f"Interpolated ({method}) {points_filled} points across {num_videos} videos")
+        return points_filled
+
+    def get_interpolated_points(self, video_index: int, frame_number: int) -> set[str]:
+        if self.interpolated is None:
+            return set()
+        video_name = self.config.video_names[video_index]
+        try:
+            flags = self.interpolated.loc[(video_name, frame_number)]
+        except KeyError:
+            return set()
+        return {point_name for point_name, flag in flags.items() if flag}
+
+    def _write_labels(
+        self,
+        rows: pd.MultiIndex,
+        point_names: list[str],
+        values: np.ndarray,
+        interpolated: np.ndarray,
+        changed: np.ndarray,
+    ):
+        """Write a (rows, points * 2) block of labels with one assignment and record it for undo.
+
+        `interpolated` holds the new (rows, points) interpolated flags, applied only where `changed`.
+        """
+        column_names = [f"{point_name}_{axis}" for point_name in point_names for axis in ("x", "y")]
+        previous_interpolated = None
+        if self.interpolated is None and interpolated.any():
+            self.interpolated = pd.DataFrame(
+                False, index=self.dataframe.index, columns=self.config.tracked_point_names
+            )
+        if self.interpolated is not None:
+            previous_interpolated = self.interpolated.loc[rows, point_names].to_numpy()
+
+        self.edit_history.append(
+            LabelEdit(
+                rows=rows,
+                columns=column_names,
+                previous_values=self.dataframe.loc[rows, column_names].to_numpy(dtype=float),
+                previous_interpolated=previous_interpolated,
+            )
+        )
+        del self.edit_history[:-MAX_EDIT_HISTORY]
+
+        self.dataframe.loc[rows, column_names] = values
+        if previous_interpolated is not None:
+            self.interpolated.loc[rows, point_names] = np.where(changed, interpolated, previous_interpolated)
+
+    def _clear_interpolated_flag(self, video_name: str, frame_number: int, point_name: str):
+        """A clicked or cleared point is no longer interpolated."""
+        if self.interpolated is not None and (video_name, frame_number) in self.interpolated.index:
+            self.interpolated.loc[(video_name, frame_number), point_name] = False
+
+    def undo_last_edit(self) -> bool:
+        if not self.edit_history:
+            logger.info("Nothing to undo")
+            return False
+        edit = self.edit_history.pop()
+        self.dataframe.loc[edit.rows, edit.columns] = edit.previous_values
+        if edit.previous_interpolated is not None and self.interpolated is not None:
+            point_names = [column.removesuffix("_x") for column in edit.columns[::2]]
+            self.interpolated.loc[edit.rows, point_names] = edit.previous_interpolated
+        logger.info(f"Undid edit of {len(edit.rows)} rows")
+        return True
 
     def clear_current_point(self, video_index: int, frame_number: int):
         video_name = self.config.video_names[video_index]
@@ -141,6 +504,7 @@ class DataHandler(BaseModel):
         self.dataframe.loc[(video_name, frame_number), f"{self.active_point}_y"] = (
             np.nan
         )
+        self._clear_interpolated_flag(video_name, frame_number, self.active_point)
         logger.debug(
             f"Cleared point {self.active_point} for video {video_name}, frame {frame_number}"
         )
@@ -149,7 +513,11 @@ class DataHandler(BaseModel):
         self, video_index: int, frame_number: int
     ) -> dict[str, ClickData]:
         video_name = self.config.video_names[video_index]
-        video_frame_row = self.dataframe.loc[(video_name, frame_number)]
+        try:
+            video_frame_row = self.dataframe.loc[(video_name, frame_number)]
+        except KeyError:
+            # sparse labels (e.g. machine labels for every Nth frame) have no row for most frames
+            return {}
 
         # TODO: There is some error in the DLC machine labels that sometimes returns duplicate data, this pulls the first occurence for each row
         if len(video_frame_row.shape) > 1:
@@ -173,7 +541,10 @@ class DataHandler(BaseModel):
         self, video_name: str, frame_number: int
     ) -> dict[str, ClickData]:
         video_index = self.config.video_names.index(video_name)
-        video_frame_row = self.dataframe.loc[(video_name, frame_number)]
+        try:
+            video_frame_row = self.dataframe.loc[(video_name, frame_number)]
+        except KeyError:
+            return {}
 
         # TODO: There is some error in the DLC machine labels that sometimes returns duplicate data, this pulls the first occurence for each row
         if len(video_frame_row.shape) > 1:
@@ -193,8 +564,60 @@ class DataHandler(BaseModel):
                 )
         return click_data
 
+    def find_video_name(self, video_path: str | Path) -> str | None:
+        """Match a video file to its name in the dataframe (human labels use file names, machine labels use stems)."""
+        video_path = Path(video_path)
+        for candidate in (video_path.name, video_path.stem):
+            if candidate in self.config.video_names:
+                return candidate
+        return None
+
+    def get_video_array(
+        self,
+        video_name: str,
+        point_names: list[str] | None = None,
+        num_frames: int | None = None,
+        start_frame: int = 0,
+    ) -> np.ndarray:
+        """Slice out one video's labels as a (frames, points, 2) float array, NaN where unlabeled.
+
+        Rows are indexed by frame number from `start_frame`, so sparse dataframes are padded with NaN.
+        """
+        if point_names is None:
+            point_names = self.config.tracked_point_names
+        column_names = [f"{point_name}_{axis}" for point_name in point_names for axis in ("x", "y")]
+
+        video_dataframe = self.dataframe.xs(video_name, level="video")
+        # TODO: There is some error in the DLC machine labels that sometimes returns duplicate data, this pulls the first occurence for each row
+        video_dataframe = video_dataframe[~video_dataframe.index.duplicated(keep="first")]
+        if num_frames is None:
+            num_frames = max(int(video_dataframe.index.max()) + 1 - start_frame, 0) if len(video_dataframe) else 0
+        video_dataframe = video_dataframe.reindex(
+            index=range(start_frame, start_frame + num_frames), columns=column_names
+        )
+
+        return video_dataframe.to_numpy(dtype=np.float32).reshape(num_frames, len(point_names), 2)
+
+    def set_video_array(
+        self,
+        video_name: str,
+        labels: np.ndarray,
+        start_frame: int = 0,
+        point_names: list[str] | None = None,
+    ):
+        """Write a (frames, points, 2) array into one video's rows from `start_frame`, the inverse of `get_video_array`."""
+        if point_names is None:
+            point_names = self.config.tracked_point_names
+        column_names = [f"{point_name}_{axis}" for point_name in point_names for axis in ("x", "y")]
+        rows = pd.MultiIndex.from_product(
+            [[video_name], range(start_frame, start_frame + labels.shape[0])], names=["video", "frame"]
+        )
+        in_dataframe = rows.isin(self.dataframe.index)
+        self.dataframe.loc[rows[in_dataframe], column_names] = labels.reshape(labels.shape[0], -1)[in_dataframe]
+
     def get_nonempty_frames(self) -> list[int]:
-        mask = self.dataframe.iloc[:, 2:].notna().any(axis=1)
+        # video and frame are the index, every column is a tracked point coordinate
+        mask = self.dataframe.notna().any(axis=1)
         nonempty_dataframe = self.dataframe[mask]
         nonempty_frames = nonempty_dataframe.index.get_level_values("frame").unique()
         return sorted(nonempty_frames.tolist())
@@ -203,6 +626,14 @@ class DataHandler(BaseModel):
         self.dataframe.to_csv(output_path)
         logger.info(f"Saved csv data to {output_path}")
 
+        flags_path = interpolated_flags_path(output_path)
+        if self.interpolated is not None and self.interpolated.to_numpy().any():
+            flags = self.interpolated[self.interpolated.any(axis=1)].astype(np.uint8)
+            flags.to_csv(flags_path)
+            logger.info(f"Saved interpolated label flags to {flags_path}")
+        elif flags_path.is_file():
+            flags_path.unlink()
+
     def save_parquet(self, output_path: str | Path):
         # TODO: Add some useful metadata here?
         self.dataframe.to_parquet(output_path)
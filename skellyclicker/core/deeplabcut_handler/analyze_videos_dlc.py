@@ -12,13 +12,23 @@
 #
 
 from __future__ import annotations
+import itertools
+import math
+import os
 from multiprocessing import Pool
+import torch
 import torch.multiprocessing as mp
 
 import albumentations as A
+import cv2
+import logging
+import numpy as np
+import pandas as pd
 import pickle
 import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
 from pathlib import Path
+from tqdm import tqdm
 
 from deeplabcut.compat import _update_device
 from deeplabcut.pose_estimation_pytorch.apis.videos import (
@@ -38,10 +48,79 @@ from deeplabcut.core.engine import Engine
 from deeplabcut.pose_estimation_pytorch.apis.tracklets import (
     convert_detections2tracklets,
 )
-from deeplabcut.pose_estimation_pytorch.runners import DynamicCropper
+from deeplabcut.pose_estimation_pytorch.data.snapshots import Snapshot
+from deeplabcut.pose_estimation_pytorch.runners import DynamicCropper, InferenceRunner
 from deeplabcut.pose_estimation_pytorch.task import Task
+from deeplabcut.pose_estimation_pytorch.utils import resolve_device
 from deeplabcut.refine_training_dataset.stitch import stitch_tracklets
 from deeplabcut.utils import auxiliaryfunctions
+from pydantic import BaseModel, ConfigDict
+
+from skellyclicker.core.deeplabcut_handler.file_fingerprints import hash_file
+from skellyclicker.core.deeplabcut_handler.frame_selection import SPARSE_OUTPUT_SUFFIX, InferenceFrameSelection
+from skellyclicker.core.deeplabcut_handler.inference_cache import InferenceCache
+from skellyclicker.core.deeplabcut_handler.inference_checkpoints import (
+    InferenceProgress,
+    append_chunk,
+    get_checkpoint_paths,
+    start_or_resume_progress,
+    write_chunked_predictions,
+)
+from skellyclicker.core.deeplabcut_handler.inference_tuning import (
+    BATCH_SIZE_SLOWDOWN_TOLERANCE,
+    DEFAULT_CALIBRATION_FRAMES,
+    DEFAULT_CANDIDATE_BATCH_SIZES,
+    InferenceTrial,
+    InferenceTuning,
+    InferenceTuningResult,
+    MAX_CALIBRATION_SECONDS,
+    MAX_CALIBRATION_TRIALS,
+    create_tuning_result,
+    get_candidate_worker_counts,
+    get_frame_size,
+    get_machine_name,
+    get_memory_budget_bytes,
+    get_model_name,
+    get_peak_memory_bytes,
+    reset_peak_memory,
+    select_best_trial,
+)
+from skellyclicker.core.deeplabcut_handler.onnx_backend import (
+    ONNX_PARITY_FRAMES,
+    InferenceBackend,
+    QuantizationMode,
+    build_onnx_pose_runner,
+    export_snapshot_to_onnx,
+    verify_onnx_parity,
+)
+from skellyclicker.core.deeplabcut_handler.quantization import (
+    QuantizationReport,
+    create_quantization_report,
+    get_quantization_report_path,
+    load_labeled_frames,
+    quantize_onnx_model,
+)
+from skellyclicker.core.deeplabcut_handler.runner_cache import InferenceRunnerCache
+from skellyclicker.core.deeplabcut_handler.video_iterators import (
+    DEFAULT_PREFETCH_FRAMES,
+    FanOutVideoIterator,
+    InterleavedVideoIterator,
+    PrefetchingVideoIterator,
+    SparseVideoIterator,
+)
+
+# rough resident memory of one analysis worker besides its model: torch, OpenCV and decoded frame batches
+WORKER_BASE_MEMORY_BYTES = 1_500_000_000
+# model weights are held a few times over while loading and running the snapshot
+WORKER_MEMORY_PER_SNAPSHOT_BYTE = 3
+# fraction of the currently available memory the worker pool may use
+WORKER_MEMORY_HEADROOM = 0.8
+
+# set in each worker process by _init_analysis_worker, so runners are built once per worker instead of per video
+_worker_runners: tuple[InferenceRunner, InferenceRunner | None] | None = None
+_worker_video_kwargs: dict = {}
+# set by _init_calibration_worker, the worker's share of the calibration workload
+_worker_calibration_frames: list = []
 
 
 def analyze_videos_dlc(
@@ -72,6 +151,17 @@ def analyze_videos_dlc(
     overwrite: bool = False,
     save_as_df: bool = False,
     multiprocess: bool = True,
+    max_workers: int | None = None,
+    prefetch_frames: int = DEFAULT_PREFETCH_FRAMES,
+    cross_camera_batching: bool = False,
+    cache_folder: str | Path | None = None,
+    auto_tune: bool = False,
+    frame_selection: InferenceFrameSelection | None = None,
+    chunk_frames: int | None = None,
+    backend: InferenceBackend = "pytorch",
+    quantization: QuantizationMode | None = None,
+    max_quantized_pixel_error: float | None = None,
+    runner_cache: InferenceRunnerCache | None = None,
     **torch_kwargs,
 ):
     """Makes prediction based on a trained network.
@@ -217,6 +307,76 @@ def analyze_videos_dlc(
         overwrite this by passing the engine as an argument, but this should generally
         not be done.
 
+    multiprocess: bool, optional, default=True
+        Analyze videos in a pool of worker processes. The pool is sized to the available
+        cores and memory (see ``get_analysis_worker_count``), each worker loads the model
+        once and then pulls videos from the pool's queue.
+
+    max_workers: int or None, optional, default=None
+        Upper bound on the number of worker processes when ``multiprocess=True``.
+
+    prefetch_frames: int, optional, default=DEFAULT_PREFETCH_FRAMES
+        Number of frames each video decodes ahead of inference on a background thread.
+
+    cross_camera_batching: bool, optional, default=False
+        For frame-synchronized videos of one recording: run frame t of all cameras
+        together in one batch, with a single model instance, instead of analyzing each
+        video separately. ``batch_size`` is rounded up to a multiple of the number of
+        videos. Outputs are written per video, as usual. Only bottom-up, single animal
+        models without dynamic cropping are supported; otherwise videos are analyzed
+        separately.
+
+    cache_folder: str, Path or None, optional, default=None
+        Folder of an ``InferenceCache``. Videos whose content, model snapshots and
+        inference settings match a previous run get their outputs copied from the
+        cache instead of being analyzed again, and new outputs are added to it.
+        Only used for single animal projects.
+
+    auto_tune: bool, optional, default=False
+        When ``batch_size`` or ``max_workers`` is not given, they are taken from the
+        project's inference tuning for this machine, model architecture and frame size
+        (see ``calibrate_inference``). If ``True`` and no tuning is stored yet, a short
+        calibration is run on the first video and saved next to the config.yaml.
+
+    frame_selection: InferenceFrameSelection or None, optional, default=None
+        Only analyze some frames of each video: every Nth frame, a frame range or the
+        frames labeled in a human labels csv. Predictions are indexed by frame number
+        and saved as ``{video}{scorer}_sparse.h5`` (and .csv), videos are analyzed one
+        after the other with a single model instance and the inference cache is not
+        used. Only supported for single animal projects.
+
+    chunk_frames: int or None, optional, default=None
+        Run inference in chunks of this many frames, appending each chunk's predictions
+        to ``{video}{scorer}_chunks.bin`` and checkpointing ``{video}{scorer}_progress.json``.
+        An interrupted run resumes from the last completed chunk, even with
+        ``overwrite=True``, and memory use does not grow with the video length. The h5
+        (and csv) outputs are written from the chunk file at the end, no full pickle is
+        saved. Only used for single animal models without a detector.
+
+    backend: str, optional, default="pytorch"
+        ``"onnx"`` runs the pose model through onnxruntime on CPU, with graph
+        optimizations and all cores (split between workers). The snapshot is exported
+        once to a ``.onnx`` file next to it, and checked against PyTorch on a few frames
+        of the first video (see ``verify_onnx_parity``) before it is used; if the export
+        or the check fails, PyTorch is used. Detectors run in PyTorch, and dynamic
+        cropping is not supported. Outputs are the same as with PyTorch.
+
+    quantization: str or None, optional, default=None
+        ``"dynamic"`` or ``"static"`` runs an int8 quantized variant of the ONNX model
+        (implies ``backend="onnx"``). Static quantization is calibrated on frames from
+        the project's labeled-data. A report of its speedup and per-bodypart pixel
+        error against the full precision model is printed and saved next to the
+        snapshot (see ``QuantizationReport``).
+
+    max_quantized_pixel_error: float or None, optional, default=None
+        If the quantized model's mean pixel error on any bodypart is larger, the full
+        precision ONNX model is used instead.
+
+    runner_cache: InferenceRunnerCache or None, optional, default=None
+        Loaded models to reuse between calls, e.g. in a long-lived inference server.
+        Runners are taken from (and added to) the cache, videos are analyzed in this
+        process rather than in worker processes, and no inference calibration is run.
+
     torch_kwargs:
         Any extra parameters to pass to the PyTorch API, such as ``device`` which can
         be used to specify the CUDA device to use for training.
@@ -290,10 +450,305 @@ def analyze_videos_dlc(
         pass
 
     _update_device(gputouse, torch_kwargs)
+    if runner_cache is not None:
+        # worker processes would each load their own model, defeating the cache
+        multiprocess = False
 
     # Create the output folder
     _validate_destfolder(destfolder)
 
+    analysis_model = load_analysis_model(
+        config=config,
+        shuffle=shuffle,
+        trainingsetindex=trainingsetindex,
+        modelprefix=modelprefix,
+        snapshot_index=snapshot_index,
+        detector_snapshot_index=detector_snapshot_index,
+        device=device,
+    )
+    cfg = analysis_model.cfg
+    train_fraction = analysis_model.train_fraction
+    model_cfg = analysis_model.model_cfg
+    pose_cfg = analysis_model.pose_cfg
+    pose_task = analysis_model.pose_task
+    snapshot = analysis_model.snapshot
+    detector_snapshot = analysis_model.detector_snapshot
+    dlc_scorer = analysis_model.dlc_scorer
+
+    if cropping is None and cfg.get("cropping", False):
+        cropping = [cfg["x1"], cfg["x2"], cfg["y1"], cfg["y2"]]
+
+    # Get general project parameters
+    multi_animal = cfg["multianimalproject"]
+    bodyparts = model_cfg["metadata"]["bodyparts"]
+    unique_bodyparts = model_cfg["metadata"]["unique_bodyparts"]
+
+    if not multi_animal:
+        save_as_df = True
+        if use_shelve:
+            print(
+                "The ``use_shelve`` parameter cannot be used for single animal "
+                "projects. Setting ``use_shelve=False``."
+            )
+            use_shelve = False
+
+    dynamic = DynamicCropper.build(*dynamic)
+    if pose_task != Task.BOTTOM_UP and dynamic is not None:
+        print(
+            "Turning off dynamic cropping. It should only be used for bottom-up "
+            f"pose estimation models, but you are using a top-down model."
+        )
+        dynamic = None
+
+    if detector_snapshot is not None and detector_batch_size is None:
+        detector_batch_size = cfg.get("detector_batch_size", 1)
+    runner_settings = analysis_model.get_runner_settings(
+        batch_size=batch_size,  # resolved below, once the videos are known
+        transform=transform,
+        dynamic=dynamic,
+        detector_batch_size=detector_batch_size,
+    )
+    runner_settings["backend"] = "onnx" if quantization is not None else backend
+    runner_settings["quantization"] = quantization
+
+    # Reading video and init variables
+    videos: list[Path] = utils.list_videos_in_folder(videos, videotype, shuffle=in_random_order)
+    if runner_settings["backend"] == "onnx" and videos:
+        runner_settings["backend"], runner_settings["quantization"] = get_inference_backend(
+            runner_settings,
+            videos[0],
+            cropping,
+            project_path=cfg["project_path"],
+            max_quantized_pixel_error=max_quantized_pixel_error,
+            runner_cache=runner_cache,
+        )
+
+    if videos and (batch_size is None or (multiprocess and max_workers is None)):
+        tuning_result = get_inference_tuning(
+            config=config,
+            runner_settings=runner_settings,
+            video=videos[0],
+            cropping=cropping,
+            calibrate=auto_tune and pose_task == Task.BOTTOM_UP and runner_cache is None,
+        )
+        if tuning_result is not None:
+            if batch_size is None:
+                batch_size = tuning_result.batch_size
+            if max_workers is None:
+                max_workers = tuning_result.num_workers
+            print(f"Using tuned inference settings: batch size {batch_size}, up to {max_workers} workers")
+    if batch_size is None:
+        batch_size = cfg.get("batch_size", 1)
+    runner_settings["batch_size"] = batch_size
+
+    video_kwargs = dict(
+        config=config,
+        videotype=videotype,
+        shuffle=shuffle,
+        trainingsetindex=trainingsetindex,
+        save_as_csv=save_as_csv,
+        destfolder=destfolder,
+        cropping=cropping,
+        robust_nframes=robust_nframes,
+        use_shelve=use_shelve,
+        auto_track=auto_track,
+        n_tracks=n_tracks,
+        animal_names=animal_names,
+        identity_only=identity_only,
+        batch_size=batch_size,
+        overwrite=overwrite,
+        save_as_df=save_as_df,
+        cfg=cfg,
+        train_fraction=train_fraction,
+        model_cfg=model_cfg,
+        pose_cfg=pose_cfg,
+        multi_animal=multi_animal,
+        bodyparts=bodyparts,
+        unique_bodyparts=unique_bodyparts,
+        dlc_scorer=dlc_scorer,
+        prefetch_frames=prefetch_frames,
+        chunk_frames=chunk_frames,
+        snapshot_path=snapshot.path,
+    )
+
+    if frame_selection is not None and not frame_selection.is_full_video:
+        if multi_animal:
+            raise ValueError("Analyzing selected frames is only supported for single animal projects")
+        pose_runner, detector_runner = get_inference_runners(runner_settings, runner_cache)
+        for video in videos:
+            analyze_video_frames_dlc(
+                video=video,
+                frame_selection=frame_selection,
+                pose_runner=pose_runner,
+                detector_runner=detector_runner,
+                cropping=cropping,
+                model_cfg=model_cfg,
+                dlc_scorer=dlc_scorer,
+                destfolder=destfolder,
+                save_as_csv=save_as_csv,
+            )
+        return dlc_scorer
+
+    inference_cache = None
+    if cache_folder is not None and not multi_animal:
+        inference_cache = InferenceCache.create(
+            cache_folder=cache_folder,
+            snapshot_paths=[snapshot.path] + ([detector_snapshot.path] if detector_snapshot else []),
+            settings=dict(
+                dlc_scorer=dlc_scorer,
+                model_cfg=model_cfg,
+                cropping=cropping,
+                dynamic=describe_dynamic_cropper(dynamic),
+                transform=describe_transform(transform),
+                robust_nframes=robust_nframes,
+                backend=runner_settings["backend"],
+                quantization=runner_settings["quantization"],
+            ),
+        )
+        uncached_videos = []
+        for video in videos:
+            output_path, output_prefix, _ = _get_output_paths(video, destfolder, dlc_scorer)
+            if not inference_cache.restore(video, output_path, output_prefix):
+                uncached_videos.append(video)
+                continue
+            # the metadata describes this run and this video, it isn't cached
+            video_iterator = VideoIterator(str(video), cropping=cropping)
+            now = time.time()
+            save_video_metadata(
+                output_path=output_path,
+                output_prefix=output_prefix,
+                video_iterator=video_iterator,
+                runtime=(now, now),
+                cfg=cfg,
+                model_cfg=model_cfg,
+                dlc_scorer=dlc_scorer,
+                train_fraction=train_fraction,
+                batch_size=batch_size,
+                cropping=cropping,
+                robust_nframes=robust_nframes,
+            )
+            video_iterator.close()
+        videos = uncached_videos
+        if not videos:
+            print("All videos were found in the inference cache")
+            return dlc_scorer
+
+    if cross_camera_batching:
+        unsupported_reason = _get_cross_camera_unsupported_reason(
+            videos=videos,
+            pose_task=pose_task,
+            multi_animal=multi_animal,
+            dynamic=dynamic,
+            cropping=cropping,
+        )
+        if unsupported_reason is not None:
+            print(f"Cannot batch across cameras ({unsupported_reason}), analyzing videos separately")
+            cross_camera_batching = False
+
+    num_workers = 1
+    if multiprocess and not cross_camera_batching:
+        num_workers = get_analysis_worker_count(
+            num_videos=len(videos),
+            snapshot_paths=[snapshot.path] + ([detector_snapshot.path] if detector_snapshot else []),
+            max_workers=max_workers,
+        )
+
+    if cross_camera_batching:
+        runner_settings["batch_size"] = math.ceil(batch_size / len(videos)) * len(videos)
+        print(
+            f"Analyzing {len(videos)} synchronized videos together, "
+            f"batch size {runner_settings['batch_size']}"
+        )
+        pose_runner, _ = get_inference_runners(runner_settings, runner_cache)
+        analyze_synchronized_videos_dlc(
+            video_kwargs=video_kwargs,
+            pose_runner=pose_runner,
+            videos=videos,
+        )
+    elif num_workers > 1:
+        threads_per_worker = max(1, (os.cpu_count() or 1) // num_workers)
+        print(f"Analyzing {len(videos)} videos with {num_workers} workers ({threads_per_worker} threads each)")
+        with Pool(
+            processes=num_workers,
+            initializer=_init_analysis_worker,
+            initargs=(runner_settings, video_kwargs, threads_per_worker),
+        ) as pool:
+            for video in pool.imap_unordered(_analyze_video_in_worker, videos):
+                print(f"Finished analyzing {video}")
+    else:
+        pose_runner, detector_runner = get_inference_runners(runner_settings, runner_cache)
+        for video in videos:
+            analyze_single_video_dlc(
+                **video_kwargs,
+                pose_runner=pose_runner,
+                detector_runner=detector_runner,
+                video=video,
+            )
+
+    if inference_cache is not None:
+        for video in videos:
+            inference_cache.store(video, *_get_output_paths(video, destfolder, dlc_scorer)[:2])
+        inference_cache.prune()
+
+    print(
+        "The videos are analyzed. Now your research can truly start!\n"
+        "You can create labeled videos with 'create_labeled_video'.\n"
+        "If the tracking is not satisfactory for some videos, consider expanding the "
+        "training set. You can use the function 'extract_outlier_frames' to extract a "
+        "few representative outlier frames.\n"
+    )
+
+    return dlc_scorer
+
+
+class AnalysisModel(BaseModel):
+    """A project's pose model resolved for analysis: configs, snapshots and the scorer name of its outputs."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+    config: str
+    cfg: dict
+    train_fraction: float
+    model_cfg: dict
+    pose_cfg: dict
+    pose_task: Task
+    snapshot: Snapshot
+    detector_snapshot: Snapshot | None = None
+    dlc_scorer: str
+
+    @property
+    def max_individuals(self) -> int:
+        return len(self.model_cfg["metadata"]["individuals"])
+
+    def get_runner_settings(
+        self,
+        batch_size: int | None,
+        transform: A.Compose | None = None,
+        dynamic: DynamicCropper | None = None,
+        detector_batch_size: int | None = None,
+    ) -> dict:
+        """Keyword arguments for `build_inference_runners`."""
+        return dict(
+            model_cfg=self.model_cfg,
+            snapshot_path=self.snapshot.path,
+            max_individuals=self.max_individuals,
+            batch_size=batch_size,
+            transform=transform,
+            dynamic=dynamic,
+            detector_snapshot_path=self.detector_snapshot.path if self.detector_snapshot else None,
+            detector_batch_size=detector_batch_size,
+        )
+
+
+def load_analysis_model(
+    config: str | Path,
+    shuffle: int = 1,
+    trainingsetindex: int = 0,
+    modelprefix: str = "",
+    snapshot_index: int | str | None = None,
+    detector_snapshot_index: int | str | None = None,
+    device: str | None = None,
+) -> AnalysisModel:
+    """Read a project's configs and pick the snapshots to analyze videos with."""
     # Load the project configuration
     cfg = auxiliaryfunctions.read_config(config)
     project_path = Path(cfg["project_path"])
@@ -322,52 +777,13 @@ def analyze_videos_dlc(
         detector_snapshot_index,
     )
 
-    if cropping is None and cfg.get("cropping", False):
-        cropping = [cfg["x1"], cfg["x2"], cfg["y1"], cfg["y2"]]
-
-    # Get general project parameters
-    multi_animal = cfg["multianimalproject"]
-    bodyparts = model_cfg["metadata"]["bodyparts"]
-    unique_bodyparts = model_cfg["metadata"]["unique_bodyparts"]
-    individuals = model_cfg["metadata"]["individuals"]
-    max_num_animals = len(individuals)
-
     if device is not None:
         model_cfg["device"] = device
 
-    if batch_size is None:
-        batch_size = cfg.get("batch_size", 1)
-
-    if not multi_animal:
-        save_as_df = True
-        if use_shelve:
-            print(
-                "The ``use_shelve`` parameter cannot be used for single animal "
-                "projects. Setting ``use_shelve=False``."
-            )
-            use_shelve = False
-
-    dynamic = DynamicCropper.build(*dynamic)
-    if pose_task != Task.BOTTOM_UP and dynamic is not None:
-        print(
-            "Turning off dynamic cropping. It should only be used for bottom-up "
-            f"pose estimation models, but you are using a top-down model."
-        )
-        dynamic = None
-
     snapshot = utils.get_model_snapshots(snapshot_index, train_folder, pose_task)[0]
     print(f"Analyzing videos with {snapshot.path}")
-    pose_runner = utils.get_pose_inference_runner(
-        model_config=model_cfg,
-        snapshot_path=snapshot.path,
-        max_individuals=max_num_animals,
-        batch_size=batch_size,
-        transform=transform,
-        dynamic=dynamic,
-    )
-    detector_runner = None
 
-    detector_path, detector_snapshot = None, None
+    detector_snapshot = None
     if pose_task == Task.TOP_DOWN:
         if detector_snapshot_index is None:
             raise ValueError(
@@ -376,19 +792,10 @@ def analyze_videos_dlc(
                 "project's configuration file."
             )
 
-        if detector_batch_size is None:
-            detector_batch_size = cfg.get("detector_batch_size", 1)
-
         detector_snapshot = utils.get_model_snapshots(
             detector_snapshot_index, train_folder, Task.DETECT
         )[0]
         print(f"  -> Using detector {detector_snapshot.path}")
-        detector_runner = utils.get_detector_inference_runner(
-            model_config=model_cfg,
-            snapshot_path=detector_snapshot.path,
-            max_individuals=max_num_animals,
-            batch_size=detector_batch_size,
-        )
 
     dlc_scorer = utils.get_scorer_name(
         cfg,
@@ -397,65 +804,679 @@ def analyze_videos_dlc(
         snapshot_uid=utils.get_scorer_uid(snapshot, detector_snapshot),
         modelprefix=modelprefix,
     )
+    return AnalysisModel(
+        config=str(config),
+        cfg=cfg,
+        train_fraction=train_fraction,
+        model_cfg=model_cfg,
+        pose_cfg=pose_cfg,
+        pose_task=pose_task,
+        snapshot=snapshot,
+        detector_snapshot=detector_snapshot,
+        dlc_scorer=dlc_scorer,
+    )
 
-    # Reading video and init variables
-    videos: list[Path] = utils.list_videos_in_folder(videos, videotype, shuffle=in_random_order)
-    args = [
-        (
-            config,
-            videotype,
-            shuffle,
-            trainingsetindex,
-            save_as_csv,
-            destfolder,
+
+def get_analysis_worker_count(
+    num_videos: int,
+    snapshot_paths: list[Path],
+    max_workers: int | None = None,
+) -> int:
+    """Number of analysis worker processes that fits in the machine's cores and available memory."""
+    num_workers = min(num_videos, os.cpu_count() or 1)
+    if max_workers is not None:
+        num_workers = min(num_workers, max_workers)
+
+    available_memory = _get_available_memory_bytes()
+    if available_memory is not None:
+        snapshot_bytes = sum(Path(path).stat().st_size for path in snapshot_paths)
+        worker_memory = WORKER_BASE_MEMORY_BYTES + WORKER_MEMORY_PER_SNAPSHOT_BYTE * snapshot_bytes
+        memory_limited_workers = int(available_memory * WORKER_MEMORY_HEADROOM // worker_memory)
+        if memory_limited_workers < num_workers:
+            print(
+                f"Limiting analysis to {max(1, memory_limited_workers)} workers to fit in "
+                f"{available_memory / 1e9:.1f} GB of available memory"
+            )
+            num_workers = memory_limited_workers
+    return max(1, num_workers)
+
+
+def _get_available_memory_bytes() -> int | None:
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        # not available on Windows/macOS, fall back to sizing by cores only
+        return None
+
+
+def build_inference_runners(
+    model_cfg: dict,
+    snapshot_path: Path,
+    max_individuals: int,
+    batch_size: int,
+    transform: A.Compose | None,
+    dynamic: DynamicCropper | None,
+    detector_snapshot_path: Path | None,
+    detector_batch_size: int | None,
+    backend: InferenceBackend = "pytorch",
+    quantization: QuantizationMode | None = None,
+    onnx_threads: int | None = None,
+) -> tuple[InferenceRunner, InferenceRunner | None]:
+    pose_runner = utils.get_pose_inference_runner(
+        model_config=model_cfg,
+        snapshot_path=snapshot_path,
+        max_individuals=max_individuals,
+        batch_size=batch_size,
+        transform=transform,
+        dynamic=dynamic,
+        device="cpu" if backend == "onnx" else None,
+    )
+    if backend == "onnx":
+        pose_runner = build_onnx_pose_runner(
+            pose_runner, snapshot_path, num_threads=onnx_threads, quantization=quantization
+        )
+    detector_runner = None
+    if detector_snapshot_path is not None:
+        detector_runner = utils.get_detector_inference_runner(
+            model_config=model_cfg,
+            snapshot_path=detector_snapshot_path,
+            max_individuals=max_individuals,
+            batch_size=detector_batch_size,
+        )
+    return pose_runner, detector_runner
+
+
+def get_inference_runners(
+    runner_settings: dict,
+    runner_cache: InferenceRunnerCache | None = None,
+) -> tuple[InferenceRunner, InferenceRunner | None]:
+    if runner_cache is None:
+        return build_inference_runners(**runner_settings)
+    return runner_cache.get_or_build(
+        runner_settings, build_inference_runners, key_settings=describe_runner_settings(runner_settings)
+    )
+
+
+def describe_transform(transform: A.BaseCompose | None) -> dict | None:
+    """The transform as JSON, to hash it. Its repr isn't stable between runs."""
+    return A.to_dict(transform) if transform is not None else None
+
+
+def describe_dynamic_cropper(dynamic: DynamicCropper | None) -> dict | None:
+    """The cropper's settings as JSON, to hash them. Its crop state changes as it runs."""
+    if dynamic is None:
+        return None
+    return {"threshold": dynamic.threshold, "margin": dynamic.margin}
+
+
+def describe_runner_settings(runner_settings: dict) -> dict:
+    """`build_inference_runners` settings with the transform and dynamic cropper described as JSON, for hashing."""
+    return {
+        **runner_settings,
+        "transform": describe_transform(runner_settings.get("transform")),
+        "dynamic": describe_dynamic_cropper(runner_settings.get("dynamic")),
+    }
+
+
+def get_inference_backend(
+    runner_settings: dict,
+    video: Path,
+    cropping: list[int] | None = None,
+    project_path: str | Path | None = None,
+    max_quantized_pixel_error: float | None = None,
+    runner_cache: InferenceRunnerCache | None = None,
+) -> tuple[InferenceBackend, QuantizationMode | None]:
+    """`prepare_onnx_backend`, or the backend `runner_cache` already prepared for this snapshot and device."""
+
+    def prepare_backend() -> tuple[InferenceBackend, QuantizationMode | None]:
+        return prepare_onnx_backend(
+            runner_settings,
+            video,
             cropping,
-            robust_nframes,
-            use_shelve,
-            auto_track,
-            n_tracks,
-            animal_names,
-            identity_only,
-            batch_size,
-            overwrite,
-            save_as_df,
-            cfg,
-            train_fraction,
-            model_cfg,
-            pose_cfg,
-            multi_animal,
-            bodyparts,
-            unique_bodyparts,
-            pose_runner,
-            detector_runner,
-            dlc_scorer,
-            video
+            project_path=project_path,
+            max_quantized_pixel_error=max_quantized_pixel_error,
+        )
+
+    if runner_cache is None:
+        return prepare_backend()
+    key_settings = {
+        "snapshot_path": str(runner_settings["snapshot_path"]),
+        "device": resolve_device(runner_settings["model_cfg"]),
+        "transform": describe_transform(runner_settings.get("transform")),
+        "dynamic": describe_dynamic_cropper(runner_settings.get("dynamic")),
+        "quantization": runner_settings.get("quantization"),
+        "max_quantized_pixel_error": max_quantized_pixel_error,
+    }
+    return runner_cache.get_or_prepare_backend(key_settings, prepare_backend)
+
+
+def prepare_onnx_backend(
+    runner_settings: dict,
+    video: Path,
+    cropping: list[int] | None = None,
+    project_path: str | Path | None = None,
+    max_quantized_pixel_error: float | None = None,
+) -> tuple[InferenceBackend, QuantizationMode | None]:
+    """Export the pose snapshot to ONNX if needed and check it against PyTorch on frames of `video`.
+
+    With a `quantization` in the runner settings, the export is also quantized to int8 (calibrated on frames
+    from the project's labeled-data) and a `QuantizationReport` of its speed and per-bodypart pixel error is
+    saved next to it. The quantized model is not used if its mean error on any bodypart is over
+    `max_quantized_pixel_error`.
+
+    Returns the backend and quantization to use, falling back to full precision ONNX or to PyTorch.
+    """
+    quantization = runner_settings.get("quantization")
+    if runner_settings["dynamic"] is not None:
+        print("Dynamic cropping is not supported by the ONNX backend, using PyTorch")
+        return "pytorch", None
+    try:
+        frames = _read_calibration_frames(video, ONNX_PARITY_FRAMES, cropping)
+        parity_settings = {
+            **runner_settings,
+            "detector_snapshot_path": None,
+            "batch_size": len(frames),
+            "quantization": None,
+        }
+        torch_runner, _ = build_inference_runners(**{**parity_settings, "backend": "pytorch"})
+        export_snapshot_to_onnx(torch_runner, runner_settings["snapshot_path"], sample_frame=frames[0])
+        onnx_runner, _ = build_inference_runners(**{**parity_settings, "backend": "onnx"})
+        pixel_difference, likelihood_difference = verify_onnx_parity(torch_runner, onnx_runner, frames)
+    except Exception as e:
+        logging.warning(f"Not using the ONNX backend: {e}")
+        return "pytorch", None
+    print(
+        f"Using the ONNX backend, within {pixel_difference:.3f} px and {likelihood_difference:.4f} likelihood "
+        f"of PyTorch on {len(frames)} frames"
+    )
+    if quantization is None:
+        return "onnx", None
+
+    try:
+        report = _get_quantization_report(torch_runner, onnx_runner, runner_settings, quantization, project_path, frames)
+    except Exception as e:
+        logging.warning(f"Not using int8 {quantization} quantization: {e}")
+        return "onnx", None
+    print(report.summary())
+    if max_quantized_pixel_error is not None and report.max_mean_pixel_error > max_quantized_pixel_error:
+        print(
+            f"Quantized model is off by up to {report.max_mean_pixel_error:.2f} px on average, more than "
+            f"{max_quantized_pixel_error} px, using the full precision ONNX model"
+        )
+        return "onnx", None
+    return "onnx", quantization
+
+
+def _get_quantization_report(
+    torch_runner: InferenceRunner,
+    onnx_runner: InferenceRunner,
+    runner_settings: dict,
+    quantization: QuantizationMode,
+    project_path: str | Path | None,
+    video_frames: list[np.ndarray],
+) -> QuantizationReport:
+    """Quantize the snapshot if needed, and measure it unless a report of the current quantized model exists."""
+    snapshot_path = runner_settings["snapshot_path"]
+    labeled_frames = load_labeled_frames(project_path) if project_path is not None else []
+    if len(labeled_frames) < 2:
+        logging.warning("Not enough frames in labeled-data to calibrate quantization, using frames of the video")
+        labeled_frames = video_frames
+    # calibrate on half of the frames, report the error on the others
+    calibration_frames, report_frames = labeled_frames[::2], labeled_frames[1::2]
+    if quantization == "dynamic":
+        report_frames = labeled_frames
+    quantized_path = quantize_onnx_model(torch_runner, snapshot_path, quantization, calibration_frames)
+
+    report_path = get_quantization_report_path(snapshot_path, quantization)
+    if report_path.is_file() and report_path.stat().st_mtime >= quantized_path.stat().st_mtime:
+        return QuantizationReport.model_validate_json(report_path.read_text())
+    quantized_runner, _ = build_inference_runners(
+        **{
+            **runner_settings,
+            "detector_snapshot_path": None,
+            "batch_size": onnx_runner.batch_size,
+            "backend": "onnx",
+            "quantization": quantization,
+        }
+    )
+    report = create_quantization_report(
+        full_precision_runner=onnx_runner,
+        quantized_runner=quantized_runner,
+        frames=report_frames,
+        bodyparts=runner_settings["model_cfg"]["metadata"]["bodyparts"],
+        mode=quantization,
+        snapshot_path=snapshot_path,
+    )
+    report.save(report_path)
+    print(f"Saved quantization report to {report_path}")
+    return report
+
+
+def _set_worker_threads(num_threads: int) -> None:
+    """Split the cores between workers instead of letting every process use all of them."""
+    torch.set_num_threads(num_threads)
+    try:
+        torch.set_num_interop_threads(num_threads)
+    except RuntimeError:
+        pass  # can only be set before any inter-op work has started in this process
+    cv2.setNumThreads(num_threads)
+
+
+def _init_analysis_worker(runner_settings: dict, video_kwargs: dict, num_threads: int) -> None:
+    global _worker_runners, _worker_video_kwargs
+    _set_worker_threads(num_threads)
+    _worker_runners = build_inference_runners(**runner_settings, onnx_threads=num_threads)
+    _worker_video_kwargs = video_kwargs
+
+
+def _analyze_video_in_worker(video: Path) -> Path:
+    pose_runner, detector_runner = _worker_runners
+    analyze_single_video_dlc(
+        **_worker_video_kwargs,
+        pose_runner=pose_runner,
+        detector_runner=detector_runner,
+        video=video,
+    )
+    return video
+
+
+def get_tuning_model_name(runner_settings: dict) -> str:
+    """The model name inference tuning is stored under, with the backend and quantization it runs with."""
+    model = get_model_name(runner_settings["model_cfg"])
+    if runner_settings.get("backend", "pytorch") != "pytorch":
+        model = f"{model}-{runner_settings['backend']}"
+    if runner_settings.get("quantization") is not None:
+        model = f"{model}-int8-{runner_settings['quantization']}"
+    return model
+
+
+def get_inference_tuning(
+    config: str | Path,
+    runner_settings: dict,
+    video: Path,
+    cropping: list[int] | None = None,
+    calibrate: bool = False,
+) -> InferenceTuningResult | None:
+    """The stored tuning for this machine, model architecture and frame size, calibrated first if asked to."""
+    machine = get_machine_name(resolve_device(runner_settings["model_cfg"]))
+    model = get_tuning_model_name(runner_settings)
+    frame_size = get_frame_size(video, cropping)
+
+    tuning = InferenceTuning.load(config)
+    tuning_result = tuning.find(machine, model, frame_size)
+    if tuning_result is not None or not calibrate:
+        return tuning_result
+
+    tuning_result = calibrate_inference(
+        runner_settings=runner_settings,
+        video=video,
+        cropping=cropping,
+    )
+    if tuning_result is not None:
+        tuning.add(tuning_result)
+        tuning.save(config)
+    return tuning_result
+
+
+def calibrate_inference(
+    runner_settings: dict,
+    video: Path,
+    cropping: list[int] | None = None,
+    candidate_batch_sizes: tuple[int, ...] = DEFAULT_CANDIDATE_BATCH_SIZES,
+    max_workers: int | None = None,
+    num_frames: int = DEFAULT_CALIBRATION_FRAMES,
+    max_trials: int = MAX_CALIBRATION_TRIALS,
+    max_seconds: float = MAX_CALIBRATION_SECONDS,
+) -> InferenceTuningResult | None:
+    """Measure throughput and peak memory of the pose model for candidate batch sizes and worker counts.
+
+    For every worker count, a pool of workers loads the model once and the first `num_frames` frames of `video`
+    are split between them. Each trial times the whole pool over that shared workload, at increasing batch sizes
+    until a larger batch gets slower or runs out of memory. More workers are only tried while they make the pool
+    faster, and no new trial starts after `max_trials` trials or `max_seconds`. The fastest combination whose
+    workers fit in memory together is returned. Only bottom-up models are calibrated, top-down pose runners need
+    detections to run.
+    """
+    model_cfg = runner_settings["model_cfg"]
+    device = resolve_device(model_cfg)
+    snapshot_paths = [runner_settings["snapshot_path"]]
+    if runner_settings["detector_snapshot_path"] is not None:
+        snapshot_paths.append(runner_settings["detector_snapshot_path"])
+    worker_limit = get_analysis_worker_count(
+        num_videos=os.cpu_count() or 1,
+        snapshot_paths=snapshot_paths,
+        max_workers=max_workers,
+    )
+    memory_budget = get_memory_budget_bytes(device, _get_available_memory_bytes(), WORKER_MEMORY_HEADROOM)
+
+    print(
+        f"Calibrating inference on {video.name}: batch sizes {list(candidate_batch_sizes)}, "
+        f"up to {worker_limit} workers, at most {max_trials} trials"
+    )
+    start_time = time.perf_counter()
+    trials: list[InferenceTrial] = []
+    best_pool_frames_per_second = 0.0
+    for num_workers in get_candidate_worker_counts(worker_limit):
+        if len(trials) >= max_trials or time.perf_counter() - start_time > max_seconds:
+            print("  Calibration budget used up")
+            break
+        frames_per_worker = max(1, num_frames // num_workers)
+        threads_per_worker = max(1, (os.cpu_count() or 1) // num_workers)
+        worker_trials: list[InferenceTrial] = []
+        best_frames_per_second = 0.0
+        with Pool(
+            processes=num_workers,
+            initializer=_init_calibration_worker,
+            initargs=({**runner_settings, "batch_size": 1}, threads_per_worker, video, cropping, frames_per_worker),
+        ) as pool:
+            # an untimed round first, so model loading and warm up aren't measured
+            pool.starmap(_calibrate_in_worker, [(1, 1)] * num_workers)
+            for batch_size in sorted(candidate_batch_sizes):
+                if batch_size > frames_per_worker or len(trials) + len(worker_trials) >= max_trials:
+                    break
+                trial_start_time = time.perf_counter()
+                try:
+                    peak_memories = pool.starmap(_calibrate_in_worker, [(batch_size,)] * num_workers)
+                except (RuntimeError, MemoryError) as e:  # torch's out of memory error is a RuntimeError
+                    logging.info(f"Batch size {batch_size} failed during calibration: {e}")
+                    break
+                # the pool's throughput is the shared workload over the time all workers took to run it
+                trial = InferenceTrial(
+                    batch_size=batch_size,
+                    num_workers=num_workers,
+                    frames_per_second=frames_per_worker * num_workers / (time.perf_counter() - trial_start_time),
+                    peak_memory_bytes=max(peak_memories),
+                )
+                print(
+                    f"  {num_workers} workers, batch size {batch_size}: {trial.frames_per_second:.1f} frames/s, "
+                    f"{trial.peak_memory_bytes / 1e9:.2f} GB peak per worker"
+                )
+                worker_trials.append(trial)
+                if trial.frames_per_second < best_frames_per_second * BATCH_SIZE_SLOWDOWN_TOLERANCE:
+                    break
+                best_frames_per_second = max(best_frames_per_second, trial.frames_per_second)
+        trials.extend(worker_trials)
+        if best_frames_per_second < best_pool_frames_per_second * BATCH_SIZE_SLOWDOWN_TOLERANCE:
+            break
+        best_pool_frames_per_second = max(best_pool_frames_per_second, best_frames_per_second)
+
+    best_trial = select_best_trial(trials, memory_budget)
+    if best_trial is None:
+        logging.warning("Inference calibration did not find a configuration that fits in memory")
+        return None
+    print(f"Best inference configuration: batch size {best_trial.batch_size}, {best_trial.num_workers} workers")
+    return create_tuning_result(
+        machine=get_machine_name(device),
+        model=get_tuning_model_name(runner_settings),
+        frame_size=get_frame_size(video, cropping),
+        best_trial=best_trial,
+        trials=trials,
+    )
+
+
+def _init_calibration_worker(
+    runner_settings: dict,
+    num_threads: int,
+    video: Path,
+    cropping: list[int] | None,
+    num_frames: int,
+) -> None:
+    global _worker_calibration_frames
+    _init_analysis_worker(runner_settings, {}, num_threads)
+    _worker_calibration_frames = _read_calibration_frames(video, num_frames, cropping)
+
+
+def _calibrate_in_worker(batch_size: int, num_frames: int | None = None) -> int:
+    """Run this worker's share of the calibration frames at `batch_size`, returns the peak memory."""
+    pose_runner, _ = _worker_runners
+    device = str(pose_runner.device)
+    pose_runner.batch_size = batch_size
+    reset_peak_memory(device)
+    pose_runner.inference(images=_worker_calibration_frames[:num_frames])
+    return get_peak_memory_bytes(device)
+
+
+def _read_calibration_frames(video: Path, num_frames: int, cropping: list[int] | None) -> list:
+    cap = cv2.VideoCapture(str(video))
+    frames = []
+    while len(frames) < num_frames:
+        success, frame = cap.read()
+        if not success:
+            break
+        if cropping is not None:
+            x1, x2, y1, y2 = cropping
+            frame = frame[y1:y2, x1:x2]
+        frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    cap.release()
+    if not frames:
+        raise ValueError(f"Could not read frames for calibration from {video}")
+    return frames
+
+
+def _get_cross_camera_unsupported_reason(
+    videos: list[Path],
+    pose_task: Task,
+    multi_animal: bool,
+    dynamic: DynamicCropper | None,
+    cropping: list[int] | None,
+) -> str | None:
+    if len(videos) < 2:
+        return "only one video"
+    if pose_task != Task.BOTTOM_UP or multi_animal:
+        return "only single animal bottom-up models are supported"
+    if dynamic is not None:
+        return "dynamic cropping needs a batch size of 1"
+    frame_sizes = set()
+    for video in videos:
+        cap = cv2.VideoCapture(str(video))
+        frame_sizes.add((int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))))
+        cap.release()
+    if len(frame_sizes) > 1 and cropping is None:
+        return f"videos have different frame sizes {sorted(frame_sizes)}"
+    return None
+
+
+def analyze_synchronized_videos_dlc(
+    video_kwargs: dict,
+    pose_runner: InferenceRunner,
+    videos: list[Path],
+) -> None:
+    """Analyze frame-synchronized videos together, batching the same timestep from every camera.
+
+    Frames are decoded ahead per camera, interleaved into one stream for the runner, and the predictions are
+    split back per camera and saved with `save_video_predictions`, exactly as for separately analyzed videos.
+    """
+    if not video_kwargs["overwrite"]:
+        analyzed = [
+            video for video in videos
+            if _get_output_paths(video, video_kwargs["destfolder"], video_kwargs["dlc_scorer"])[2].exists()
+        ]
+        for video in analyzed:
+            print(f"Video {video} already analyzed!")
+        videos = [video for video in videos if video not in analyzed]
+        if not videos:
+            return
+
+    video_iterators = [
+        PrefetchingVideoIterator(
+            video,
+            cropping=video_kwargs["cropping"],
+            prefetch_frames=video_kwargs["prefetch_frames"],
         )
         for video in videos
     ]
-    if multiprocess:
+    interleaved_frames = InterleavedVideoIterator(video_iterators)
+
+    runtime_start = time.time()
+    predictions = pose_runner.inference(images=tqdm(interleaved_frames))
+    runtime = (runtime_start, time.time())
+
+    save_kwargs = {
+        key: value for key, value in video_kwargs.items() if key not in ("overwrite", "prefetch_frames", "chunk_frames", "snapshot_path")
+    }
+    for video, video_iterator, video_predictions in zip(
+        videos, video_iterators, interleaved_frames.split_per_camera(predictions)
+    ):
+        n_frames = video_iterator.get_n_frames(robust=video_kwargs["robust_nframes"])
+        if len(video_predictions) != n_frames:
+            logging.warning(
+                f"The video metadata indicates that there are {n_frames} frames in {video}, but only "
+                f"{len(video_predictions)} were able to be processed. This can happen if the video is corrupted."
+            )
+        save_video_predictions(
+            **save_kwargs,
+            video=video,
+            video_iterator=video_iterator,
+            predictions=video_predictions,
+            runtime=runtime,
+        )
+
+
+def analyze_videos_multi_model_dlc(
+    configs: list[str | Path],
+    videos: list[str | Path],
+    destfolders: list[str | Path],
+    videotype: str = "",
+    shuffle: int = 1,
+    trainingsetindex: int = 0,
+    batch_size: int | None = None,
+    device: str | None = None,
+    save_as_csv: bool = False,
+    robust_nframes: bool = False,
+    prefetch_frames: int = DEFAULT_PREFETCH_FRAMES,
+    overwrite: bool = False,
+) -> list[str]:
+    """Analyze videos with several models, decoding each video once.
+
+    Every frame is decoded on one thread and fanned out to each model's inference runner, running on its own
+    thread. Each model's outputs go to its own folder in `destfolders`, named and laid out exactly as
+    `analyze_videos_dlc` writes them. Only single animal, bottom-up models are supported.
+
+    Returns the DLC scorer name of each model.
+    """
+    if len(configs) != len(destfolders):
+        raise ValueError(f"Got {len(configs)} model configs but {len(destfolders)} output folders")
+    for destfolder in destfolders:
+        _validate_destfolder(str(destfolder))
+
+    analysis_models = [
+        load_analysis_model(config, shuffle=shuffle, trainingsetindex=trainingsetindex, device=device)
+        for config in configs
+    ]
+    croppings = []
+    for analysis_model in analysis_models:
+        if analysis_model.pose_task != Task.BOTTOM_UP or analysis_model.cfg["multianimalproject"]:
+            raise ValueError(
+                f"Multi-model analysis only supports single animal bottom-up models, {analysis_model.config} "
+                f"is a {analysis_model.pose_task.value} model"
+                f"{' for a multi animal project' if analysis_model.cfg['multianimalproject'] else ''}"
+            )
+        cfg = analysis_model.cfg
+        croppings.append([cfg["x1"], cfg["x2"], cfg["y1"], cfg["y2"]] if cfg.get("cropping", False) else None)
+    if any(cropping != croppings[0] for cropping in croppings):
+        raise ValueError(f"Models analyzed together must crop videos the same way, got {croppings}")
+    cropping = croppings[0]
+
+    videos: list[Path] = utils.list_videos_in_folder(videos, videotype)
+    if not videos:
+        print("No videos to analyze")
+        return [analysis_model.dlc_scorer for analysis_model in analysis_models]
+
+    pose_runners = []
+    video_kwargs = []
+    for analysis_model, destfolder in zip(analysis_models, destfolders):
+        model_batch_size = batch_size
+        if model_batch_size is None:
+            tuning_result = get_inference_tuning(
+                config=analysis_model.config,
+                runner_settings=analysis_model.get_runner_settings(batch_size=None),
+                video=videos[0],
+                cropping=cropping,
+            )
+            model_batch_size = (
+                tuning_result.batch_size if tuning_result is not None
+                else analysis_model.cfg.get("batch_size", 1)
+            )
+        pose_runner, _ = build_inference_runners(**analysis_model.get_runner_settings(batch_size=model_batch_size))
+        pose_runners.append(pose_runner)
+        video_kwargs.append(
+            dict(
+                config=analysis_model.config,
+                videotype=videotype,
+                shuffle=shuffle,
+                trainingsetindex=trainingsetindex,
+                save_as_csv=save_as_csv,
+                destfolder=str(destfolder),
+                cropping=cropping,
+                robust_nframes=robust_nframes,
+                use_shelve=False,
+                auto_track=False,
+                n_tracks=None,
+                animal_names=None,
+                identity_only=False,
+                batch_size=model_batch_size,
+                save_as_df=True,
+                cfg=analysis_model.cfg,
+                train_fraction=analysis_model.train_fraction,
+                model_cfg=analysis_model.model_cfg,
+                pose_cfg=analysis_model.pose_cfg,
+                multi_animal=False,
+                bodyparts=analysis_model.model_cfg["metadata"]["bodyparts"],
+                unique_bodyparts=analysis_model.model_cfg["metadata"]["unique_bodyparts"],
+                dlc_scorer=analysis_model.dlc_scorer,
+            )
+        )
+
+    for video in videos:
+        model_indices = []
+        for model_index, kwargs in enumerate(video_kwargs):
+            output_pkl = _get_output_paths(video, kwargs["destfolder"], kwargs["dlc_scorer"])[2]
+            if not overwrite and output_pkl.exists():
+                print(f"Video {video} already analyzed at {output_pkl}!")
+            else:
+                model_indices.append(model_index)
+        if not model_indices:
+            continue
+
+        print(f"Analyzing {video} with {len(model_indices)} models")
+        video_iterator = VideoIterator(str(video), cropping=cropping)
+        fan_out = FanOutVideoIterator(video_iterator, len(model_indices), buffer_frames=prefetch_frames)
+        runtime_start = time.time()
+        fan_out.start()
         try:
-            with Pool(processes=len(videos)) as pool:
-                pool.starmap(
-                    analyze_single_video_dlc,
-                    args
+            with ThreadPoolExecutor(max_workers=len(model_indices)) as executor:
+                futures = [
+                    executor.submit(
+                        pose_runners[model_index].inference,
+                        images=tqdm(consumer) if consumer_index == 0 else consumer,
+                    )
+                    for consumer_index, (model_index, consumer) in enumerate(zip(model_indices, fan_out.consumers))
+                ]
+                done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+                if any(future.exception() is not None for future in done):
+                    # a failed runner stops consuming, release the decoder and the other runners
+                    fan_out.stop()
+                predictions_per_model = [future.result() for future in futures]
+        finally:
+            fan_out.stop()
+        runtime = (runtime_start, time.time())
+
+        n_frames = video_iterator.get_n_frames(robust=robust_nframes)
+        for model_index, predictions in zip(model_indices, predictions_per_model):
+            if len(predictions) != n_frames:
+                logging.warning(
+                    f"The video metadata indicates that there are {n_frames} frames in {video}, but only "
+                    f"{len(predictions)} were able to be processed. This can happen if the video is corrupted."
                 )
-        except TypeError:
-            print("Analyzing with multiprocessing failed, defaulting to sequential processing")
-            for arg in args:
-                analyze_single_video_dlc(*arg)
-    else:
-        for arg in args:
-            analyze_single_video_dlc(*arg)
-
-    print(
-        "The videos are analyzed. Now your research can truly start!\n"
-        "You can create labeled videos with 'create_labeled_video'.\n"
-        "If the tracking is not satisfactory for some videos, consider expanding the "
-        "training set. You can use the function 'extract_outlier_frames' to extract a "
-        "few representative outlier frames.\n"
-    )
+            save_video_predictions(
+                **video_kwargs[model_index],
+                video=video,
+                video_iterator=video_iterator,
+                predictions=predictions,
+                runtime=runtime,
+            )
 
-    return dlc_scorer
+    return [analysis_model.dlc_scorer for analysis_model in analysis_models]
 
 
 def analyze_single_video_dlc(
@@ -486,16 +1507,34 @@ def analyze_single_video_dlc(
     detector_runner,
     dlc_scorer,
     video,
+    prefetch_frames=DEFAULT_PREFETCH_FRAMES,
+    chunk_frames=None,
+    snapshot_path=None,
 ):
-    if destfolder is None:
-        output_path = video.parent
-    else:
-        output_path = Path(destfolder)
+    output_path, output_prefix, output_pkl = _get_output_paths(video, destfolder, dlc_scorer)
 
-    output_prefix = video.stem + dlc_scorer
-    output_pkl = output_path / f"{output_prefix}_full.pickle"
+    video_iterator = PrefetchingVideoIterator(video, cropping=cropping, prefetch_frames=prefetch_frames)
 
-    video_iterator = VideoIterator(video, cropping=cropping)
+    if chunk_frames is not None and not multi_animal and detector_runner is None:
+        analyze_video_in_chunks_dlc(
+            video=video,
+            video_iterator=video_iterator,
+            pose_runner=pose_runner,
+            chunk_frames=chunk_frames,
+            output_path=output_path,
+            output_prefix=output_prefix,
+            cfg=cfg,
+            model_cfg=model_cfg,
+            dlc_scorer=dlc_scorer,
+            snapshot_path=snapshot_path,
+            train_fraction=train_fraction,
+            batch_size=batch_size,
+            cropping=cropping,
+            robust_nframes=robust_nframes,
+            save_as_csv=save_as_csv,
+            overwrite=overwrite,
+        )
+        return
 
     shelf_writer = None
     if use_shelve:
@@ -517,67 +1556,343 @@ def analyze_single_video_dlc(
             robust_nframes=robust_nframes,
         )
         runtime.append(time.time())
-        metadata = _generate_metadata(
+        save_video_predictions(
+            config=config,
+            videotype=videotype,
+            shuffle=shuffle,
+            trainingsetindex=trainingsetindex,
+            save_as_csv=save_as_csv,
+            destfolder=destfolder,
+            cropping=cropping,
+            robust_nframes=robust_nframes,
+            use_shelve=use_shelve,
+            auto_track=auto_track,
+            n_tracks=n_tracks,
+            animal_names=animal_names,
+            identity_only=identity_only,
+            batch_size=batch_size,
+            save_as_df=save_as_df,
             cfg=cfg,
-            pytorch_config=model_cfg,
-            dlc_scorer=dlc_scorer,
             train_fraction=train_fraction,
-            batch_size=batch_size,
-            cropping=cropping,
+            model_cfg=model_cfg,
+            pose_cfg=pose_cfg,
+            multi_animal=multi_animal,
+            bodyparts=bodyparts,
+            unique_bodyparts=unique_bodyparts,
+            dlc_scorer=dlc_scorer,
+            video=video,
+            video_iterator=video_iterator,
+            predictions=predictions,
             runtime=(runtime[0], runtime[1]),
-            video=video_iterator,
-            robust_nframes=robust_nframes,
         )
 
-        with open(output_path / f"{output_prefix}_meta.pickle", "wb") as f:
-            pickle.dump(metadata, f, pickle.HIGHEST_PROTOCOL)
-
-        if use_shelve and save_as_df:
-            print("Can't ``save_as_df`` as ``use_shelve=True``. Skipping.")
-
-        if not use_shelve:
-            output_data = _generate_output_data(pose_cfg, predictions)
-            with open(output_pkl, "wb") as f:
-                pickle.dump(output_data, f, pickle.HIGHEST_PROTOCOL)
-
-            if save_as_df:
-                create_df_from_prediction(
-                    predictions=predictions,
-                    multi_animal=multi_animal,
-                    model_cfg=model_cfg,
-                    dlc_scorer=dlc_scorer,
-                    output_path=output_path,
-                    output_prefix=output_prefix,
-                    save_as_csv=save_as_csv,
-                )
 
-        if multi_animal:
-            _generate_assemblies_file(
-                full_data_path=output_pkl,
-                output_path=output_path / f"{output_prefix}_assemblies.pickle",
-                num_bodyparts=len(bodyparts),
-                num_unique_bodyparts=len(unique_bodyparts),
+def analyze_video_in_chunks_dlc(
+    video: Path,
+    video_iterator: VideoIterator,
+    pose_runner: InferenceRunner,
+    chunk_frames: int,
+    output_path: Path,
+    output_prefix: str,
+    cfg: dict,
+    model_cfg: dict,
+    dlc_scorer: str,
+    snapshot_path: Path,
+    train_fraction: float,
+    batch_size: int,
+    cropping: list[int] | None,
+    robust_nframes: bool,
+    save_as_csv: bool,
+    overwrite: bool,
+) -> None:
+    """Single animal inference in chunks of `chunk_frames`, checkpointed so an interrupted run can resume.
+
+    Only one chunk of predictions is held in memory, see `inference_checkpoints` for the on-disk layout. A
+    checkpoint is only resumed if it was made with the same snapshot contents, and never with `overwrite`.
+    """
+    bodyparts = model_cfg["metadata"]["bodyparts"]
+    snapshot_hash = hash_file(snapshot_path)
+    _, progress_path = get_checkpoint_paths(output_path, output_prefix)
+    saved_progress = InferenceProgress.load(progress_path)
+    if (
+        not overwrite
+        and saved_progress is not None
+        and saved_progress.complete
+        and saved_progress.snapshot_hash == snapshot_hash
+        and (output_path / f"{output_prefix}.h5").exists()
+    ):
+        print(f"Video {video} already analyzed at {output_path / f'{output_prefix}.h5'}!")
+        return
+
+    n_frames = video_iterator.get_n_frames(robust=robust_nframes)
+    progress = start_or_resume_progress(
+        video=video,
+        dlc_scorer=dlc_scorer,
+        snapshot_hash=snapshot_hash,
+        bodyparts=bodyparts,
+        num_frames=n_frames,
+        output_path=output_path,
+        output_prefix=output_prefix,
+        restart=overwrite,
+    )
+    if progress.completed_frames > 0:
+        print(f"Resuming {video} from frame {progress.completed_frames} of {n_frames}")
+        _move_video_iterator_to_frame(video_iterator, progress.completed_frames)
+
+    runtime_start = time.time()
+    # a VideoIterator starts over after its last frame, a generator stays exhausted between chunks
+    frames = (frame for frame in video_iterator)
+    with tqdm(total=n_frames, initial=progress.completed_frames) as progress_bar:
+        while progress.completed_frames < n_frames:
+            predictions = pose_runner.inference(images=itertools.islice(frames, chunk_frames))
+            if not predictions:
+                break
+            append_chunk(
+                values=np.stack([prediction["bodyparts"][0, :, :3] for prediction in predictions]),
+                progress=progress,
+                output_path=output_path,
+                output_prefix=output_prefix,
             )
+            progress_bar.update(len(predictions))
+            if len(predictions) < chunk_frames:
+                break
+    runtime = (runtime_start, time.time())
+
+    if progress.completed_frames != n_frames:
+        logging.warning(
+            f"The video metadata indicates that there are {n_frames} frames in {video}, but only "
+            f"{progress.completed_frames} were able to be processed. This can happen if the video is corrupted."
+        )
 
-            if auto_track:
-                convert_detections2tracklets(
-                    config=config,
-                    videos=str(video),
-                    videotype=videotype,
-                    shuffle=shuffle,
-                    trainingsetindex=trainingsetindex,
-                    overwrite=False,
-                    identity_only=identity_only,
-                    destfolder=str(output_path),
-                )
-                stitch_tracklets(
-                    config,
-                    [str(video)],
-                    videotype,
-                    shuffle,
-                    trainingsetindex,
-                    n_tracks=n_tracks,
-                    animal_names=animal_names,
-                    destfolder=str(output_path),
-                    save_as_csv=save_as_csv,
-                )
+    save_video_metadata(
+        output_path=output_path,
+        output_prefix=output_prefix,
+        video_iterator=video_iterator,
+        runtime=runtime,
+        cfg=cfg,
+        model_cfg=model_cfg,
+        dlc_scorer=dlc_scorer,
+        train_fraction=train_fraction,
+        batch_size=batch_size,
+        cropping=cropping,
+        robust_nframes=robust_nframes,
+    )
+    write_chunked_predictions(
+        progress=progress,
+        output_path=output_path,
+        output_prefix=output_prefix,
+        save_as_csv=save_as_csv,
+        rows_per_write=chunk_frames,
+    )
+
+
+def _move_video_iterator_to_frame(video_iterator: VideoIterator, frame_index: int) -> None:
+    """Seek to `frame_index`, or grab forward from the start if the seek doesn't land exactly there."""
+    video_iterator.set_to_frame(frame_index)
+    if int(video_iterator.video.get(cv2.CAP_PROP_POS_FRAMES)) == frame_index:
+        return
+    video_iterator.set_to_frame(0)
+    for _ in range(frame_index):
+        if not video_iterator.video.grab():
+            break
+
+
+def analyze_video_frames_dlc(
+    video: Path,
+    frame_selection: InferenceFrameSelection,
+    pose_runner: InferenceRunner,
+    detector_runner: InferenceRunner | None,
+    cropping: list[int] | None,
+    model_cfg: dict,
+    dlc_scorer: str,
+    destfolder: str | None,
+    save_as_csv: bool,
+) -> None:
+    """Analyze the frames of one video picked by `frame_selection` and save predictions indexed by frame number."""
+    output_path, output_prefix, _ = _get_output_paths(video, destfolder, dlc_scorer)
+    video_iterator = SparseVideoIterator(video, cropping=cropping)
+    video_iterator.select_frames(frame_selection.get_frame_indices(video, video_iterator.get_n_frames()))
+    num_frames = len(video_iterator.frame_indices)
+    if num_frames == 0:
+        print(f"No frames selected in {video}, skipping")
+        return
+    print(f"Analyzing {num_frames} of {video_iterator.get_n_frames()} frames of {video}")
+
+    if detector_runner is not None:
+        bbox_predictions = detector_runner.inference(images=tqdm(video_iterator, total=num_frames))
+        video_iterator.set_context(bbox_predictions)
+    predictions = pose_runner.inference(images=tqdm(video_iterator, total=num_frames))
+    if len(predictions) != num_frames:
+        logging.warning(f"Only {len(predictions)} of {num_frames} selected frames could be read from {video}")
+
+    save_sparse_predictions(
+        predictions=predictions,
+        frame_indices=video_iterator.frame_indices[:len(predictions)],
+        model_cfg=model_cfg,
+        dlc_scorer=dlc_scorer,
+        output_path=output_path,
+        output_prefix=f"{output_prefix}{SPARSE_OUTPUT_SUFFIX}",
+        save_as_csv=save_as_csv,
+    )
+
+
+def save_sparse_predictions(
+    predictions: list[dict[str, np.ndarray]],
+    frame_indices: list[int],
+    model_cfg: dict,
+    dlc_scorer: str,
+    output_path: Path,
+    output_prefix: str,
+    save_as_csv: bool,
+) -> pd.DataFrame:
+    """Save single animal predictions in DLC's h5/csv layout, with rows indexed by frame number."""
+    bodyparts = model_cfg["metadata"]["bodyparts"]
+    columns = pd.MultiIndex.from_product(
+        [[dlc_scorer], bodyparts, ["x", "y", "likelihood"]], names=["scorer", "bodyparts", "coords"]
+    )
+    pose = np.stack([prediction["bodyparts"][0, :, :3] for prediction in predictions])
+    df = pd.DataFrame(pose.reshape(len(pose), -1), columns=columns, index=frame_indices)
+
+    output_h5 = output_path / f"{output_prefix}.h5"
+    print(f"Saving predictions for {len(frame_indices)} frames in {output_h5}")
+    df.to_hdf(output_h5, key="df_with_missing", format="table", mode="w")
+    if save_as_csv:
+        df.to_csv(output_h5.with_suffix(".csv"))
+    return df
+
+
+def _get_output_paths(video: Path, destfolder: str | None, dlc_scorer: str) -> tuple[Path, str, Path]:
+    if destfolder is None:
+        output_path = video.parent
+    else:
+        output_path = Path(destfolder)
+
+    output_prefix = video.stem + dlc_scorer
+    output_pkl = output_path / f"{output_prefix}_full.pickle"
+    return output_path, output_prefix, output_pkl
+
+
+def save_video_metadata(
+    output_path: Path,
+    output_prefix: str,
+    video_iterator: VideoIterator,
+    runtime: tuple[float, float],
+    cfg: dict,
+    model_cfg: dict,
+    dlc_scorer: str,
+    train_fraction: float,
+    batch_size: int,
+    cropping: list[int] | None,
+    robust_nframes: bool,
+) -> None:
+    """Write DLC's {video}{scorer}_meta.pickle, describing the video and the analysis run."""
+    metadata = _generate_metadata(
+        cfg=cfg,
+        pytorch_config=model_cfg,
+        dlc_scorer=dlc_scorer,
+        train_fraction=train_fraction,
+        batch_size=batch_size,
+        cropping=cropping,
+        runtime=runtime,
+        video=video_iterator,
+        robust_nframes=robust_nframes,
+    )
+    with open(output_path / f"{output_prefix}_meta.pickle", "wb") as f:
+        pickle.dump(metadata, f, pickle.HIGHEST_PROTOCOL)
+
+
+def save_video_predictions(
+    config,
+    videotype,
+    shuffle,
+    trainingsetindex,
+    save_as_csv,
+    destfolder,
+    cropping,
+    robust_nframes,
+    use_shelve,
+    auto_track,
+    n_tracks,
+    animal_names,
+    identity_only,
+    batch_size,
+    save_as_df,
+    cfg,
+    train_fraction,
+    model_cfg,
+    pose_cfg,
+    multi_animal,
+    bodyparts,
+    unique_bodyparts,
+    dlc_scorer,
+    video,
+    video_iterator,
+    predictions,
+    runtime,
+):
+    """Write the DLC output files (metadata, full pickle, h5/csv, tracklets) for one video's predictions."""
+    output_path, output_prefix, output_pkl = _get_output_paths(video, destfolder, dlc_scorer)
+
+    save_video_metadata(
+        output_path=output_path,
+        output_prefix=output_prefix,
+        video_iterator=video_iterator,
+        runtime=runtime,
+        cfg=cfg,
+        model_cfg=model_cfg,
+        dlc_scorer=dlc_scorer,
+        train_fraction=train_fraction,
+        batch_size=batch_size,
+        cropping=cropping,
+        robust_nframes=robust_nframes,
+    )
+
+    if use_shelve and save_as_df:
+        print("Can't ``save_as_df`` as ``use_shelve=True``. Skipping.")
+
+    if not use_shelve:
+        output_data = _generate_output_data(pose_cfg, predictions)
+        with open(output_pkl, "wb") as f:
+            pickle.dump(output_data, f, pickle.HIGHEST_PROTOCOL)
+
+        if save_as_df:
+            create_df_from_prediction(
+                predictions=predictions,
+                multi_animal=multi_animal,
+                model_cfg=model_cfg,
+                dlc_scorer=dlc_scorer,
+                output_path=output_path,
+                output_prefix=output_prefix,
+                save_as_csv=save_as_csv,
+            )
+
+    if multi_animal:
+        _generate_assemblies_file(
+            full_data_path=output_pkl,
+            output_path=output_path / f"{output_prefix}_assemblies.pickle",
+            num_bodyparts=len(bodyparts),
+            num_unique_bodyparts=len(unique_bodyparts),
+        )
+
+        if auto_track:
+            convert_detections2tracklets(
+                config=config,
+                videos=str(video),
+                videotype=videotype,
+                shuffle=shuffle,
+                trainingsetindex=trainingsetindex,
+                overwrite=False,
+                identity_only=identity_only,
+                destfolder=str(output_path),
+            )
+            stitch_tracklets(
+                config,
+                [str(video)],
+                videotype,
+                shuffle,
+                trainingsetindex,
+                n_tracks=n_tracks,
+                animal_names=animal_names,
+                destfolder=str(output_path),
+                save_as_csv=save_as_csv,
+            )
@@ -1,14 +1,69 @@
 import logging
-import shutil
+import os
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from pathlib import Path
+from typing import Iterator
 
 import cv2
+import numpy as np
 import pandas as pd
+from pydantic import BaseModel
 
+from skellyclicker.core.click_data_handler.data_handler import load_interpolated_flags
 from skellyclicker.core.deeplabcut_handler.create_deeplabcut.create_deeplabcut_config import HUMAN_EXPERIMENTER_NAME
+from skellyclicker.core.deeplabcut_handler.file_fingerprints import fingerprint_file, hash_file
+from skellyclicker.core.deeplabcut_handler.video_iterators import MAX_GRAB_GAP_FRAMES
 
 logger = logging.getLogger(__name__)
 
+EXTRACTED_FRAMES_MANIFEST_NAME = "skellyclicker_extracted_frames.json"
+LABELED_IMAGE_PATTERN = "img*.png"
+# decoded frames waiting for the PNG writers, per video (a 1080p BGR frame is ~6 MB)
+MAX_PENDING_PNG_WRITES = 32
+
+
+class ExtractedFramesManifest(BaseModel):
+    """The frames extracted into a labeled-data folder: which video they came from and the hash of each image.
+
+    Kept next to the images so the next training iteration only extracts frames labeled since, deletes frames
+    no longer labeled and re-extracts images that were changed or deleted by hand.
+    """
+
+    video_fingerprint: str
+    image_hashes: dict[int, str] = {}
+
+    @classmethod
+    def load(cls, labeled_data_folder: Path) -> "ExtractedFramesManifest | None":
+        manifest_path = labeled_data_folder / EXTRACTED_FRAMES_MANIFEST_NAME
+        if not manifest_path.is_file():
+            return None
+        try:
+            return cls.model_validate_json(manifest_path.read_text())
+        except ValueError:
+            logger.warning(f"Ignoring unreadable labeled frames manifest {manifest_path}")
+            return None
+
+    def save(self, labeled_data_folder: Path) -> None:
+        (labeled_data_folder / EXTRACTED_FRAMES_MANIFEST_NAME).write_text(self.model_dump_json(indent=2))
+
+
+def get_labeled_image_name(frame_number: int) -> str:
+    return f'img{frame_number:05d}.png'
+
+
+def get_reusable_frames(labeled_data_folder: Path, manifest: ExtractedFramesManifest | None,
+                        video_fingerprint: str) -> dict[int, str]:
+    """Image hashes of the frames in the folder that were extracted from this same video and are unchanged."""
+    if manifest is None or manifest.video_fingerprint != video_fingerprint:
+        return {}
+    reusable_frames = {}
+    for frame_number, image_hash in manifest.image_hashes.items():
+        image_path = labeled_data_folder / get_labeled_image_name(frame_number)
+        if image_path.is_file() and hash_file(image_path) == image_hash:
+            reusable_frames[frame_number] = image_hash
+    return reusable_frames
+
 
 def build_dlc_formatted_header(labels_dataframe: pd.DataFrame, scorer_name: str):
     """Creates a dataframe with MultiIndex columns in DLC format"""
@@ -29,6 +84,22 @@ def build_dlc_formatted_header(labels_dataframe: pd.DataFrame, scorer_name: str)
 
     return header_df, joint_names
 
+def drop_interpolated_labels(labels_dataframe: pd.DataFrame, path_to_image_labels_csv: str) -> pd.DataFrame:
+    """Blank out points that were filled in by interpolation, so only clicked labels are used for training"""
+    interpolated = load_interpolated_flags(path_to_image_labels_csv)
+    if interpolated is None:
+        return labels_dataframe
+    labels_dataframe = labels_dataframe.set_index(["video", "frame"])
+    interpolated = interpolated.reindex(index=labels_dataframe.index, fill_value=False)
+    for point_name in interpolated.columns:
+        for axis in ("x", "y"):
+            column_name = f"{point_name}_{axis}"
+            if column_name in labels_dataframe.columns:
+                labels_dataframe.loc[interpolated[point_name].to_numpy(), column_name] = float("nan")
+    logger.info(f"Excluding {int(interpolated.to_numpy().sum())} interpolated points from training data")
+    return labels_dataframe.reset_index()
+
+
 def get_session_name(path_to_videos_for_training: str) -> str:
     path_parts = Path(path_to_videos_for_training).parts
     for part in path_parts:
@@ -42,80 +113,188 @@ def get_session_name(path_to_videos_for_training: str) -> str:
     raise ValueError(f"Session name not found in path: {path_to_videos_for_training} - must include string 'session'")
 
 
+def read_frames_in_order(video_path: Path, frame_numbers: list[int]) -> Iterator[tuple[int, np.ndarray]]:
+    """Decode the given frames of a video in increasing order, yielding (frame number, BGR frame).
+
+    Frames are read sequentially, grabbing (decoding without converting) the frames in between, and only gaps
+    longer than MAX_GRAB_GAP_FRAMES are seeked over. A seek decodes from the previous keyframe anyway, so this
+    reads the same frames as a cap.set()/cap.read() per frame, like skellyclicker's viewer, at a fraction of the
+    decoding.
+    """
+    cap = cv2.VideoCapture(str(video_path))
+    capture_position: int | None = 0
+    try:
+        for frame_number in sorted(frame_numbers):
+            if (capture_position is None or frame_number < capture_position
+                    or frame_number - capture_position > MAX_GRAB_GAP_FRAMES):
+                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+                capture_position = frame_number
+            while capture_position < frame_number and cap.grab():
+                capture_position += 1
+            ret, frame = cap.read()
+            if not ret or capture_position != frame_number:
+                logger.warning(f"Could not read frame {frame_number} from {video_path}, skipping")
+                # the capture position is unknown after a failed read, seek to the next frame
+                capture_position = None
+                continue
+            capture_position = frame_number + 1
+            yield frame_number, frame
+    finally:
+        cap.release()
+
+
+def _write_labeled_image(image_path: Path, frame: np.ndarray) -> str:
+    cv2.imwrite(filename=str(image_path), img=frame)
+    return hash_file(image_path)
+
+
+def extract_labeled_frames(video_path: Path,
+                           frame_numbers: list[int],
+                           labeled_data_folder: Path,
+                           png_writer_pool: ThreadPoolExecutor) -> dict[int, str]:
+    """Write the frames as PNGs into the labeled-data folder, returning each written image's hash.
+
+    Frames are decoded in order on this thread while `png_writer_pool` encodes them, with at most
+    MAX_PENDING_PNG_WRITES decoded frames waiting to be written.
+    """
+    image_hashes = {}
+    pending_writes: deque[tuple[int, Future]] = deque()
+
+    def finish_oldest_write() -> None:
+        frame_number, write = pending_writes.popleft()
+        image_hashes[frame_number] = write.result()
+
+    for frame_number, frame in read_frames_in_order(video_path, frame_numbers):
+        if len(pending_writes) >= MAX_PENDING_PNG_WRITES:
+            finish_oldest_write()
+        image_path = labeled_data_folder / get_labeled_image_name(frame_number)
+        pending_writes.append((frame_number, png_writer_pool.submit(_write_labeled_image, image_path, frame)))
+    while pending_writes:
+        finish_oldest_write()
+    return image_hashes
+
+
+def build_dlc_labels_table(labeled_rows: pd.DataFrame,
+                           header_df: pd.DataFrame,
+                           joint_names: list[str],
+                           combined_name: str) -> pd.DataFrame:
+    """The DLC CollectedData table of a video's labeled rows, indexed by image path, in one construction."""
+    labeled_rows = labeled_rows.drop_duplicates(subset="frame", keep="last")
+    image_paths = [f"labeled-data/{combined_name}/{get_labeled_image_name(int(frame_number))}"
+                   for frame_number in labeled_rows["frame"]]
+    # header columns are (scorer, joint, x), (scorer, joint, y) for each joint, in this order
+    label_columns = [f"{joint}_{axis}" for joint in joint_names for axis in ("x", "y")]
+    return pd.DataFrame(
+        labeled_rows[label_columns].to_numpy(dtype=float),
+        index=image_paths,
+        columns=header_df.columns,
+    )
+
+
+def save_dlc_labels_table(df: pd.DataFrame, labeled_data_folder: Path, scorer_name: str) -> None:
+    """Write a video's CollectedData csv and h5. PyTables isn't thread safe, so only call this from one thread."""
+    # Save the CSV file
+    output_csv_path = labeled_data_folder / f'CollectedData_{scorer_name}.csv'
+    df.to_csv(output_csv_path)
+
+    # Save the H5 file
+    output_h5_path = labeled_data_folder / f'CollectedData_{scorer_name}.h5'
+    df.to_hdf(str(output_h5_path), key="df_with_missing", format="table", mode="w")
+
+    logger.info(f'Saved DLC formatted CSV to {output_csv_path}')
+    logger.info(f'Saved DLC formatted H5 to {output_h5_path}')
+
+
+def fill_in_video_labelled_data(video_name: str,
+                                video_df: pd.DataFrame,
+                                path_to_videos_for_training: str,
+                                path_to_dlc_project_folder: str,
+                                header_df: pd.DataFrame,
+                                joint_names: list[str],
+                                png_writer_pool: ThreadPoolExecutor) -> tuple[Path, pd.DataFrame, list[int]]:
+    """Bring one video's labeled-data folder images up to date with its labels.
+
+    Returns the folder, the video's DLC labels table for `save_dlc_labels_table` and the frames in the table.
+    """
+    video_name_wo_extension = str(video_name).split('.')[0]
+    session_name = get_session_name(path_to_videos_for_training)
+    combined_name = f"{session_name}_{video_name_wo_extension}"
+    dlc_video_folder_path = Path(path_to_dlc_project_folder) / 'labeled-data' / combined_name
+    dlc_video_folder_path.mkdir(parents=True, exist_ok=True)
+
+    video_path = Path(path_to_videos_for_training) / f"{video_name}"
+    if not video_path.exists():
+        raise FileNotFoundError(f"Video file not found: {video_path}")
+
+    labeled_rows = video_df[~video_df.iloc[:, 2:].isna().all(axis=1)]
+    target_frames = {int(frame_number) for frame_number in labeled_rows["frame"]}
+
+    video_fingerprint = fingerprint_file(video_path)
+    image_hashes = get_reusable_frames(
+        dlc_video_folder_path, ExtractedFramesManifest.load(dlc_video_folder_path), video_fingerprint
+    )
+    image_hashes = {frame_number: image_hash for frame_number, image_hash in image_hashes.items()
+                    if frame_number in target_frames}
+
+    # Stale images from prior iterations (unlabeled since, or from a replaced video) must not persist
+    kept_image_names = {get_labeled_image_name(frame_number) for frame_number in image_hashes}
+    removed_images = [image_path for image_path in dlc_video_folder_path.glob(LABELED_IMAGE_PATTERN)
+                      if image_path.name not in kept_image_names]
+    for image_path in removed_images:
+        image_path.unlink()
+
+    frames_to_extract = sorted(target_frames - set(image_hashes))
+    logger.info(f'Extracting {len(frames_to_extract)} new labeled frames from {video_path}, '
+                f'reusing {len(image_hashes)}, removed {len(removed_images)}')
+    image_hashes.update(extract_labeled_frames(video_path, frames_to_extract, dlc_video_folder_path, png_writer_pool))
+
+    ExtractedFramesManifest(
+        video_fingerprint=video_fingerprint, image_hashes=dict(sorted(image_hashes.items()))
+    ).save(dlc_video_folder_path)
+
+    # The table is rebuilt from the labels every time, so label edits on reused frames are picked up
+    labeled_rows = labeled_rows[labeled_rows["frame"].astype(int).isin(image_hashes)]
+    df = build_dlc_labels_table(labeled_rows, header_df, joint_names, combined_name)
+    return dlc_video_folder_path, df, [int(frame_number) for frame_number in labeled_rows["frame"]]
+
+
 def fill_in_labelled_data_folder(path_to_videos_for_training: str,
                                  path_to_dlc_project_folder: str,
                                  path_to_image_labels_csv: str,
-                                 scorer_name: str = HUMAN_EXPERIMENTER_NAME
+                                 scorer_name: str = HUMAN_EXPERIMENTER_NAME,
+                                 exclude_interpolated: bool = False,
                                  ):
     labels_dataframe = pd.read_csv(path_to_image_labels_csv)
+    if exclude_interpolated:
+        labels_dataframe = drop_interpolated_labels(labels_dataframe, path_to_image_labels_csv)
     per_video_dataframe = dict(
         tuple(labels_dataframe.groupby("video")))  # create dataframe per video (to simplify indexing below)
 
     header_df, joint_names = build_dlc_formatted_header(labels_dataframe=labels_dataframe, scorer_name=scorer_name)
 
+    # decoding and PNG encoding both release the GIL, so videos are decoded on threads of their own while a
+    # shared pool encodes their frames. PyTables isn't thread safe, the labels tables are saved from this thread.
+    max_workers = os.cpu_count() or 1
     labeled_frames_per_video = {}
-    for video_name, video_df in per_video_dataframe.items():
-        video_name_wo_extension = str(video_name).split('.')[0]
-        session_name = get_session_name(path_to_videos_for_training)
-        combined_name = f"{session_name}_{video_name_wo_extension}"
-        dlc_video_folder_path = Path(path_to_dlc_project_folder) / 'labeled-data' / combined_name
-        if dlc_video_folder_path.exists():
-            shutil.rmtree(dlc_video_folder_path)
-        dlc_video_folder_path.mkdir(parents=True)
-
-        video_path = Path(path_to_videos_for_training) / f"{video_name}"
-        if not video_path.exists():
-            raise FileNotFoundError(f"Video file not found: {video_path}")
-
-        cap = cv2.VideoCapture(str(video_path))
-        labeled_frames = []
-
-        # Initialize a DataFrame with the MultiIndex structure
-        df = header_df.copy()
-
-        logger.info(f'Looking for labeled frames for {video_path}')
-
-        labeled_rows = video_df[~video_df.iloc[:, 2:].isna().all(axis=1)]
-        for _, row in labeled_rows.iterrows():
-            frame_number = int(row["frame"])
-
-            # Seek to the exact frame — must match skellyclicker's cap.set()/cap.read() behavior
-            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
-            ret, frame = cap.read()
-            if not ret:
-                logger.warning(f"Could not read frame {frame_number} from {video_path}, skipping")
-                continue
-
-            labeled_frames.append(frame_number)
-
-            image_name = f'img{frame_number:05d}.png'
-            image_save_path = dlc_video_folder_path / image_name
-            # Always overwrite: stale images from prior iterations must not persist
-            cv2.imwrite(filename=str(image_save_path), img=frame)
-
-            image_path = f"labeled-data/{combined_name}/{image_name}"
-
-            frame_data = {}
-            for joint in joint_names:
-                frame_data[(scorer_name, joint, 'x')] = row[f"{joint}_x"]
-                frame_data[(scorer_name, joint, 'y')] = row[f"{joint}_y"]
-
-            df.loc[image_path] = frame_data
-
-        cap.release()
-
-        # Save the CSV file 
-        output_csv_path = dlc_video_folder_path / f'CollectedData_{scorer_name}.csv'
-        df.to_csv(output_csv_path)
-
-        # Save the H5 file
-        output_h5_path = dlc_video_folder_path / f'CollectedData_{scorer_name}.h5'
-        df.to_hdf(str(output_h5_path), key="df_with_missing", format="table", mode="w")
-
-        logger.info(f'Saved DLC formatted CSV to {output_csv_path}')
-        logger.info(f'Saved DLC formatted H5 to {output_h5_path}')
-
-        labeled_frames_per_video[video_name] = labeled_frames
+    with ThreadPoolExecutor(max_workers=max_workers) as png_writer_pool, \
+            ThreadPoolExecutor(max_workers=max(1, min(len(per_video_dataframe), max_workers))) as video_pool:
+        futures = {
+            video_pool.submit(
+                fill_in_video_labelled_data,
+                video_name=video_name,
+                video_df=video_df,
+                path_to_videos_for_training=path_to_videos_for_training,
+                path_to_dlc_project_folder=path_to_dlc_project_folder,
+                header_df=header_df,
+                joint_names=joint_names,
+                png_writer_pool=png_writer_pool,
+            ): video_name
+            for video_name, video_df in per_video_dataframe.items()
+        }
+        for future in as_completed(futures):
+            dlc_video_folder_path, df, labeled_frames = future.result()
+            save_dlc_labels_table(df, dlc_video_folder_path, scorer_name)
+            labeled_frames_per_video[futures[future]] = labeled_frames
 
     logger.info("\n=== Summary of Labeled Frames ===")
     for video, frames in labeled_frames_per_video.items():
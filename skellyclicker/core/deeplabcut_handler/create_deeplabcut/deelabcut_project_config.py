@@ -52,6 +52,19 @@ class DeeplabcutTrainingConfig(BaseModel):
     save_epochs: int = 20  # this is the new equivalent of 'save_iters' for PyTorch
     batch_size: int = 1  # this seems to be similar to batch/multi processing (higher number = faster if your gpu can handle it?)
     learning_rate: float = 0.0001  # DLC default, changing this could help with sessions that won't train
+
+    # Warm start settings
+    warm_start: bool = False  # start from the previous iteration's best snapshot instead of ImageNet weights
+    warm_start_epochs: int = 30  # shorter fine-tuning schedule used when warm starting, replaces epochs
+
+    # Early stopping settings
+    early_stopping: bool = False  # validate on the test split in rounds, stop once the RMSE no longer improves
+    validation_interval_epochs: int = 10  # epochs per training round, each followed by a validation
+    early_stopping_patience: int = 3  # validation rounds in a row without improvement before stopping
+    early_stopping_min_improvement: float = 0.1  # test RMSE pixels a round must gain to count as an improvement
+
+    # Data settings
+    exclude_interpolated_labels: bool = False  # train only on clicked labels, not ones filled in by interpolation
     
     @classmethod
     def from_config(cls, config: dict, epochs: int = 200, save_epochs: int = 20):
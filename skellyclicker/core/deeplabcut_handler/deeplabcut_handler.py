@@ -2,18 +2,23 @@ from datetime import datetime
 import json
 import logging
 import math
-import cv2
+import os
 import deeplabcut
 from deeplabcut import DEBUG
 from deeplabcut.utils import auxiliaryfunctions
 from multiprocessing import Pool
 from pathlib import Path
-import pandas as pd
+import numpy as np
 from pydantic import BaseModel
 from time import perf_counter_ns
 
 from skellyclicker.core.click_data_handler.data_handler import DataHandler
 from skellyclicker.core.video_handler.image_annotator import ImageAnnotator, ImageAnnotatorConfig
+from skellyclicker.core.video_handler.video_export import (
+    LabelOverlay,
+    VideoExportConfig,
+    export_annotated_video,
+)
 from skellyclicker.core.deeplabcut_handler.create_deeplabcut.create_deeplabcut_config import (
     create_new_deeplabcut_project,
 )
@@ -23,11 +28,33 @@ from skellyclicker.core.deeplabcut_handler.create_deeplabcut.create_deeplabcut_p
 from skellyclicker.core.deeplabcut_handler.create_deeplabcut.deelabcut_project_config import (
     DeeplabcutTrainingConfig,
 )
-from skellyclicker.core.deeplabcut_handler.analyze_videos_dlc import analyze_videos_dlc
+from skellyclicker.core.deeplabcut_handler.analyze_videos_dlc import (
+    analyze_videos_dlc,
+    analyze_videos_multi_model_dlc,
+)
+from skellyclicker.core.deeplabcut_handler.early_stopping import train_with_early_stopping
+from skellyclicker.core.deeplabcut_handler.frame_selection import SPARSE_OUTPUT_SUFFIX, InferenceFrameSelection
+from skellyclicker.core.deeplabcut_handler.inference_cache import INFERENCE_CACHE_FOLDER_NAME
+from skellyclicker.core.deeplabcut_handler.inference_checkpoints import DEFAULT_CHUNK_FRAMES
+from skellyclicker.core.deeplabcut_handler.inference_client import InferenceClient, is_inference_server_requested
+from skellyclicker.core.deeplabcut_handler.merge_predictions import merge_dlc_outputs
+from skellyclicker.core.deeplabcut_handler.onnx_backend import InferenceBackend, QuantizationMode
+from skellyclicker.core.deeplabcut_handler.prediction_filters import PredictionFilterConfig
+from skellyclicker.core.deeplabcut_handler.runner_cache import InferenceRunnerCache
+from skellyclicker.core.deeplabcut_handler.training_snapshots import (
+    create_warm_start_snapshot,
+    find_best_snapshot,
+    get_shortened_schedule_updates,
+    get_train_folder,
+    is_warm_start_compatible,
+    load_training_metadata,
+    save_training_metadata,
+)
 
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_INFERENCE_BATCH_SIZE = 8  # 16 is too high for 5 mocap videos analyzed in parallel
 
 class PointConnection(BaseModel):
     parent: str
@@ -148,6 +175,7 @@ class DeeplabcutHandler(BaseModel):
             path_to_videos_for_training=str(video_folder),
             path_to_dlc_project_folder=str(parent_directory),
             path_to_image_labels_csv=labels_csv_path,
+            exclude_interpolated=training_config.exclude_interpolated_labels,
         )
 
         logger.info(f"Creating training dataset with net type: {training_config.model_type}...")
@@ -168,18 +196,76 @@ class DeeplabcutHandler(BaseModel):
         }
         if training_config.hflip_augmentation:
             pytorch_cfg_updates["data.train.hflip"] = True
+
+        train_folder = get_train_folder(self.project_config_path)
+        epochs = training_config.epochs
+        save_epochs = training_config.save_epochs
+        warm_start_snapshot_path = None
+        source_snapshot_path = self._find_warm_start_snapshot(train_folder) if training_config.warm_start else None
+        if source_snapshot_path is not None:
+            print(f"Warm starting from {source_snapshot_path}, fine-tuning for {training_config.warm_start_epochs} epochs")
+            warm_start_snapshot_path = create_warm_start_snapshot(source_snapshot_path, train_folder)
+            epochs = training_config.warm_start_epochs
+            save_epochs = min(save_epochs, epochs)
+            pytorch_cfg_updates.update(get_shortened_schedule_updates(train_folder, epochs, training_config.epochs))
+        elif training_config.warm_start:
+            print("No compatible snapshot from a previous iteration, training from ImageNet weights")
+
         logger.info("Training model...")
-        logger.info(f"With config: epochs={training_config.epochs}, save epochs={training_config.save_epochs}, batch_size={training_config.batch_size}, learning_rate={training_config.learning_rate}")
+        logger.info(f"With config: epochs={epochs}, save epochs={save_epochs}, batch_size={training_config.batch_size}, learning_rate={training_config.learning_rate}")
         start_time = perf_counter_ns()
-        deeplabcut.train_network(
-            self.project_config_path,
-            epochs=training_config.epochs,
-            save_epochs=training_config.save_epochs,
-            batch_size=training_config.batch_size,
-            pytorch_cfg_updates=pytorch_cfg_updates
-        )
+        validation_curve = None
+        if training_config.early_stopping:
+            validation_curve = train_with_early_stopping(
+                self.project_config_path,
+                train_folder=train_folder,
+                epochs=epochs,
+                validation_interval_epochs=training_config.validation_interval_epochs,
+                patience=training_config.early_stopping_patience,
+                min_improvement=training_config.early_stopping_min_improvement,
+                batch_size=training_config.batch_size,
+                snapshot_path=warm_start_snapshot_path,
+                pytorch_cfg_updates=pytorch_cfg_updates,
+            )
+            epochs = validation_curve.rounds[-1].epoch
+        else:
+            deeplabcut.train_network(
+                self.project_config_path,
+                epochs=epochs,
+                save_epochs=save_epochs,
+                batch_size=training_config.batch_size,
+                snapshot_path=warm_start_snapshot_path,
+                pytorch_cfg_updates=pytorch_cfg_updates
+            )
         end_time = perf_counter_ns()
-        print(f"Model training took {(end_time-start_time)/1e9} seconds over {training_config.epochs} epochs ({(end_time-start_time)/(1e9*training_config.epochs)} s per epoch)")
+        print(f"Model training took {(end_time-start_time)/1e9} seconds over {epochs} epochs ({(end_time-start_time)/(1e9*epochs)} s per epoch)")
+
+        metadata_path = save_training_metadata(
+            train_folder,
+            {
+                "iteration": self.iteration,
+                "training_datetime": datetime.now().isoformat(),
+                "training_seconds": (end_time - start_time) / 1e9,
+                "epochs": epochs,
+                "training_config": training_config.model_dump(),
+                "warm_start_snapshot": str(source_snapshot_path) if source_snapshot_path is not None else None,
+                "best_epoch": validation_curve.best_epoch if validation_curve is not None else None,
+                "stopped_early": validation_curve.stopped_early if validation_curve is not None else None,
+            },
+        )
+        print(f"Saved training metadata to {metadata_path}")
+
+    def _find_warm_start_snapshot(self, train_folder: Path) -> Path | None:
+        """The best snapshot of the latest earlier iteration with one, if the new model can start from it."""
+        for iteration in range(self.iteration - 1, -1, -1):
+            source_train_folder = get_train_folder(self.project_config_path, iteration=iteration)
+            source_snapshot_path = find_best_snapshot(source_train_folder)
+            if source_snapshot_path is None:
+                continue
+            if not is_warm_start_compatible(source_train_folder, train_folder):
+                return None
+            return source_snapshot_path
+        return None
 
     def analyze_videos(
         self,
@@ -187,8 +273,72 @@ class DeeplabcutHandler(BaseModel):
         output_folder: str | Path,
         annotate_videos: bool = False,
         filter_videos: bool = True,
+        batch_size: int | None = None,
+        cross_camera_batching: bool = False,
+        use_inference_cache: bool = True,
+        auto_tune_inference: bool = False,
+        frame_selection: InferenceFrameSelection | None = None,
+        filter_config: PredictionFilterConfig | None = None,
+        chunk_frames: int | None = DEFAULT_CHUNK_FRAMES,
+        backend: InferenceBackend = "pytorch",
+        quantization: QuantizationMode | None = None,
+        max_quantized_pixel_error: float | None = None,
+        use_inference_server: bool | None = None,
+        runner_cache: InferenceRunnerCache | None = None,
     ) -> str:
-        config = auxiliaryfunctions.read_config(self.project_config_path)
+        """Analyze videos with the project's model and merge the predictions into a skellyclicker labels csv.
+
+        A `batch_size` of None falls back to DEFAULT_INFERENCE_BATCH_SIZE. Turn on `auto_tune_inference` to use
+        the batch size and worker count tuned for this machine instead, the first such run calibrates them, which
+        starts a few worker pools and takes up to a couple of minutes (see `calibrate_inference`).
+
+        A `frame_selection` analyzes only every Nth frame, a frame range or the human labeled frames, for a quick
+        look at a new iteration. The result is a sparse machine labels csv that the viewer overlays as usual,
+        predictions are not filtered or plotted.
+
+        With `filter_videos`, predictions are filtered in memory between inference and the merge, with
+        `filter_config` or a 5 frame median filter by default.
+
+        Inference runs in checkpointed chunks of `chunk_frames` frames, so a crashed or interrupted run picks up
+        from the last completed chunk of each video and long recordings don't need more memory. None predicts
+        each video in one go.
+
+        `backend="onnx"` runs the pose model through onnxruntime on CPU, for machines without a GPU. The snapshot
+        is exported once next to itself and checked against PyTorch before use, see `prepare_onnx_backend`.
+        A `quantization` of "dynamic" or "static" runs an int8 variant of it instead, calibrated on the project's
+        labeled-data. Its speedup and per-bodypart pixel error against full precision are printed and saved next
+        to the snapshot, and it is skipped if any bodypart's mean error is over `max_quantized_pixel_error`.
+
+        With `use_inference_server`, the job is handed to a running inference server (see
+        `skellyclicker/scripts/run_inference_server.py`) if there is one, which keeps recently used models loaded
+        between jobs, and its progress is printed here. It is off by default, None opts in when the
+        SKELLYCLICKER_USE_INFERENCE_SERVER environment variable is set to 1. Otherwise the videos are analyzed in
+        this process, reusing models from `runner_cache` if given.
+        """
+        if use_inference_server is None:
+            use_inference_server = is_inference_server_requested()
+        if use_inference_server and (client := InferenceClient.connect()) is not None:
+            print(f"Submitting analysis of {len(video_paths)} videos to the inference server at {client.address}")
+            return client.analyze(
+                project_config_path=self.project_config_path,
+                video_paths=video_paths,
+                output_folder=output_folder,
+                annotate_videos=annotate_videos,
+                filter_videos=filter_videos,
+                batch_size=batch_size,
+                cross_camera_batching=cross_camera_batching,
+                use_inference_cache=use_inference_cache,
+                auto_tune_inference=auto_tune_inference,
+                frame_selection=frame_selection.model_dump() if frame_selection is not None else None,
+                filter_config=filter_config.model_dump() if filter_config is not None else None,
+                chunk_frames=chunk_frames,
+                backend=backend,
+                quantization=quantization,
+                max_quantized_pixel_error=max_quantized_pixel_error,
+            )
+
+        if batch_size is None and not auto_tune_inference:
+            batch_size = DEFAULT_INFERENCE_BATCH_SIZE
         Path(output_folder).mkdir(parents=True, exist_ok=True)
 
         analyze_videos_dlc(
@@ -197,24 +347,59 @@ class DeeplabcutHandler(BaseModel):
             videotype=".mp4",
             save_as_csv=True,
             destfolder = str(output_folder),
-            batch_size=8,  # 16 is too high for 5 mocap videos
+            batch_size=batch_size,
             multiprocess=True,
+            cross_camera_batching=cross_camera_batching,
+            cache_folder=(
+                Path(self.project_config_path).parent / INFERENCE_CACHE_FOLDER_NAME
+                if use_inference_cache
+                else None
+            ),
+            auto_tune=auto_tune_inference,
+            frame_selection=frame_selection,
+            chunk_frames=chunk_frames,
+            backend=backend,
+            quantization=quantization,
+            max_quantized_pixel_error=max_quantized_pixel_error,
+            runner_cache=runner_cache,
             overwrite=True
         )
 
-        if filter_videos:
-            deeplabcut.filterpredictions(
-                str(self.project_config_path),
-                video_paths,
-                videotype=".mp4",
-                filtertype="median",
-                windowlength=5,
-                destfolder=str(output_folder),
-            )
+        return self.process_predictions(
+            video_paths=video_paths,
+            output_folder=output_folder,
+            annotate_videos=annotate_videos,
+            filter_videos=filter_videos,
+            frame_selection=frame_selection,
+            filter_config=filter_config,
+        )
 
-        deeplabcut.plot_trajectories(config=self.project_config_path, videos=video_paths, filtered=filter_videos, destfolder=str(output_folder))
+    def process_predictions(
+        self,
+        video_paths: list[str],
+        output_folder: str | Path,
+        annotate_videos: bool = False,
+        filter_videos: bool = True,
+        frame_selection: InferenceFrameSelection | None = None,
+        filter_config: PredictionFilterConfig | None = None,
+    ) -> str:
+        """Filter, merge and plot the DLC outputs in `output_folder` into skellyclicker machine labels.
+
+        Returns the path of the machine labels csv, see `analyze_videos` for the parameters.
+        """
+        sparse = frame_selection is not None and not frame_selection.is_full_video
+        if sparse:
+            filter_videos = False
+        config = auxiliaryfunctions.read_config(self.project_config_path)
+
+        if filter_videos and filter_config is None:
+            filter_config = PredictionFilterConfig()
 
-        csv_path = Path(output_folder) / f"skellyclicker_machine_labels_iteration_{config['iteration']}.csv"
+        csv_path = Path(output_folder) / (
+            f"skellyclicker_machine_labels_iteration_{config['iteration']}{SPARSE_OUTPUT_SUFFIX if sparse else ''}.csv"
+        )
+        # the same labels as a typed, frame-indexed table, which loads much faster than the csv
+        h5_path = csv_path.with_suffix(".h5")
 
         video_folders = set(Path(video_path).parent for video_path in video_paths)
         if len(video_folders) > 1:
@@ -232,17 +417,25 @@ class DeeplabcutHandler(BaseModel):
             "connections": [c.model_dump() for c in self.connections] if self.connections else [],
             "video_paths": [str(v) for v in video_paths],
             "csv_path": str(csv_path),
+            "h5_path": str(h5_path),
             "output_path": str(output_folder),
+            "frame_selection": frame_selection.model_dump() if sparse else None,
+            "filter_config": filter_config.model_dump() if filter_videos else None,
+            "training": load_training_metadata(get_train_folder(self.project_config_path)),
         }
         metadata_path = Path(output_folder) / f"skellyclicker_metadata.json"
         with open(metadata_path, "w") as f:
             json.dump(metadata, f, indent=2)
         print(f"Saved annotation metadata to {metadata_path}")
 
-        self.merge_csvs_for_skellyclicker(
-            csv_folder_path=str(output_folder),
-            output_path=str(csv_path),
-            filtered=filter_videos,
+        merge_dlc_outputs(
+            folder=output_folder,
+            csv_path=csv_path,
+            h5_path=h5_path,
+            sparse=sparse,
+            filter_config=filter_config if filter_videos else None,
+            # the trajectories are plotted from the filtered predictions as they are merged
+            plot_config=config if not sparse else None,
         )
 
         if annotate_videos:
@@ -256,105 +449,94 @@ class DeeplabcutHandler(BaseModel):
 
         return str(csv_path)
 
-    def merge_csvs_for_skellyclicker(
-        self, csv_folder_path: str | Path, output_path: str | Path, filtered: bool = False
+    def annotate_videos(
+        self,
+        output_path: str | Path,
+        video_paths: list[Path],
+        csv_path: str | Path,
+        export_config: VideoExportConfig | None = None,
     ):
-        dataframe_list = []
-        csv_folder_path = Path(csv_folder_path)
-        if filtered:
-            csv_paths = csv_folder_path.glob("*_filtered.csv")
-        else:
-            csv_paths = set(csv_folder_path.glob("*.csv")).difference(set(csv_folder_path.glob("*_filtered.csv")))
-        if not csv_paths:
-            raise FileNotFoundError(
-                f"No matching CSV files found in {csv_folder_path}. Please check the path."
-            )
-        csv_paths = set(csv_paths).difference(set(csv_folder_path.glob(".csv")))
-        csv_paths = sorted(list(csv_paths))
-        for csv in csv_paths:
-            df = pd.read_csv(csv)
-
-            video_name = Path(csv).name.split("DLC_")[0]
-
-            bodyparts = df.iloc[0, :].unique()[1:]
-
-            column_names = ["frame"]
-            for bodypart in bodyparts:
-                column_names.extend(
-                    [f"{bodypart}_x", f"{bodypart}_y", f"{bodypart}_likelihood"]
-                )
-
-            df.columns = column_names
-
-            # remove first two rows
-            df = df.iloc[2:, :]
-            # TODO: consider filtering for confidence
-
-            df = df.drop(columns=[f"{bodypart}_likelihood" for bodypart in bodyparts])
-
-            df["video"] = video_name
-
-            # set frames and video as multi index
-            df = df.set_index(["video", "frame"])
-
-            print(df.head())
-
-            dataframe_list.append(df)
-
-        df = pd.concat(dataframe_list)
-        print(df)
-
-        df.to_csv(output_path)
-        print(f"Saved skellyclicker compatible CSV to {output_path}")
-
-    def annotate_videos(self, output_path: str | Path, video_paths: list[Path], csv_path: str | Path):
         print(
             f"Annotating videos {video_paths}, saving to {output_path}"
         )
-        args = [
-            (output_path, csv_path, video) for video in video_paths
-        ]
-        with Pool(processes=len(video_paths)) as pool:
+        data_handler = DataHandler.from_file(csv_path)
+        tracked_points = sorted(data_handler.tracked_points)
+        args = []
+        for video in video_paths:
+            video_name = data_handler.find_video_name(video)
+            if video_name is None:
+                logger.warning(f"No labels found for video {video.name}, skipping annotation")
+                continue
+            # slice each video's labels out once here, so workers never touch the full dataframe
+            labels = data_handler.get_video_array(video_name=video_name, point_names=tracked_points)
+            args.append((output_path, video, labels, tracked_points, export_config))
+        if not args:
+            return
+        with Pool(processes=min(len(args), os.cpu_count() or 1)) as pool:
             pool.starmap(self.annotate_single_video, args)
 
-    def annotate_single_video(self, output_path: str | Path, csv_path: str | Path, video: Path):
-        data_handler = DataHandler.from_csv(csv_path)
+    def annotate_single_video(
+        self,
+        output_path: str | Path,
+        video: Path,
+        labels: np.ndarray,
+        tracked_points: list[str],
+        export_config: VideoExportConfig | None = None,
+    ):
         annotator_config = ImageAnnotatorConfig(
                 marker_thickness=3,
                 show_names=False,
-                tracked_points=sorted(data_handler.tracked_points),
+                tracked_points=tracked_points,
                 show_clicks=False,
-                show_help=False
+                show_help=False,
+                connections=[connection.as_tuple for connection in self.connections] if self.connections else [],
             )
         image_annotator = ImageAnnotator(config=annotator_config)
 
+        export_annotated_video(
+            video_path=video,
+            output_path=Path(output_path) / video.name,
+            overlays=[LabelOverlay(annotator=image_annotator, labels=labels)],
+            config=export_config,
+        )
 
-        video_name = video.stem
-        cap = cv2.VideoCapture(str(video))
-
-        framerate = cap.get(cv2.CAP_PROP_FPS)
-        framesize = (
-                int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
-                int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
-            )
-        fourcc = cv2.VideoWriter.fourcc(*"mp4v")  # need to deal with higher frame rates
-        print(f"writing video to {str(Path(output_path) / video.name)}")
-
-        video_writer_object = cv2.VideoWriter(
-                str(Path(output_path) / video.name), fourcc, round(framerate, 2), framesize
-            )
-
-        frame_number = -1
-        while True:
-            ret, frame = cap.read()
-            frame_number += 1
-            if not ret:
-                print(f"failed to read frame {frame_number}")
-                break
 
-            click_data = data_handler.get_data_by_video_name_and_frame(video_name=video_name, frame_number=frame_number)
+def analyze_videos_with_models(
+    handlers: list[DeeplabcutHandler],
+    video_paths: list[str],
+    output_folders: list[str | Path],
+    annotate_videos: bool = False,
+    filter_videos: bool = True,
+    batch_size: int | None = None,
+    filter_config: PredictionFilterConfig | None = None,
+) -> list[str]:
+    """Analyze the same videos with several projects' models, decoding each video once for all of them.
+
+    Each model's predictions are post-processed into its own output folder exactly as `analyze_videos` does.
+    Returns the machine labels csv path of each model.
+    """
+    if len(handlers) != len(output_folders):
+        raise ValueError(f"Got {len(handlers)} models but {len(output_folders)} output folders")
+    for output_folder in output_folders:
+        Path(output_folder).mkdir(parents=True, exist_ok=True)
 
-            annotated_frame = image_annotator.annotate_single_image(image=frame, click_data=click_data)
-            video_writer_object.write(annotated_frame)
-        video_writer_object.release()
-        cap.release()
+    analyze_videos_multi_model_dlc(
+        configs=[str(handler.project_config_path) for handler in handlers],
+        videos=video_paths,
+        destfolders=[str(output_folder) for output_folder in output_folders],
+        videotype=".mp4",
+        batch_size=batch_size,
+        save_as_csv=True,
+        overwrite=True,
+    )
+
+    return [
+        handler.process_predictions(
+            video_paths=video_paths,
+            output_folder=output_folder,
+            annotate_videos=annotate_videos,
+            filter_videos=filter_videos,
+            filter_config=filter_config,
+        )
+        for handler, output_folder in zip(handlers, output_folders)
+    ]
@@ -0,0 +1,193 @@
+import logging
+import math
+from pathlib import Path
+from typing import Any
+
+import deeplabcut
+from deeplabcut.pose_estimation_pytorch.apis import utils
+from deeplabcut.pose_estimation_pytorch.apis.evaluation import evaluate
+from deeplabcut.pose_estimation_pytorch.data import DLCLoader
+from deeplabcut.pose_estimation_pytorch.runners.snapshots import TorchSnapshotManager
+from deeplabcut.pose_estimation_pytorch.task import Task
+from deeplabcut.utils import auxiliaryfunctions
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+VALIDATION_CURVE_FILE_NAME = "skellyclicker_validation_curve.json"
+
+
+class ValidationRound(BaseModel):
+    """Test split pixel RMSE of the snapshot saved at the end of a training round."""
+
+    epoch: int
+    snapshot_path: str
+    test_rmse: float
+    rmse_per_bodypart: dict[str, float]
+
+
+class ValidationCurve(BaseModel):
+    validation_interval_epochs: int
+    patience: int
+    min_improvement: float
+    rounds: list[ValidationRound] = []
+    best_epoch: int | None = None
+    stopped_early: bool = False
+
+    @property
+    def best_round(self) -> ValidationRound | None:
+        return next((round_ for round_ in self.rounds if round_.epoch == self.best_epoch), None)
+
+    def add_round(self, validation_round: ValidationRound) -> bool:
+        """Record a round, returning whether it improved on the best one by more than `min_improvement`."""
+        self.rounds.append(validation_round)
+        best_round = self.best_round
+        improved = not math.isnan(validation_round.test_rmse) and (
+            best_round is None or validation_round.test_rmse < best_round.test_rmse - self.min_improvement
+        )
+        if improved:
+            self.best_epoch = validation_round.epoch
+        return improved
+
+    def rounds_without_improvement(self) -> int:
+        if self.best_epoch is None:
+            return len(self.rounds)
+        return sum(1 for round_ in self.rounds if round_.epoch > self.best_epoch)
+
+    def save(self, train_folder: Path) -> Path:
+        curve_path = train_folder / VALIDATION_CURVE_FILE_NAME
+        curve_path.write_text(self.model_dump_json(indent=2))
+        return curve_path
+
+
+def validate_snapshot(loader: DLCLoader, snapshot_path: Path, epoch: int) -> ValidationRound:
+    """Pixel RMSE of a snapshot's predictions on the shuffle's test split, overall and per bodypart."""
+    parameters = loader.get_dataset_parameters()
+    pose_runner, _ = utils.get_inference_runners(
+        model_config=loader.model_cfg,
+        snapshot_path=snapshot_path,
+        max_individuals=parameters.max_num_animals,
+        num_bodyparts=parameters.num_joints,
+        num_unique_bodyparts=parameters.num_unique_bpts,
+        with_identity=loader.model_cfg["metadata"]["with_identity"],
+    )
+    # without a detector, top-down models are evaluated on ground truth bounding boxes
+    results, _ = evaluate(pose_runner=pose_runner, loader=loader, mode="test", per_keypoint_evaluation=True)
+    rmse_per_bodypart = {
+        bodypart: float(results[f"rmse_keypoint_{index}"])
+        for index, bodypart in enumerate(parameters.bodyparts)
+        if f"rmse_keypoint_{index}" in results
+    }
+    return ValidationRound(
+        epoch=epoch,
+        snapshot_path=str(snapshot_path),
+        test_rmse=float(results.get("rmse", float("nan"))),
+        rmse_per_bodypart=rmse_per_bodypart,
+    )
+
+
+def get_snapshot_at_epoch(train_folder: Path, task: Task, epoch: int) -> Path:
+    for snapshot in utils.get_model_snapshots("all", train_folder, task):
+        if snapshot.epochs == epoch:
+            return Path(snapshot.path)
+    raise FileNotFoundError(f"No snapshot for epoch {epoch} in {train_folder}")
+
+
+def promote_best_snapshot(project_config_path: str | Path, train_folder: Path, task: Task, best_epoch: int) -> Path:
+    """Make the best round's snapshot the shuffle's best snapshot, which analysis uses at snapshotindex -1."""
+    snapshot_manager = TorchSnapshotManager(model_folder=train_folder, snapshot_prefix=task.snapshot_prefix)
+    current_best = snapshot_manager.best()
+    if current_best is not None and current_best.epochs != best_epoch:
+        regular_path = snapshot_manager.snapshot_path(current_best.epochs)
+        if regular_path.exists():
+            current_best.path.unlink()
+        else:
+            current_best.path.rename(regular_path)
+    best_path = snapshot_manager.snapshot_path(best_epoch, best=True)
+    if not best_path.exists():
+        get_snapshot_at_epoch(train_folder, task, best_epoch).rename(best_path)
+
+    cfg = auxiliaryfunctions.read_config(project_config_path)
+    if cfg.get("snapshotindex") not in (-1, "best"):
+        print(f"Setting snapshotindex from {cfg.get('snapshotindex')} to -1 so analysis uses {best_path.name}")
+        auxiliaryfunctions.edit_config(str(project_config_path), {"snapshotindex": -1})
+    return best_path
+
+
+def train_with_early_stopping(
+    project_config_path: str | Path,
+    train_folder: Path,
+    epochs: int,
+    validation_interval_epochs: int,
+    patience: int,
+    min_improvement: float = 0.0,
+    batch_size: int | None = None,
+    snapshot_path: Path | None = None,
+    pytorch_cfg_updates: dict[str, Any] | None = None,
+) -> ValidationCurve:
+    """Train in rounds of `validation_interval_epochs`, validating on the test split after each one.
+
+    Training stops once `patience` rounds in a row fail to lower the test RMSE by more than `min_improvement`
+    pixels, or after `epochs`. Each round resumes from the previous round's snapshot (with its optimizer and
+    scheduler state, so the schedule is the same as one uninterrupted run), starting from `snapshot_path` if
+    given. The best round's snapshot is promoted for analysis and the validation curve saved next to it.
+    """
+    loader = DLCLoader(config=str(project_config_path), shuffle=1, trainset_index=0)
+    if len(loader.df_test) == 0:
+        raise ValueError("Early stopping needs a test split, but the training dataset has no test images")
+    task = Task(loader.model_cfg["method"])
+
+    num_rounds = math.ceil(epochs / validation_interval_epochs)
+    round_cfg_updates = {
+        **(pytorch_cfg_updates or {}),
+        # the rounds' validation replaces DLC's own periodic evaluation and best snapshot tracking, which would
+        # restart every round
+        "runner.eval_interval": epochs + 1,
+        "runner.key_metric": None,
+        "runner.snapshots.save_optimizer_state": True,
+    }
+    curve = ValidationCurve(
+        validation_interval_epochs=validation_interval_epochs,
+        patience=patience,
+        min_improvement=min_improvement,
+    )
+
+    epoch = 0
+    while epoch < epochs:
+        round_epochs = min(validation_interval_epochs, epochs - epoch)
+        deeplabcut.train_network(
+            str(project_config_path),
+            epochs=round_epochs,
+            save_epochs=round_epochs,
+            batch_size=batch_size,
+            snapshot_path=snapshot_path,
+            # keep every round's snapshot until the best one is known
+            max_snapshots_to_keep=num_rounds + 1,
+            pytorch_cfg_updates=round_cfg_updates,
+        )
+        epoch += round_epochs
+        snapshot_path = get_snapshot_at_epoch(train_folder, task, epoch)
+
+        validation_round = validate_snapshot(loader, snapshot_path, epoch)
+        improved = curve.add_round(validation_round)
+        curve.save(train_folder)
+        print(
+            f"Epoch {epoch}: test RMSE {validation_round.test_rmse:.2f} px"
+            f"{' (best)' if improved else ''}, "
+            + ", ".join(f"{bodypart} {rmse:.1f}" for bodypart, rmse in validation_round.rmse_per_bodypart.items())
+        )
+        if curve.rounds_without_improvement() >= patience:
+            curve.stopped_early = epoch < epochs
+            if curve.stopped_early:
+                print(f"Stopping early at epoch {epoch}: no improvement for {patience} validation rounds")
+            break
+
+    if curve.best_epoch is not None:
+        best_path = promote_best_snapshot(project_config_path, train_folder, task, curve.best_epoch)
+        curve.best_round.snapshot_path = str(best_path)
+        print(f"Best snapshot: {best_path.name} (test RMSE {curve.best_round.test_rmse:.2f} px)")
+    else:
+        logger.warning("No validation round produced a test RMSE, analysis will use the last snapshot")
+    curve_path = curve.save(train_folder)
+    logger.info(f"Saved validation curve to {curve_path}")
+    return curve
@@ -0,0 +1,79 @@
+import hashlib
+import json
+from enum import Enum
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from pydantic import BaseModel
+
+# bytes hashed from the start, middle and end of a file for a sampled fingerprint
+FINGERPRINT_SAMPLE_BYTES = 4 * 1024 * 1024
+_HASH_CHUNK_BYTES = 8 * 1024 * 1024
+_DIGEST_SIZE = 16
+
+
+def fingerprint_file(path: str | Path) -> str:
+    """Content fingerprint of a (large) file from its size and samples of its start, middle and end.
+
+    Cheap enough to run on every video of a recording, and changes whenever a video is re-encoded, trimmed or
+    replaced, even if the name stays the same. Cached per (path, size, modification time) for this process.
+    """
+    stat = Path(path).stat()
+    return _fingerprint_file(str(Path(path).resolve()), stat.st_size, stat.st_mtime_ns)
+
+
+def hash_file(path: str | Path) -> str:
+    """Hash of the full contents of a file, e.g. a model snapshot. Cached per (path, size, modification time)."""
+    stat = Path(path).stat()
+    return _hash_file(str(Path(path).resolve()), stat.st_size, stat.st_mtime_ns)
+
+
+def hash_settings(settings: dict[str, Any]) -> str:
+    """Stable hash of a dict of settings, independent of key order.
+
+    Values must be JSON, paths, enums, numpy values or pydantic models. Other objects (transforms, croppers, ...)
+    must be described explicitly by the caller: their str() can hold memory addresses, which would change the hash
+    on every run. Raises a TypeError for them.
+    """
+    encoded = json.dumps(settings, sort_keys=True, default=_encode_setting).encode()
+    return hashlib.blake2b(encoded, digest_size=_DIGEST_SIZE).hexdigest()
+
+
+def combine_hashes(*hashes: str) -> str:
+    return hashlib.blake2b("-".join(hashes).encode(), digest_size=_DIGEST_SIZE).hexdigest()
+
+
+def _encode_setting(value: Any) -> Any:
+    if isinstance(value, Path):
+        return str(value)
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (np.generic, np.ndarray)):
+        return value.tolist()
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Cannot hash a setting of type {type(value).__name__}, describe it with JSON values instead")
+
+
+@lru_cache(maxsize=1024)
+def _fingerprint_file(path: str, size: int, _mtime_ns: int) -> str:
+    digest = hashlib.blake2b(str(size).encode(), digest_size=_DIGEST_SIZE)
+    with open(path, "rb") as file:
+        if size <= 3 * FINGERPRINT_SAMPLE_BYTES:
+            digest.update(file.read())
+        else:
+            for offset in (0, (size - FINGERPRINT_SAMPLE_BYTES) // 2, size - FINGERPRINT_SAMPLE_BYTES):
+                file.seek(offset)
+                digest.update(file.read(FINGERPRINT_SAMPLE_BYTES))
+    return digest.hexdigest()
+
+
+@lru_cache(maxsize=64)
+def _hash_file(path: str, _size: int, _mtime_ns: int) -> str:
+    digest = hashlib.blake2b(digest_size=_DIGEST_SIZE)
+    with open(path, "rb") as file:
+        while chunk := file.read(_HASH_CHUNK_BYTES):
+            digest.update(chunk)
+    return digest.hexdigest()
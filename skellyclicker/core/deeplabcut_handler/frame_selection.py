@@ -0,0 +1,55 @@
+import logging
+from pathlib import Path
+
+import numpy as np
+from pydantic import BaseModel, PrivateAttr
+
+from skellyclicker.core.click_data_handler.data_handler import DataHandler
+
+logger = logging.getLogger(__name__)
+
+# appended to the output prefix of predictions for selected frames, so they never mix with full-length outputs
+SPARSE_OUTPUT_SUFFIX = "_sparse"
+
+
+class InferenceFrameSelection(BaseModel):
+    """Which frames of each video to analyze, for a quick look at a model without full-length inference.
+
+    Frames from `start_frame` up to (not including) `end_frame`, every `stride`th, and if `labels_csv_path` is
+    given, only those with at least one human label in that csv.
+    """
+
+    stride: int = 1
+    start_frame: int = 0
+    end_frame: int | None = None
+    labels_csv_path: str | None = None
+
+    _labeled_frames: dict[str, np.ndarray] | None = PrivateAttr(default=None)
+
+    @property
+    def is_full_video(self) -> bool:
+        return self.stride == 1 and self.start_frame == 0 and self.end_frame is None and self.labels_csv_path is None
+
+    def get_frame_indices(self, video_path: str | Path, num_frames: int) -> list[int]:
+        if self.stride < 1:
+            raise ValueError(f"Frame stride must be at least 1, got {self.stride}")
+        end_frame = num_frames if self.end_frame is None else min(self.end_frame, num_frames)
+        frame_indices = np.arange(max(self.start_frame, 0), end_frame, self.stride)
+        if self.labels_csv_path is not None:
+            frame_indices = np.intersect1d(frame_indices, self._get_labeled_frames(video_path))
+        return frame_indices.tolist()
+
+    def _get_labeled_frames(self, video_path: str | Path) -> np.ndarray:
+        if self._labeled_frames is None:
+            data_handler = DataHandler.from_csv(self.labels_csv_path)
+            labeled_rows = data_handler.dataframe.notna().any(axis=1)
+            self._labeled_frames = {
+                video_name: np.unique(frames.index.get_level_values("frame").to_numpy())
+                for video_name, frames in data_handler.dataframe[labeled_rows].groupby(level="video")
+            }
+        # human labels are keyed by video file name
+        for video_name in (Path(video_path).name, Path(video_path).stem):
+            if video_name in self._labeled_frames:
+                return self._labeled_frames[video_name]
+        logger.warning(f"No labeled frames for {Path(video_path).name} in {self.labels_csv_path}")
+        return np.array([], dtype=int)
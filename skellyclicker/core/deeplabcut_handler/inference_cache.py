@@ -0,0 +1,115 @@
+import logging
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Any
+
+from pydantic import BaseModel
+
+from skellyclicker.core.deeplabcut_handler.file_fingerprints import (
+    combine_hashes,
+    fingerprint_file,
+    hash_file,
+    hash_settings,
+)
+
+logger = logging.getLogger(__name__)
+
+INFERENCE_CACHE_FOLDER_NAME = "skellyclicker-inference-cache"
+# least recently used entries are deleted once the cache is larger than this
+DEFAULT_MAX_CACHE_BYTES = 10_000_000_000
+
+# DLC's per-video inference outputs, named {video stem}{scorer}{suffix}. Everything else (filtered predictions,
+# plots, merged csvs, annotated videos) is derived from these and regenerated on every run. The _meta.pickle
+# describes the run and the video by name, so it is regenerated for restored outputs rather than cached.
+CACHED_OUTPUT_SUFFIXES = (".h5", ".csv", "_full.pickle")
+_CACHED_FILE_STEM = "predictions"
+_TEMPORARY_FOLDER_PREFIX = ".tmp-"
+
+
+class InferenceCache(BaseModel):
+    """Content-addressed store of DLC inference outputs.
+
+    Entries are keyed by the video's content fingerprint, the hashes of the model snapshots and the inference
+    settings, so renaming a video still hits and retraining or changing settings misses. `prune` keeps the cache
+    under `max_size_bytes` by deleting the least recently used entries.
+    """
+
+    cache_folder: Path
+    settings_key: str
+    max_size_bytes: int = DEFAULT_MAX_CACHE_BYTES
+
+    @classmethod
+    def create(
+        cls,
+        cache_folder: str | Path,
+        snapshot_paths: list[str | Path],
+        settings: dict[str, Any],
+        max_size_bytes: int = DEFAULT_MAX_CACHE_BYTES,
+    ) -> "InferenceCache":
+        settings_key = combine_hashes(
+            *(hash_file(snapshot_path) for snapshot_path in snapshot_paths),
+            hash_settings(settings),
+        )
+        return cls(cache_folder=Path(cache_folder), settings_key=settings_key, max_size_bytes=max_size_bytes)
+
+    def entry_folder(self, video: Path) -> Path:
+        return self.cache_folder / combine_hashes(fingerprint_file(video), self.settings_key)
+
+    def restore(self, video: Path, output_path: Path, output_prefix: str) -> bool:
+        """Copy cached outputs for `video` into `output_path`. Returns False on a cache miss."""
+        entry_folder = self.entry_folder(video)
+        if not (entry_folder / f"{_CACHED_FILE_STEM}{CACHED_OUTPUT_SUFFIXES[0]}").is_file():
+            return False
+        output_path.mkdir(parents=True, exist_ok=True)
+        for suffix in CACHED_OUTPUT_SUFFIXES:
+            cached_file = entry_folder / f"{_CACHED_FILE_STEM}{suffix}"
+            if cached_file.is_file():
+                shutil.copy2(cached_file, output_path / f"{output_prefix}{suffix}")
+        # the entry folder's modification time is its last use, for pruning
+        os.utime(entry_folder)
+        logger.info(f"Inference cache hit for {video.name}, restored outputs from {entry_folder}")
+        return True
+
+    def store(self, video: Path, output_path: Path, output_prefix: str) -> None:
+        entry_folder = self.entry_folder(video)
+        if not (output_path / f"{output_prefix}{CACHED_OUTPUT_SUFFIXES[0]}").is_file():
+            logger.warning(f"No inference outputs found for {video.name} in {output_path}, not caching")
+            return
+        # write to a temporary folder and rename, so an interrupted run never leaves a partial entry
+        temporary_folder = self.cache_folder / f"{_TEMPORARY_FOLDER_PREFIX}{uuid.uuid4().hex}"
+        temporary_folder.mkdir(parents=True)
+        for suffix in CACHED_OUTPUT_SUFFIXES:
+            output_file = output_path / f"{output_prefix}{suffix}"
+            if output_file.is_file():
+                shutil.copy2(output_file, temporary_folder / f"{_CACHED_FILE_STEM}{suffix}")
+        if entry_folder.exists():
+            shutil.rmtree(entry_folder)
+        temporary_folder.rename(entry_folder)
+        logger.info(f"Cached inference outputs for {video.name} in {entry_folder}")
+
+    def prune(self) -> int:
+        """Delete the least recently used entries until the cache fits in `max_size_bytes`. Returns how many."""
+        if not self.cache_folder.is_dir():
+            return 0
+        entries = [
+            (entry_folder.stat().st_mtime, _get_folder_size(entry_folder), entry_folder)
+            for entry_folder in self.cache_folder.iterdir()
+            if entry_folder.is_dir() and not entry_folder.name.startswith(_TEMPORARY_FOLDER_PREFIX)
+        ]
+        cache_size = sum(size for _, size, _ in entries)
+        num_pruned = 0
+        for _, size, entry_folder in sorted(entries):
+            if cache_size <= self.max_size_bytes:
+                break
+            shutil.rmtree(entry_folder)
+            cache_size -= size
+            num_pruned += 1
+        if num_pruned:
+            logger.info(f"Pruned {num_pruned} least recently used entries from the inference cache {self.cache_folder}")
+        return num_pruned
+
+
+def _get_folder_size(folder: Path) -> int:
+    return sum(path.stat().st_size for path in folder.iterdir() if path.is_file())
@@ -0,0 +1,175 @@
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel
+
+from skellyclicker.core.deeplabcut_handler.file_fingerprints import fingerprint_file
+
+logger = logging.getLogger(__name__)
+
+# frames predicted between checkpoints, a crash loses at most this many frames of work
+DEFAULT_CHUNK_FRAMES = 1000
+# next to DLC's outputs, named {video stem}{scorer}{suffix}
+CHUNK_FILE_SUFFIX = "_chunks.bin"
+PROGRESS_FILE_SUFFIX = "_progress.json"
+# x, y, likelihood per bodypart, stored as float32
+PREDICTION_VALUES_PER_BODYPART = 3
+
+
+class InferenceProgress(BaseModel):
+    """Checkpoint of chunked inference on one video, saved after every chunk appended to the chunk file.
+
+    The chunk file holds `completed_frames` rows of float32 (bodyparts, 3) predictions. Anything past that
+    (a chunk written when the process died before saving progress) is truncated away on resume. DLC scorer
+    names don't change when a model is retrained to the same number of epochs, so the checkpoint also records
+    the snapshot's content hash.
+    """
+
+    video_fingerprint: str
+    dlc_scorer: str
+    snapshot_hash: str
+    bodyparts: list[str]
+    num_frames: int
+    completed_frames: int = 0
+    complete: bool = False
+
+    @classmethod
+    def load(cls, progress_path: str | Path) -> "InferenceProgress | None":
+        progress_path = Path(progress_path)
+        if not progress_path.is_file():
+            return None
+        try:
+            return cls.model_validate_json(progress_path.read_text())
+        except ValueError as e:
+            logger.warning(f"Ignoring unreadable inference progress {progress_path}: {e}")
+            return None
+
+    def save(self, progress_path: str | Path) -> None:
+        # write and rename, so the progress file is never half written
+        progress_path = Path(progress_path)
+        temporary_path = progress_path.with_suffix(".tmp")
+        temporary_path.write_text(self.model_dump_json(indent=2))
+        os.replace(temporary_path, progress_path)
+
+    def matches(self, other: "InferenceProgress") -> bool:
+        """Whether `other` is a checkpoint of the same video, snapshot and frame count, so it can be resumed."""
+        return (
+            self.video_fingerprint == other.video_fingerprint
+            and self.dlc_scorer == other.dlc_scorer
+            and self.snapshot_hash == other.snapshot_hash
+            and self.bodyparts == other.bodyparts
+            and self.num_frames == other.num_frames
+        )
+
+
+def get_checkpoint_paths(output_path: Path, output_prefix: str) -> tuple[Path, Path]:
+    return output_path / f"{output_prefix}{CHUNK_FILE_SUFFIX}", output_path / f"{output_prefix}{PROGRESS_FILE_SUFFIX}"
+
+
+def start_or_resume_progress(
+    video: Path,
+    dlc_scorer: str,
+    snapshot_hash: str,
+    bodyparts: list[str],
+    num_frames: int,
+    output_path: Path,
+    output_prefix: str,
+    restart: bool = False,
+) -> InferenceProgress:
+    """The checkpoint to continue from: the saved one if it belongs to this video and model, else a fresh one.
+
+    With `restart` the saved checkpoint is discarded. The chunk file is truncated to the checkpoint's completed
+    frames.
+    """
+    chunk_path, progress_path = get_checkpoint_paths(output_path, output_prefix)
+    progress = InferenceProgress(
+        video_fingerprint=fingerprint_file(video),
+        dlc_scorer=dlc_scorer,
+        snapshot_hash=snapshot_hash,
+        bodyparts=bodyparts,
+        num_frames=num_frames,
+    )
+    saved_progress = None if restart else InferenceProgress.load(progress_path)
+    if saved_progress is not None and saved_progress.matches(progress) and chunk_path.is_file():
+        progress = saved_progress
+    elif saved_progress is not None:
+        logger.info(f"Inference progress in {progress_path} is for another video or model, starting over")
+
+    frame_bytes = len(bodyparts) * PREDICTION_VALUES_PER_BODYPART * np.dtype(np.float32).itemsize
+    if chunk_path.is_file() and chunk_path.stat().st_size < progress.completed_frames * frame_bytes:
+        logger.warning(f"{chunk_path} is shorter than its recorded progress, starting over")
+        progress.completed_frames = 0
+    with open(chunk_path, "ab") as chunk_file:
+        chunk_file.truncate(progress.completed_frames * frame_bytes)
+    progress.complete = False
+    progress.save(progress_path)
+    return progress
+
+
+def append_chunk(
+    values: np.ndarray,
+    progress: InferenceProgress,
+    output_path: Path,
+    output_prefix: str,
+) -> None:
+    """Append a (frames, bodyparts, 3) chunk of predictions and checkpoint it.
+
+    The chunk is flushed to disk before the progress is saved, so saved progress never points past the data.
+    """
+    chunk_path, progress_path = get_checkpoint_paths(output_path, output_prefix)
+    with open(chunk_path, "ab") as chunk_file:
+        np.ascontiguousarray(values, dtype=np.float32).tofile(chunk_file)
+        chunk_file.flush()
+        os.fsync(chunk_file.fileno())
+    progress.completed_frames += len(values)
+    progress.save(progress_path)
+
+
+def read_chunk_file(chunk_path: str | Path, num_bodyparts: int) -> np.ndarray:
+    """The chunk file as a read-only (frames, bodyparts, 3) array, mapped from disk rather than loaded."""
+    if Path(chunk_path).stat().st_size == 0:
+        return np.empty((0, num_bodyparts, PREDICTION_VALUES_PER_BODYPART), dtype=np.float32)
+    return np.memmap(chunk_path, dtype=np.float32, mode="r").reshape(
+        -1, num_bodyparts, PREDICTION_VALUES_PER_BODYPART
+    )
+
+
+def write_chunked_predictions(
+    progress: InferenceProgress,
+    output_path: Path,
+    output_prefix: str,
+    save_as_csv: bool,
+    rows_per_write: int = DEFAULT_CHUNK_FRAMES,
+) -> Path:
+    """Convert the chunk file into DLC's h5 (and csv) outputs, `rows_per_write` frames at a time.
+
+    Returns the h5 path. The progress is marked complete and the chunk file, now duplicated by the h5, removed.
+    """
+    chunk_path, progress_path = get_checkpoint_paths(output_path, output_prefix)
+    values = read_chunk_file(chunk_path, len(progress.bodyparts))
+    columns = pd.MultiIndex.from_product(
+        [[progress.dlc_scorer], progress.bodyparts, ["x", "y", "likelihood"]],
+        names=["scorer", "bodyparts", "coords"],
+    )
+    output_h5 = output_path / f"{output_prefix}.h5"
+    output_csv = output_h5.with_suffix(".csv")
+    print(f"Saving {len(values)} frames of chunked predictions in {output_h5}")
+    with pd.HDFStore(output_h5, mode="w") as store:
+        for start in range(0, len(values), rows_per_write):
+            rows = values[start:start + rows_per_write]
+            df = pd.DataFrame(
+                rows.reshape(len(rows), -1),
+                columns=columns,
+                index=pd.RangeIndex(start, start + len(rows)),
+            )
+            store.append("df_with_missing", df, format="table")
+            if save_as_csv:
+                df.to_csv(output_csv, mode="w" if start == 0 else "a", header=start == 0)
+    del values
+    progress.complete = True
+    progress.save(progress_path)
+    chunk_path.unlink()
+    return output_h5
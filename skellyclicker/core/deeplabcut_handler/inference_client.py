@@ -0,0 +1,147 @@
+import json
+import logging
+import os
+import socket
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+logger = logging.getLogger(__name__)
+
+# "host:port" for a localhost TCP server, anything else is a Unix socket path
+INFERENCE_SERVER_ENV_VAR = "SKELLYCLICKER_INFERENCE_SERVER"
+# set to 1 to hand analysis jobs to a running inference server by default
+USE_INFERENCE_SERVER_ENV_VAR = "SKELLYCLICKER_USE_INFERENCE_SERVER"
+DEFAULT_SOCKET_PATH = Path.home() / ".skellyclicker" / "inference_server.sock"
+DEFAULT_SERVER_HOST = "127.0.0.1"
+DEFAULT_SERVER_PORT = 47861
+# connecting to a server that isn't running should cost nothing noticeable before analyzing locally
+CONNECT_TIMEOUT_SECONDS = 0.5
+_ENCODING = "utf-8"
+
+
+def get_server_address() -> str:
+    """The inference server address from the environment, else the default Unix socket (localhost TCP on Windows)."""
+    address = os.environ.get(INFERENCE_SERVER_ENV_VAR)
+    if address:
+        return address
+    if hasattr(socket, "AF_UNIX"):
+        return str(DEFAULT_SOCKET_PATH)
+    return f"{DEFAULT_SERVER_HOST}:{DEFAULT_SERVER_PORT}"
+
+
+def is_inference_server_requested() -> bool:
+    """Whether the environment opts in to handing analysis jobs to the inference server."""
+    return os.environ.get(USE_INFERENCE_SERVER_ENV_VAR, "").strip().lower() in ("1", "true", "yes")
+
+
+def parse_server_address(address: str) -> tuple[int, str | tuple[str, int]]:
+    """(socket family, address) for a "host:port" or Unix socket path address."""
+    host, _, port = address.rpartition(":")
+    if host and port.isdigit():
+        return socket.AF_INET, (host, int(port))
+    return socket.AF_UNIX, address
+
+
+def encode_message(message: dict[str, Any]) -> bytes:
+    """One JSON line, the wire format in both directions."""
+    return (json.dumps(message, default=str) + "\n").encode(_ENCODING)
+
+
+class InferenceClient:
+    """Submits analysis jobs to a running inference server and streams its progress messages back.
+
+    Each request is one JSON line on a new connection. The server answers with JSON lines: "started", then
+    "log" lines (the job's printed output) and "progress" lines (progress bar redraws, at most a few a second),
+    and finally "done" with the machine labels csv path, or "error".
+    """
+
+    def __init__(self, address: str | None = None) -> None:
+        self.address = address or get_server_address()
+
+    @classmethod
+    def connect(cls, address: str | None = None) -> "InferenceClient | None":
+        """A client for the server at `address`, or None if no server answers there."""
+        client = cls(address)
+        try:
+            client.ping()
+        except (OSError, ValueError):
+            return None
+        return client
+
+    def _open(self, timeout: float | None) -> socket.socket:
+        family, address = parse_server_address(self.address)
+        connection = socket.socket(family, socket.SOCK_STREAM)
+        connection.settimeout(timeout)
+        try:
+            connection.connect(address)
+        except OSError:
+            connection.close()
+            raise
+        return connection
+
+    def _request(self, request: dict[str, Any], timeout: float | None = None) -> Iterator[dict[str, Any]]:
+        with self._open(CONNECT_TIMEOUT_SECONDS) as connection:
+            connection.settimeout(timeout)
+            connection.sendall(encode_message(request))
+            with connection.makefile("r", encoding=_ENCODING) as responses:
+                for line in responses:
+                    if line.strip():
+                        yield json.loads(line)
+
+    def ping(self) -> dict[str, Any]:
+        for message in self._request({"type": "ping"}, timeout=CONNECT_TIMEOUT_SECONDS):
+            return message
+        raise ValueError(f"No answer from the inference server at {self.address}")
+
+    def shutdown(self) -> None:
+        for _ in self._request({"type": "shutdown"}, timeout=CONNECT_TIMEOUT_SECONDS):
+            pass
+
+    def analyze(
+        self,
+        project_config_path: str | Path,
+        video_paths: list[str],
+        output_folder: str | Path,
+        on_message: Callable[[dict[str, Any]], None] | None = None,
+        **options: Any,
+    ) -> str:
+        """Run `DeeplabcutHandler.analyze_videos` on the server and return the machine labels csv path.
+
+        Every message is passed to `on_message`; by default log lines are printed and progress bars redrawn in
+        place, as if the job ran here. `options` are analyze_videos' keyword arguments, with pydantic configs
+        given as dicts. Paths are resolved here, the server may run in another working directory.
+        """
+        request = {
+            "type": "analyze",
+            "project_config_path": str(Path(project_config_path).resolve()),
+            "video_paths": [str(Path(video_path).resolve()) for video_path in video_paths],
+            "output_folder": str(Path(output_folder).resolve()),
+            "options": options,
+        }
+        if on_message is None:
+            on_message = _ConsolePrinter()
+        for message in self._request(request):
+            on_message(message)
+            if message["type"] == "done":
+                return message["csv_path"]
+            if message["type"] == "error":
+                raise RuntimeError(f"Analysis failed on the inference server: {message['message']}")
+        raise ConnectionError(f"The inference server at {self.address} closed the connection before the job finished")
+
+
+class _ConsolePrinter:
+    """Prints log messages and redraws progress messages in place on one line, like the progress bars they were."""
+
+    def __init__(self) -> None:
+        self._progress_width = 0
+
+    def __call__(self, message: dict[str, Any]) -> None:
+        if message["type"] == "progress":
+            line = message["message"]
+            print("\r" + line.ljust(self._progress_width), end="", flush=True)
+            self._progress_width = len(line)
+        elif message["type"] == "log":
+            if self._progress_width:
+                print("\r" + " " * self._progress_width + "\r", end="")
+                self._progress_width = 0
+            print(message["message"])
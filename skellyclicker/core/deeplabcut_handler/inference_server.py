@@ -0,0 +1,211 @@
+import contextlib
+import io
+import json
+import logging
+import os
+import re
+import socket
+import socketserver
+import threading
+import time
+import traceback
+from pathlib import Path
+from typing import Any, Callable
+
+from skellyclicker.core.deeplabcut_handler.deeplabcut_handler import DeeplabcutHandler
+from skellyclicker.core.deeplabcut_handler.frame_selection import InferenceFrameSelection
+from skellyclicker.core.deeplabcut_handler.inference_client import (
+    InferenceClient,
+    encode_message,
+    get_server_address,
+    parse_server_address,
+)
+from skellyclicker.core.deeplabcut_handler.prediction_filters import PredictionFilterConfig
+from skellyclicker.core.deeplabcut_handler.runner_cache import DEFAULT_MAX_MODEL_MEMORY_BYTES, InferenceRunnerCache
+
+logger = logging.getLogger(__name__)
+
+# analyze_videos options a job may set, everything else comes from the server
+JOB_OPTIONS = (
+    "annotate_videos",
+    "filter_videos",
+    "batch_size",
+    "cross_camera_batching",
+    "use_inference_cache",
+    "auto_tune_inference",
+    "frame_selection",
+    "filter_config",
+    "chunk_frames",
+    "backend",
+    "quantization",
+    "max_quantized_pixel_error",
+)
+# progress bar redraws sent to the client, at most one per interval
+PROGRESS_INTERVAL_SECONDS = 0.5
+
+
+class _MessageWriter(io.TextIOBase):
+    """A text stream that sends each line written to it as a "log" message.
+
+    Text ended by a carriage return is a progress bar redraw, it is sent as a "progress" message that the client
+    redraws in place, at most one every `PROGRESS_INTERVAL_SECONDS`. A bar's final state ends with a newline, so
+    it is always sent.
+    """
+
+    def __init__(self, send: Callable[[dict[str, Any]], None]) -> None:
+        super().__init__()
+        self._send = send
+        self._buffer = ""
+        self._last_progress_time = 0.0
+
+    def write(self, text: str) -> int:
+        self._buffer += text
+        *segments, self._buffer = re.split(r"([\r\n])", self._buffer)
+        for line, separator in zip(segments[::2], segments[1::2]):
+            if not line.strip():
+                continue
+            if separator == "\n":
+                self._send({"type": "log", "message": line})
+            elif time.monotonic() - self._last_progress_time >= PROGRESS_INTERVAL_SECONDS:
+                self._last_progress_time = time.monotonic()
+                self._send({"type": "progress", "message": line})
+        return len(text)
+
+    def flush(self) -> None:
+        if self._buffer.strip():
+            self._send({"type": "log", "message": self._buffer})
+        self._buffer = ""
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        line = self.rfile.readline()
+        if not line.strip():
+            return
+        connected = True
+
+        def send(message: dict[str, Any]) -> None:
+            nonlocal connected
+            if not connected:
+                return
+            try:
+                self.wfile.write(encode_message(message))
+                self.wfile.flush()
+            except OSError:
+                # the client went away, the job still runs to completion and writes its outputs
+                connected = False
+
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            send({"type": "error", "message": f"Invalid request: {e}"})
+            return
+        self.server.inference_server.handle_request(request, send)
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer if hasattr(socket, "AF_UNIX") else object):
+    daemon_threads = True
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class InferenceServer:
+    """A long-lived local process that keeps DLC, torch and recently used models loaded between analysis jobs.
+
+    Jobs run one at a time (they share the GPU and the loaded models) in the order they arrive, their printed
+    output is streamed back to the client. Listens on a Unix socket, or on localhost TCP for a "host:port"
+    address.
+    """
+
+    def __init__(self, address: str | None = None, max_model_memory_bytes: int = DEFAULT_MAX_MODEL_MEMORY_BYTES):
+        self.address = address or get_server_address()
+        self.runner_cache = InferenceRunnerCache(max_memory_bytes=max_model_memory_bytes)
+        self._job_lock = threading.Lock()
+        self._server: socketserver.BaseServer | None = None
+
+    def serve_forever(self) -> None:
+        family, address = parse_server_address(self.address)
+        if family == socket.AF_INET:
+            if address[0] not in ("127.0.0.1", "localhost", "::1"):
+                raise ValueError(f"The inference server only listens on localhost, got {address[0]}")
+            self._server = _TCPServer(address, _RequestHandler)
+        else:
+            socket_path = Path(address)
+            if InferenceClient.connect(str(socket_path)) is not None:
+                raise RuntimeError(f"An inference server is already running at {socket_path}")
+            socket_path.parent.mkdir(parents=True, exist_ok=True)
+            socket_path.unlink(missing_ok=True)  # left behind by a server that didn't shut down cleanly
+            self._server = _UnixServer(str(socket_path), _RequestHandler)
+            os.chmod(socket_path, 0o600)
+        self._server.inference_server = self
+        print(f"Inference server listening on {self.address}")
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if family != socket.AF_INET:
+                Path(address).unlink(missing_ok=True)
+
+    def shutdown(self) -> None:
+        if self._server is not None:
+            # serve_forever must be stopped from another thread than the one serving
+            threading.Thread(target=self._server.shutdown, daemon=True).start()
+
+    def handle_request(self, request: dict[str, Any], send: Callable[[dict[str, Any]], None]) -> None:
+        request_type = request.get("type")
+        if request_type == "ping":
+            send(
+                {
+                    "type": "pong",
+                    "models_loaded": len(self.runner_cache),
+                    "model_memory_bytes": self.runner_cache.memory_bytes,
+                    "busy": self._job_lock.locked(),
+                }
+            )
+        elif request_type == "shutdown":
+            send({"type": "shutting_down"})
+            self.shutdown()
+        elif request_type == "analyze":
+            self._run_analysis(request, send)
+        else:
+            send({"type": "error", "message": f"Unknown request type {request_type}"})
+
+    def _run_analysis(self, request: dict[str, Any], send: Callable[[dict[str, Any]], None]) -> None:
+        if self._job_lock.locked():
+            send({"type": "queued"})
+        with self._job_lock:
+            send({"type": "started"})
+            writer = _MessageWriter(send)
+            try:
+                options = _parse_job_options(request.get("options", {}))
+                handler = DeeplabcutHandler.load_deeplabcut_project(request["project_config_path"])
+                with contextlib.redirect_stdout(writer), contextlib.redirect_stderr(writer):
+                    csv_path = handler.analyze_videos(
+                        video_paths=request["video_paths"],
+                        output_folder=request["output_folder"],
+                        runner_cache=self.runner_cache,
+                        use_inference_server=False,
+                        **options,
+                    )
+                writer.flush()
+            except Exception as e:
+                writer.flush()
+                logger.exception(f"Analysis job for {request.get('project_config_path')} failed")
+                send({"type": "error", "message": str(e), "traceback": traceback.format_exc()})
+                return
+            send({"type": "done", "csv_path": csv_path})
+
+
+def _parse_job_options(options: dict[str, Any]) -> dict[str, Any]:
+    unknown_options = set(options) - set(JOB_OPTIONS)
+    if unknown_options:
+        raise ValueError(f"Unknown analysis options {sorted(unknown_options)}")
+    options = dict(options)
+    if options.get("frame_selection") is not None:
+        options["frame_selection"] = InferenceFrameSelection(**options["frame_selection"])
+    if options.get("filter_config") is not None:
+        options["filter_config"] = PredictionFilterConfig(**options["filter_config"])
+    return options
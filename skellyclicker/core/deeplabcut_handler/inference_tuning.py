@@ -0,0 +1,181 @@
+import json
+import logging
+import os
+import platform
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import cv2
+import torch
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+INFERENCE_TUNING_FILE_NAME = "skellyclicker_inference_tuning.json"
+
+DEFAULT_CANDIDATE_BATCH_SIZES = (1, 2, 4, 8, 16, 32)
+# frames of the workload every trial runs, split between the pool's workers
+DEFAULT_CALIBRATION_FRAMES = 64
+# stop trying larger batches, or more workers, once throughput falls this far below the best so far
+BATCH_SIZE_SLOWDOWN_TOLERANCE = 0.95
+# a calibration stops starting new trials once it has run this many, or for this long
+MAX_CALIBRATION_TRIALS = 12
+MAX_CALIBRATION_SECONDS = 120.0
+
+
+class InferenceTrial(BaseModel):
+    batch_size: int
+    num_workers: int
+    frames_per_second: float
+    peak_memory_bytes: int  # per worker, GPU memory when running on a GPU
+
+
+class InferenceTuningResult(BaseModel):
+    """The fastest batch size and worker count measured for one machine, model architecture and frame size."""
+
+    machine: str
+    model: str
+    frame_size: tuple[int, int]  # width, height
+    batch_size: int
+    num_workers: int
+    frames_per_second: float
+    peak_memory_bytes: int
+    tuned_at: str
+    trials: list[InferenceTrial] = []
+
+    def matches(self, machine: str, model: str, frame_size: tuple[int, int]) -> bool:
+        return self.machine == machine and self.model == model and tuple(self.frame_size) == tuple(frame_size)
+
+
+class InferenceTuning(BaseModel):
+    """All tuning results of a project, stored as json next to its config.yaml."""
+
+    results: list[InferenceTuningResult] = []
+
+    @classmethod
+    def load(cls, config_path: str | Path) -> "InferenceTuning":
+        tuning_path = get_inference_tuning_path(config_path)
+        if not tuning_path.is_file():
+            return cls()
+        try:
+            return cls.model_validate_json(tuning_path.read_text())
+        except ValueError as e:
+            logger.warning(f"Ignoring unreadable inference tuning file {tuning_path}: {e}")
+            return cls()
+
+    def save(self, config_path: str | Path) -> None:
+        tuning_path = get_inference_tuning_path(config_path)
+        with open(tuning_path, "w") as f:
+            json.dump(self.model_dump(mode="json"), f, indent=2)
+        logger.info(f"Saved inference tuning to {tuning_path}")
+
+    def find(self, machine: str, model: str, frame_size: tuple[int, int]) -> InferenceTuningResult | None:
+        for result in self.results:
+            if result.matches(machine, model, frame_size):
+                return result
+        return None
+
+    def add(self, result: InferenceTuningResult) -> None:
+        self.results = [
+            existing for existing in self.results
+            if not existing.matches(result.machine, result.model, result.frame_size)
+        ]
+        self.results.append(result)
+
+
+def get_inference_tuning_path(config_path: str | Path) -> Path:
+    return Path(config_path).parent / INFERENCE_TUNING_FILE_NAME
+
+
+def get_machine_name(device: str) -> str:
+    """Identifies the hardware inference runs on, so results from another machine are never reused."""
+    if device.startswith("cuda") and torch.cuda.is_available():
+        device = f"{device} {torch.cuda.get_device_name(torch.device(device))}"
+    return f"{platform.node()} ({platform.machine()}, {os.cpu_count()} cpus, {device})"
+
+
+def get_model_name(model_cfg: dict) -> str:
+    """Tuning depends on the architecture rather than the weights, so it survives retraining."""
+    return f"{model_cfg.get('net_type', 'unknown')} ({model_cfg.get('method', 'bu')})"
+
+
+def get_frame_size(video: str | Path, cropping: list[int] | None = None) -> tuple[int, int]:
+    if cropping is not None:
+        x1, x2, y1, y2 = cropping
+        return x2 - x1, y2 - y1
+    cap = cv2.VideoCapture(str(video))
+    frame_size = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    cap.release()
+    return frame_size
+
+
+def get_candidate_worker_counts(max_workers: int) -> list[int]:
+    """Powers of two up to `max_workers`, plus `max_workers` itself."""
+    worker_counts = []
+    num_workers = 1
+    while num_workers < max_workers:
+        worker_counts.append(num_workers)
+        num_workers *= 2
+    worker_counts.append(max(1, max_workers))
+    return worker_counts
+
+
+def reset_peak_memory(device: str) -> None:
+    if device.startswith("cuda") and torch.cuda.is_available():
+        torch.cuda.reset_peak_memory_stats(torch.device(device))
+
+
+def get_peak_memory_bytes(device: str) -> int:
+    """Peak GPU memory allocated by torch, or the process' peak resident memory on CPU.
+
+    The resident peak can't be reset, so CPU trials must run in increasing batch size order.
+    """
+    if device.startswith("cuda") and torch.cuda.is_available():
+        return torch.cuda.max_memory_allocated(torch.device(device))
+    try:
+        import resource
+    except ImportError:
+        return 0  # Windows
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes on Linux
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def get_memory_budget_bytes(device: str, available_memory_bytes: int | None, headroom: float) -> int | None:
+    if device.startswith("cuda") and torch.cuda.is_available():
+        return int(torch.cuda.get_device_properties(torch.device(device)).total_memory * headroom)
+    if available_memory_bytes is None:
+        return None
+    return int(available_memory_bytes * headroom)
+
+
+def select_best_trial(trials: list[InferenceTrial], memory_budget_bytes: int | None) -> InferenceTrial | None:
+    """The highest throughput trial whose workers fit in the memory budget together."""
+    fitting_trials = [
+        trial for trial in trials
+        if memory_budget_bytes is None or trial.peak_memory_bytes * trial.num_workers <= memory_budget_bytes
+    ]
+    if not fitting_trials:
+        return None
+    return max(fitting_trials, key=lambda trial: trial.frames_per_second)
+
+
+def create_tuning_result(
+    machine: str,
+    model: str,
+    frame_size: tuple[int, int],
+    best_trial: InferenceTrial,
+    trials: list[InferenceTrial],
+) -> InferenceTuningResult:
+    return InferenceTuningResult(
+        machine=machine,
+        model=model,
+        frame_size=frame_size,
+        batch_size=best_trial.batch_size,
+        num_workers=best_trial.num_workers,
+        frames_per_second=best_trial.frames_per_second,
+        peak_memory_bytes=best_trial.peak_memory_bytes,
+        tuned_at=datetime.now().isoformat(),
+        trials=trials,
+    )
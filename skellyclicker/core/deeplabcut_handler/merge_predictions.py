@@ -0,0 +1,189 @@
+import logging
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel, ConfigDict
+
+from skellyclicker.core.click_data_handler.data_handler import LABELS_H5_KEY, LIKELIHOOD_SUFFIX
+from skellyclicker.core.deeplabcut_handler.frame_selection import SPARSE_OUTPUT_SUFFIX
+from skellyclicker.core.deeplabcut_handler.prediction_filters import PredictionFilterConfig, filter_prediction_array
+
+logger = logging.getLogger(__name__)
+
+# written by DLC's filterpredictions in earlier versions, outputs left over from those runs are skipped
+FILTERED_OUTPUT_SUFFIX = "_filtered"
+# DLC output names are {video stem}DLC_{network}_{...}{suffix}
+DLC_SCORER_SEPARATOR = "DLC_"
+# longest video name the h5 table can hold, the string column width is fixed when the table is created
+MAX_VIDEO_NAME_LENGTH = 256
+# trajectory plots go to {output folder}/plot-poses/{video name}, like deeplabcut.plot_trajectories
+PLOT_FOLDER_NAME = "plot-poses"
+
+
+class VideoPredictions(BaseModel):
+    """One video's predictions as typed arrays: (frames,) frame numbers and (frames, bodyparts, 3) x, y, likelihood."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+    video_name: str
+    bodyparts: list[str]
+    frames: np.ndarray
+    values: np.ndarray
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Rows indexed by (video, frame), columns {bodypart}_x, {bodypart}_y, {bodypart}_likelihood."""
+        columns = [
+            f"{bodypart}{suffix}" for bodypart in self.bodyparts for suffix in ("_x", "_y", LIKELIHOOD_SUFFIX)
+        ]
+        index = pd.MultiIndex.from_arrays(
+            [np.full(len(self.frames), self.video_name, dtype=object), self.frames], names=["video", "frame"]
+        )
+        return pd.DataFrame(
+            self.values.reshape(len(self.frames), -1).astype(np.float32, copy=False),
+            index=index,
+            columns=columns,
+        )
+
+    def to_dlc_dataframe(self, scorer: str = "skellyclicker") -> pd.DataFrame:
+        """Rows indexed by frame, (scorer, bodyparts, coords) columns like DLC's own single animal outputs."""
+        columns = pd.MultiIndex.from_product(
+            [[scorer], self.bodyparts, ["x", "y", "likelihood"]], names=["scorer", "bodyparts", "coords"]
+        )
+        return pd.DataFrame(self.values.reshape(len(self.frames), -1), index=self.frames, columns=columns)
+
+
+def find_dlc_outputs(folder: str | Path, sparse: bool = False) -> list[Path]:
+    """DLC's per-video .h5 outputs in `folder`: full-length or sparse (selected frames) ones."""
+    h5_paths = Path(folder).glob(f"*{DLC_SCORER_SEPARATOR}*.h5")
+    if sparse:
+        h5_paths = [path for path in h5_paths if path.stem.endswith(SPARSE_OUTPUT_SUFFIX)]
+    else:
+        h5_paths = [
+            path for path in h5_paths
+            if not path.stem.endswith((FILTERED_OUTPUT_SUFFIX, SPARSE_OUTPUT_SUFFIX))
+        ]
+    return sorted(h5_paths)
+
+
+def read_dlc_predictions(h5_path: str | Path) -> VideoPredictions:
+    """Read a single animal DLC .h5 output into typed arrays, without going through text."""
+    h5_path = Path(h5_path)
+    dataframe = pd.read_hdf(h5_path)
+    bodyparts = dataframe.columns.get_level_values("bodyparts").unique().tolist()
+    scorer = dataframe.columns.get_level_values("scorer")[0]
+    columns = pd.MultiIndex.from_product(
+        [[scorer], bodyparts, ["x", "y", "likelihood"]], names=["scorer", "bodyparts", "coords"]
+    )
+    values = dataframe.reindex(columns=columns).to_numpy(dtype=np.float32)
+    return VideoPredictions(
+        video_name=h5_path.name.split(DLC_SCORER_SEPARATOR)[0],
+        bodyparts=bodyparts,
+        frames=dataframe.index.to_numpy(dtype=np.int64),
+        values=values.reshape(len(dataframe), len(bodyparts), 3),
+    )
+
+
+def iter_dlc_predictions(h5_paths: Iterable[Path]) -> Iterator[VideoPredictions]:
+    for h5_path in h5_paths:
+        yield read_dlc_predictions(h5_path)
+
+
+def filter_video_predictions(
+    predictions: Iterable[VideoPredictions],
+    config: PredictionFilterConfig | None = None,
+) -> Iterator[VideoPredictions]:
+    """Filter a stream of per-video predictions one video at a time, so the merge after it keeps streaming."""
+    for video_predictions in predictions:
+        yield video_predictions.model_copy(
+            update={"values": filter_prediction_array(video_predictions.values, config)}
+        )
+
+
+def plot_video_trajectories(
+    predictions: Iterable[VideoPredictions],
+    plot_folder: str | Path,
+    project_config: dict,
+) -> Iterator[VideoPredictions]:
+    """Plot each video's trajectories, likelihoods and histograms as it streams past, like
+    deeplabcut.plot_trajectories does from the .h5 outputs, so filtered predictions are plotted without saving them.
+    """
+    from deeplabcut.utils.plotting import PlottingResults
+
+    plot_config = {
+        "pcutoff": project_config["pcutoff"],
+        "colormap": project_config["colormap"],
+        "alphavalue": project_config["alphavalue"],
+    }
+    for video_predictions in predictions:
+        video_plot_folder = Path(plot_folder) / video_predictions.video_name
+        video_plot_folder.mkdir(parents=True, exist_ok=True)
+        PlottingResults(
+            str(video_plot_folder),
+            video_predictions.to_dlc_dataframe(),
+            plot_config,
+            video_predictions.bodyparts,
+            None,
+        )
+        yield video_predictions
+
+
+def write_machine_labels(
+    predictions: Iterable[VideoPredictions],
+    csv_path: str | Path | None = None,
+    h5_path: str | Path | None = None,
+) -> int:
+    """Stream predictions video by video into a skellyclicker machine labels csv and/or frame-indexed .h5 table.
+
+    Only one video's rows are in memory at a time: each is appended to the csv and to the h5 table, so the
+    merged labels are never concatenated. Returns the number of videos written.
+    """
+    if csv_path is None and h5_path is None:
+        raise ValueError("Give a csv path, an h5 path or both to write machine labels to")
+
+    store = pd.HDFStore(h5_path, mode="w") if h5_path is not None else None
+    num_videos = 0
+    try:
+        for video_predictions in predictions:
+            dataframe = video_predictions.to_dataframe()
+            if csv_path is not None:
+                dataframe.to_csv(csv_path, mode="w" if num_videos == 0 else "a", header=num_videos == 0)
+            if store is not None:
+                store.append(
+                    LABELS_H5_KEY,
+                    dataframe,
+                    format="table",
+                    min_itemsize={"video": MAX_VIDEO_NAME_LENGTH},
+                )
+            logger.info(f"Merged {len(dataframe)} frames of {video_predictions.video_name}")
+            num_videos += 1
+    finally:
+        if store is not None:
+            store.close()
+    return num_videos
+
+
+def merge_dlc_outputs(
+    folder: str | Path,
+    csv_path: str | Path | None = None,
+    h5_path: str | Path | None = None,
+    sparse: bool = False,
+    filter_config: PredictionFilterConfig | None = None,
+    plot_config: dict | None = None,
+) -> int:
+    """Merge the DLC outputs in `folder` into skellyclicker machine labels, see `write_machine_labels`.
+
+    With a `filter_config`, predictions are filtered in memory on their way into the merge. With a DLC project
+    `plot_config`, the merged (filtered) predictions of each video are plotted to `folder`/plot-poses.
+    """
+    h5_paths = find_dlc_outputs(folder, sparse=sparse)
+    if not h5_paths:
+        raise FileNotFoundError(f"No matching DLC .h5 outputs found in {folder}. Please check the path.")
+    predictions = iter_dlc_predictions(h5_paths)
+    if filter_config is not None:
+        predictions = filter_video_predictions(predictions, filter_config)
+    if plot_config is not None:
+        predictions = plot_video_trajectories(predictions, Path(folder) / PLOT_FOLDER_NAME, plot_config)
+    num_videos = write_machine_labels(predictions, csv_path=csv_path, h5_path=h5_path)
+    print(f"Merged {num_videos} videos into skellyclicker machine labels {csv_path or ''} {h5_path or ''}")
+    return num_videos
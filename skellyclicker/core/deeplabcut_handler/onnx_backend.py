@@ -0,0 +1,214 @@
+import copy
+import logging
+import os
+from pathlib import Path
+from typing import Literal
+
+import numpy as np
+import torch
+import torch.nn as nn
+from deeplabcut.pose_estimation_pytorch.runners.inference import PoseInferenceRunner
+
+logger = logging.getLogger(__name__)
+
+InferenceBackend = Literal["pytorch", "onnx"]
+QuantizationMode = Literal["dynamic", "static"]
+
+ONNX_OPSET_VERSION = 17
+# exported outputs are named {head}.{output}, e.g. bodypart.heatmap, and regrouped per head after inference
+ONNX_OUTPUT_SEPARATOR = "."
+# sample frames run through both backends before the ONNX model is used
+ONNX_PARITY_FRAMES = 8
+# largest difference allowed between the backends' predictions, in pixels and in likelihood
+ONNX_PARITY_PIXEL_TOLERANCE = 0.5
+ONNX_PARITY_LIKELIHOOD_TOLERANCE = 0.01
+
+
+def import_onnxruntime():
+    try:
+        import onnxruntime
+    except ImportError as e:
+        raise ImportError(
+            "The ONNX inference backend needs onnx and onnxruntime, install them with "
+            "`pip install onnx onnxruntime`"
+        ) from e
+    return onnxruntime
+
+
+class _ExportablePoseModel(nn.Module):
+    """A PoseModel's backbone, neck and heads, with the head outputs flattened into a tuple for export.
+
+    The heads' predictors (heatmap peak finding, locref offsets) are not exported, they run in PyTorch on the
+    ONNX outputs so predictions are decoded exactly as DLC does.
+    """
+
+    def __init__(self, model: nn.Module, output_names: list[str]) -> None:
+        super().__init__()
+        self.model = model
+        self.output_names = output_names
+
+    def forward(self, x: torch.Tensor) -> tuple[torch.Tensor, ...]:
+        outputs = self.model(x)
+        return tuple(
+            outputs[head][name]
+            for head, name in (output_name.split(ONNX_OUTPUT_SEPARATOR, 1) for output_name in self.output_names)
+        )
+
+
+def get_onnx_path(snapshot_path: str | Path, quantization: QuantizationMode | None = None) -> Path:
+    """The ONNX export of a snapshot, or its int8 quantized variant, cached next to it."""
+    if quantization is not None:
+        return Path(snapshot_path).with_suffix(f".int8-{quantization}.onnx")
+    return Path(snapshot_path).with_suffix(".onnx")
+
+
+def export_snapshot_to_onnx(
+    pose_runner: PoseInferenceRunner,
+    snapshot_path: str | Path,
+    sample_frame: np.ndarray,
+    overwrite: bool = False,
+) -> Path:
+    """Export the runner's loaded model to ONNX next to its snapshot, unless an export newer than it exists.
+
+    Batch size, height and width are dynamic axes, `sample_frame` only traces the graph.
+    """
+    onnx_path = get_onnx_path(snapshot_path)
+    if not overwrite and onnx_path.is_file() and onnx_path.stat().st_mtime >= Path(snapshot_path).stat().st_mtime:
+        return onnx_path
+
+    # export a CPU copy, the runner's model stays on its device
+    model = copy.deepcopy(pose_runner.model).to("cpu").eval()
+    sample_input = preprocess_frames(pose_runner, [sample_frame])
+    with torch.inference_mode():
+        sample_outputs = model(sample_input)
+    output_names = [
+        f"{head}{ONNX_OUTPUT_SEPARATOR}{name}" for head, head_outputs in sample_outputs.items() for name in head_outputs
+    ]
+    dynamic_axes = {"images": {0: "batch", 2: "height", 3: "width"}}
+    dynamic_axes.update({output_name: {0: "batch"} for output_name in output_names})
+
+    print(f"Exporting {snapshot_path} to {onnx_path}")
+    # export to a temporary file and rename, so a failed export never leaves a file that looks up to date
+    temporary_path = onnx_path.with_suffix(".onnx.tmp")
+    torch.onnx.export(
+        _ExportablePoseModel(model, output_names),
+        sample_input,
+        str(temporary_path),
+        input_names=["images"],
+        output_names=output_names,
+        dynamic_axes=dynamic_axes,
+        opset_version=ONNX_OPSET_VERSION,
+        # the TorchScript exporter, newer torch versions default to the dynamo one which needs onnxscript
+        dynamo=False,
+    )
+    os.replace(temporary_path, onnx_path)
+    return onnx_path
+
+
+def create_onnx_session(onnx_path: str | Path, num_threads: int | None = None):
+    """A CPU onnxruntime session with all graph optimizations and `num_threads` intra-op threads (default: all cores)."""
+    onnxruntime = import_onnxruntime()
+    session_options = onnxruntime.SessionOptions()
+    session_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    session_options.intra_op_num_threads = num_threads or os.cpu_count() or 1
+    session_options.inter_op_num_threads = 1
+    session_options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+    return onnxruntime.InferenceSession(
+        str(onnx_path), sess_options=session_options, providers=["CPUExecutionProvider"]
+    )
+
+
+def preprocess_frames(pose_runner: PoseInferenceRunner, frames: list[np.ndarray]) -> torch.Tensor:
+    """Frames as the (batch, channels, height, width) model input the runner would build from them."""
+    inputs = []
+    for frame in frames:
+        if pose_runner.preprocessor is not None:
+            frame_input, _ = pose_runner.preprocessor(frame, {})
+        else:
+            frame_input = torch.as_tensor(frame)
+        inputs.append(frame_input)
+    # preprocessors end with ToBatch, each frame's input is already (1, channels, height, width)
+    return torch.cat(inputs, dim=0)
+
+
+class OnnxPoseInferenceRunner(PoseInferenceRunner):
+    """A PoseInferenceRunner that runs the model through onnxruntime on CPU.
+
+    Preprocessing, batching, the heads' predictors and postprocessing are the PyTorch runner's own, so the
+    predictions have exactly the same format.
+    """
+
+    session = None
+
+    @classmethod
+    def from_runner(cls, pose_runner: PoseInferenceRunner, session) -> "OnnxPoseInferenceRunner":
+        if pose_runner.dynamic is not None:
+            raise ValueError("Dynamic cropping is not supported by the ONNX backend")
+        onnx_runner = cls.__new__(cls)
+        onnx_runner.__dict__.update(pose_runner.__dict__)
+        onnx_runner.model = pose_runner.model.to("cpu")
+        onnx_runner.device = "cpu"
+        onnx_runner.session = session
+        return onnx_runner
+
+    def predict(self, inputs: torch.Tensor, **kwargs) -> list[dict[str, dict[str, np.ndarray]]]:
+        if kwargs:
+            raise ValueError(f"The ONNX backend does not support model inputs {sorted(kwargs)}")
+        output_names = [output.name for output in self.session.get_outputs()]
+        output_values = self.session.run(output_names, {"images": inputs.cpu().numpy()})
+        outputs: dict[str, dict[str, torch.Tensor]] = {}
+        for output_name, value in zip(output_names, output_values):
+            head, name = output_name.split(ONNX_OUTPUT_SEPARATOR, 1)
+            outputs.setdefault(head, {})[name] = torch.from_numpy(value)
+        raw_predictions = self.model.get_predictions(outputs)
+        return [
+            {
+                head: {pred_name: pred[b].cpu().numpy() for pred_name, pred in head_outputs.items()}
+                for head, head_outputs in raw_predictions.items()
+            }
+            for b in range(len(inputs))
+        ]
+
+
+def build_onnx_pose_runner(
+    pose_runner: PoseInferenceRunner,
+    snapshot_path: str | Path,
+    num_threads: int | None = None,
+    quantization: QuantizationMode | None = None,
+) -> OnnxPoseInferenceRunner:
+    """Wrap a loaded PyTorch pose runner to run its snapshot's (already exported) ONNX model."""
+    onnx_path = get_onnx_path(snapshot_path, quantization=quantization)
+    if not onnx_path.is_file():
+        raise FileNotFoundError(
+            f"No ONNX export of {snapshot_path} at {onnx_path}, export it with export_snapshot_to_onnx "
+            f"or quantize_onnx_model first"
+        )
+    return OnnxPoseInferenceRunner.from_runner(pose_runner, create_onnx_session(onnx_path, num_threads))
+
+
+def verify_onnx_parity(
+    torch_runner: PoseInferenceRunner,
+    onnx_runner: OnnxPoseInferenceRunner,
+    frames: list[np.ndarray],
+    pixel_tolerance: float = ONNX_PARITY_PIXEL_TOLERANCE,
+    likelihood_tolerance: float = ONNX_PARITY_LIKELIHOOD_TOLERANCE,
+) -> tuple[float, float]:
+    """Run sample frames through both backends and check that their bodypart predictions agree.
+
+    Returns the largest coordinate (pixels) and likelihood differences, raises a ValueError if either is over
+    its tolerance.
+    """
+    torch_poses = np.stack([prediction["bodyparts"][..., :3] for prediction in torch_runner.inference(frames)])
+    onnx_poses = np.stack([prediction["bodyparts"][..., :3] for prediction in onnx_runner.inference(frames)])
+    pixel_difference = float(np.nanmax(np.abs(torch_poses[..., :2] - onnx_poses[..., :2]), initial=0.0))
+    likelihood_difference = float(np.nanmax(np.abs(torch_poses[..., 2] - onnx_poses[..., 2]), initial=0.0))
+    logger.info(
+        f"ONNX parity on {len(frames)} frames: max {pixel_difference:.4f} px, "
+        f"max {likelihood_difference:.5f} likelihood difference"
+    )
+    if pixel_difference > pixel_tolerance or likelihood_difference > likelihood_tolerance:
+        raise ValueError(
+            f"ONNX predictions differ from PyTorch by up to {pixel_difference:.3f} px and "
+            f"{likelihood_difference:.4f} likelihood (tolerance {pixel_tolerance} px, {likelihood_tolerance})"
+        )
+    return pixel_difference, likelihood_difference
@@ -0,0 +1,97 @@
+import logging
+from typing import Literal
+
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel
+from scipy.signal import savgol_filter
+
+logger = logging.getLogger(__name__)
+
+FilterType = Literal["median", "savgol", "none"]
+
+
+class PredictionFilterConfig(BaseModel):
+    """Temporal filtering of predictions, run in memory between inference and the merge.
+
+    Points below `likelihood_threshold` are dropped first and, if `interpolate_gaps`, filled in from their
+    confident neighbours across gaps of up to `max_gap` frames. The coordinates are then smoothed with a
+    centered median or Savitzky-Golay filter of `window_length` frames. Likelihoods are left as predicted,
+    except that interpolated points get `interpolated_likelihood`.
+    """
+
+    filter_type: FilterType = "median"
+    window_length: int = 5
+    polyorder: int = 2  # Savitzky-Golay only
+    likelihood_threshold: float | None = None
+    interpolate_gaps: bool = True
+    max_gap: int | None = 10
+    interpolated_likelihood: float = 0.0
+
+
+def filter_prediction_array(values: np.ndarray, config: PredictionFilterConfig | None = None) -> np.ndarray:
+    """Filter a (frames, ..., 3) array of x, y, likelihood along the frame axis.
+
+    The trailing dimensions (points, or cameras and points) are flattened into columns, so every point of every
+    camera is filtered in the same vectorized pass. Returns a new float32 array of the same shape.
+    """
+    if config is None:
+        config = PredictionFilterConfig()
+    num_frames = values.shape[0]
+    coordinates = values[..., :2].reshape(num_frames, -1).astype(np.float64)
+    likelihoods = values[..., 2].reshape(num_frames, -1).astype(np.float64)
+
+    if config.likelihood_threshold is not None:
+        # NaN likelihoods compare False, so missing predictions are gated out too
+        unconfident = np.repeat(~(likelihoods >= config.likelihood_threshold), 2, axis=1)
+        coordinates[unconfident] = np.nan
+        if config.interpolate_gaps:
+            gated = np.isnan(coordinates)
+            interpolated = pd.DataFrame(coordinates).interpolate(method="linear", axis=0).to_numpy()
+            fillable = _get_fillable_gaps(gated, config.max_gap)
+            coordinates = np.where(fillable, interpolated, coordinates)
+            likelihoods[fillable[:, ::2]] = config.interpolated_likelihood
+
+    if config.filter_type == "median":
+        missing = np.isnan(coordinates)
+        # NaN-aware rolling median, windows at the edges and next to gaps use the frames they have
+        coordinates = (
+            pd.DataFrame(coordinates)
+            .rolling(window=config.window_length, center=True, min_periods=1)
+            .median()
+            .to_numpy()
+        )
+        coordinates[missing] = np.nan
+    elif config.filter_type == "savgol":
+        coordinates = _savgol_ignoring_nan(coordinates, config)
+
+    filtered = np.empty(values.shape, dtype=np.float32)
+    filtered[..., :2] = coordinates.reshape(values[..., :2].shape)
+    filtered[..., 2] = likelihoods.reshape(values[..., 2].shape)
+    return filtered
+
+
+def _get_fillable_gaps(missing: np.ndarray, max_gap: int | None) -> np.ndarray:
+    """Missing entries inside a gap with valid frames on both sides and at most `max_gap` frames long."""
+    num_frames = missing.shape[0]
+    frames = np.arange(num_frames)[:, None]
+    previous_valid = np.maximum.accumulate(np.where(~missing, frames, -1), axis=0)
+    next_valid = np.minimum.accumulate(np.where(~missing, frames, num_frames)[::-1], axis=0)[::-1]
+    fillable = missing & (previous_valid >= 0) & (next_valid < num_frames)
+    if max_gap is not None:
+        fillable &= next_valid - previous_valid - 1 <= max_gap
+    return fillable
+
+
+def _savgol_ignoring_nan(coordinates: np.ndarray, config: PredictionFilterConfig) -> np.ndarray:
+    """Savitzky-Golay along frames with NaN gaps temporarily bridged, so one gap doesn't wipe out its window."""
+    if coordinates.shape[0] < config.window_length:
+        logger.warning(f"Too few frames ({coordinates.shape[0]}) for a {config.window_length} frame filter")
+        return coordinates
+    missing = np.isnan(coordinates)
+    bridged = pd.DataFrame(coordinates).interpolate(axis=0, limit_direction="both").to_numpy()
+    all_missing = np.isnan(bridged).all(axis=0)
+    bridged[:, all_missing] = 0.0
+    smoothed = savgol_filter(bridged, window_length=config.window_length, polyorder=config.polyorder, axis=0)
+    smoothed[missing] = np.nan
+    return smoothed
@@ -0,0 +1,198 @@
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+import cv2
+import numpy as np
+from deeplabcut.pose_estimation_pytorch.runners.inference import PoseInferenceRunner
+from pydantic import BaseModel
+
+from skellyclicker.core.deeplabcut_handler.onnx_backend import (
+    QuantizationMode,
+    export_snapshot_to_onnx,
+    get_onnx_path,
+    import_onnxruntime,
+    preprocess_frames,
+)
+
+logger = logging.getLogger(__name__)
+
+# labeled frames sampled from the project's labeled-data, for static calibration and the accuracy report
+QUANTIZATION_SAMPLE_FRAMES = 64
+LABELED_FRAME_PATTERN = "*.png"
+
+
+class BodypartError(BaseModel):
+    """Distance in pixels between quantized and full precision predictions of one bodypart."""
+
+    mean_pixel_error: float
+    p95_pixel_error: float
+    max_pixel_error: float
+
+
+class QuantizationReport(BaseModel):
+    """Speed and accuracy of a quantized model against the full precision ONNX model, on labeled frames."""
+
+    mode: QuantizationMode
+    snapshot_path: str
+    quantized_model_path: str
+    num_frames: int
+    full_precision_frames_per_second: float
+    quantized_frames_per_second: float
+    bodypart_errors: dict[str, BodypartError]
+    created_at: str
+
+    @property
+    def speedup(self) -> float:
+        return self.quantized_frames_per_second / self.full_precision_frames_per_second
+
+    @property
+    def max_mean_pixel_error(self) -> float:
+        return max((error.mean_pixel_error for error in self.bodypart_errors.values()), default=0.0)
+
+    def save(self, report_path: str | Path) -> None:
+        Path(report_path).write_text(self.model_dump_json(indent=2))
+
+    def summary(self) -> str:
+        lines = [
+            f"int8 {self.mode} quantization of {Path(self.snapshot_path).name}: "
+            f"{self.quantized_frames_per_second:.1f} vs {self.full_precision_frames_per_second:.1f} frames/s "
+            f"({self.speedup:.2f}x) on {self.num_frames} labeled frames",
+            "  pixel error against full precision (mean / p95 / max):",
+        ]
+        lines += [
+            f"    {bodypart}: {error.mean_pixel_error:.2f} / {error.p95_pixel_error:.2f} / {error.max_pixel_error:.2f}"
+            for bodypart, error in self.bodypart_errors.items()
+        ]
+        return "\n".join(lines)
+
+
+def get_quantization_report_path(snapshot_path: str | Path, mode: QuantizationMode) -> Path:
+    return get_onnx_path(snapshot_path, quantization=mode).with_suffix(".report.json")
+
+
+def load_labeled_frames(project_path: str | Path, max_frames: int = QUANTIZATION_SAMPLE_FRAMES) -> list[np.ndarray]:
+    """Up to `max_frames` RGB frames spread evenly over the project's labeled-data folders."""
+    image_paths = sorted((Path(project_path) / "labeled-data").glob(f"*/{LABELED_FRAME_PATTERN}"))
+    if len(image_paths) > max_frames:
+        image_paths = [image_paths[index] for index in np.linspace(0, len(image_paths) - 1, max_frames).astype(int)]
+    frames = []
+    for image_path in image_paths:
+        image = cv2.imread(str(image_path))
+        if image is None:
+            logger.warning(f"Could not read labeled frame {image_path}")
+            continue
+        # frames come from the videos as RGB
+        frames.append(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+    return frames
+
+
+def quantize_onnx_model(
+    pose_runner: PoseInferenceRunner,
+    snapshot_path: str | Path,
+    mode: QuantizationMode,
+    calibration_frames: list[np.ndarray],
+    overwrite: bool = False,
+) -> Path:
+    """Quantize the snapshot's ONNX export to int8, cached next to the snapshot like the export itself.
+
+    Dynamic quantization stores 8-bit weights and quantizes activations on the fly. Static quantization also
+    fixes the activation ranges, calibrated on `calibration_frames`, and is usually faster but less accurate.
+    """
+    onnx_path = export_snapshot_to_onnx(pose_runner, snapshot_path, sample_frame=calibration_frames[0])
+    quantized_path = get_onnx_path(snapshot_path, quantization=mode)
+    if not overwrite and quantized_path.is_file() and quantized_path.stat().st_mtime >= onnx_path.stat().st_mtime:
+        return quantized_path
+
+    import_onnxruntime()
+    from onnxruntime.quantization import (
+        CalibrationDataReader,
+        QuantFormat,
+        QuantType,
+        quantize_dynamic,
+        quantize_static,
+    )
+
+    print(f"Quantizing {onnx_path} to int8 ({mode})")
+    if mode == "dynamic":
+        # onnxruntime's CPU ConvInteger only takes uint8 weights, int8 ones give a model that can't be loaded
+        quantize_dynamic(str(onnx_path), str(quantized_path), weight_type=QuantType.QUInt8)
+    elif mode == "static":
+        class LabeledFramesReader(CalibrationDataReader):
+            def __init__(self) -> None:
+                self._frames = iter(calibration_frames)
+
+            def get_next(self) -> dict[str, np.ndarray] | None:
+                frame = next(self._frames, None)
+                if frame is None:
+                    return None
+                return {"images": preprocess_frames(pose_runner, [frame]).cpu().numpy()}
+
+        quantize_static(
+            str(onnx_path),
+            str(quantized_path),
+            LabeledFramesReader(),
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=True,
+        )
+    else:
+        raise ValueError(f"Unknown quantization mode {mode}, expected 'dynamic' or 'static'")
+    return quantized_path
+
+
+def _run_timed(runner: PoseInferenceRunner, frames: list[np.ndarray]) -> tuple[np.ndarray, float]:
+    """(frames, bodyparts, 3) predictions and frames per second. Frames are run in groups of equal size."""
+    frame_indices_by_shape = defaultdict(list)
+    for index, frame in enumerate(frames):
+        frame_indices_by_shape[frame.shape].append(index)
+    poses: list[np.ndarray | None] = [None] * len(frames)
+    start = time.perf_counter()
+    for frame_indices in frame_indices_by_shape.values():
+        predictions = runner.inference([frames[index] for index in frame_indices])
+        for index, prediction in zip(frame_indices, predictions):
+            poses[index] = prediction["bodyparts"][0, :, :3]
+    elapsed = time.perf_counter() - start
+    return np.stack(poses), len(frames) / elapsed
+
+
+def create_quantization_report(
+    full_precision_runner: PoseInferenceRunner,
+    quantized_runner: PoseInferenceRunner,
+    frames: list[np.ndarray],
+    bodyparts: list[str],
+    mode: QuantizationMode,
+    snapshot_path: str | Path,
+) -> QuantizationReport:
+    """Time both ONNX models on `frames` and measure the quantized model's per-bodypart pixel error."""
+    # warm up both sessions, the first run allocates and plans the graph
+    full_precision_runner.inference(frames[:1])
+    quantized_runner.inference(frames[:1])
+    full_precision_poses, full_precision_fps = _run_timed(full_precision_runner, frames)
+    quantized_poses, quantized_fps = _run_timed(quantized_runner, frames)
+
+    distances = np.linalg.norm(quantized_poses[..., :2] - full_precision_poses[..., :2], axis=-1)
+    bodypart_errors = {}
+    for bodypart_index, bodypart in enumerate(bodyparts):
+        bodypart_distances = distances[:, bodypart_index]
+        bodypart_distances = bodypart_distances[~np.isnan(bodypart_distances)]
+        if len(bodypart_distances) == 0:
+            continue
+        bodypart_errors[bodypart] = BodypartError(
+            mean_pixel_error=float(np.mean(bodypart_distances)),
+            p95_pixel_error=float(np.percentile(bodypart_distances, 95)),
+            max_pixel_error=float(np.max(bodypart_distances)),
+        )
+    return QuantizationReport(
+        mode=mode,
+        snapshot_path=str(snapshot_path),
+        quantized_model_path=str(get_onnx_path(snapshot_path, quantization=mode)),
+        num_frames=len(frames),
+        full_precision_frames_per_second=full_precision_fps,
+        quantized_frames_per_second=quantized_fps,
+        bodypart_errors=bodypart_errors,
+        created_at=datetime.now().isoformat(),
+    )
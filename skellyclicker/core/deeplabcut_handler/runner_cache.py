@@ -0,0 +1,106 @@
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable
+
+from skellyclicker.core.deeplabcut_handler.file_fingerprints import hash_settings
+
+logger = logging.getLogger(__name__)
+
+# loaded models take about twice their snapshot's size in memory (weights plus buffers and the optimizer-free
+# state dict held while loading)
+MODEL_MEMORY_PER_SNAPSHOT_BYTE = 2
+DEFAULT_MAX_MODEL_MEMORY_BYTES = 8_000_000_000
+
+# settings that are applied to a cached runner on every use rather than loading another copy of the model
+_PER_JOB_SETTINGS = ("batch_size", "detector_batch_size", "onnx_threads")
+
+
+class InferenceRunnerCache:
+    """Loaded inference runners kept between analysis jobs, least recently used evicted first.
+
+    Runners are keyed by their settings (model config, snapshots, backend, ...) and the snapshots' modification
+    times, so retraining in place loads the new weights. The cache holds as many models as fit in
+    `max_memory_bytes`, estimated from their snapshot sizes; the most recently used one is always kept.
+
+    The backend each snapshot was prepared for (see `prepare_onnx_backend`) is kept too, so its export and
+    parity check run once per snapshot rather than once per job.
+    """
+
+    def __init__(self, max_memory_bytes: int = DEFAULT_MAX_MODEL_MEMORY_BYTES) -> None:
+        self.max_memory_bytes = max_memory_bytes
+        self._runners: OrderedDict[str, tuple[tuple, int]] = OrderedDict()
+        self._backends: dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def memory_bytes(self) -> int:
+        return sum(memory_bytes for _, memory_bytes in self._runners.values())
+
+    def __len__(self) -> int:
+        return len(self._runners)
+
+    def get_or_build(
+        self,
+        runner_settings: dict[str, Any],
+        build_runners: Callable[..., tuple],
+        key_settings: dict[str, Any] | None = None,
+    ) -> tuple:
+        """The (pose runner, detector runner) for these settings, built with `build_runners` on a miss.
+
+        Runners are keyed by `key_settings`, a JSON description of `runner_settings` (see `hash_settings`), by
+        default the settings themselves.
+        """
+        if key_settings is None:
+            key_settings = runner_settings
+        snapshot_paths = [
+            Path(path) for path in (runner_settings["snapshot_path"], runner_settings.get("detector_snapshot_path"))
+            if path is not None
+        ]
+        key = hash_settings(
+            {
+                **{name: value for name, value in key_settings.items() if name not in _PER_JOB_SETTINGS},
+                "snapshot_mtimes": [path.stat().st_mtime_ns for path in snapshot_paths],
+            }
+        )
+        with self._lock:
+            if key in self._runners:
+                self._runners.move_to_end(key)
+                runners, _ = self._runners[key]
+                logger.info(f"Using loaded model {snapshot_paths[0].name}")
+            else:
+                runners = build_runners(**runner_settings)
+                memory_bytes = sum(path.stat().st_size for path in snapshot_paths) * MODEL_MEMORY_PER_SNAPSHOT_BYTE
+                self._runners[key] = (runners, memory_bytes)
+                logger.info(f"Loaded model {snapshot_paths[0].name}, {len(self._runners)} models in memory")
+                self._evict()
+
+        pose_runner, detector_runner = runners
+        pose_runner.batch_size = runner_settings["batch_size"]
+        if detector_runner is not None and runner_settings.get("detector_batch_size") is not None:
+            detector_runner.batch_size = runner_settings["detector_batch_size"]
+        return runners
+
+    def get_or_prepare_backend(self, key_settings: dict[str, Any], prepare_backend: Callable[[], tuple]) -> tuple:
+        """The (backend, quantization) `prepare_backend` chose for these settings, prepared on a miss.
+
+        `key_settings` must include the "snapshot_path", its modification time is part of the key.
+        """
+        key = hash_settings(
+            {**key_settings, "snapshot_mtime": Path(key_settings["snapshot_path"]).stat().st_mtime_ns}
+        )
+        with self._lock:
+            if key not in self._backends:
+                self._backends[key] = prepare_backend()
+            return self._backends[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._runners.clear()
+            self._backends.clear()
+
+    def _evict(self) -> None:
+        while len(self._runners) > 1 and self.memory_bytes > self.max_memory_bytes:
+            key, _ = self._runners.popitem(last=False)
+            logger.info(f"Unloaded least recently used model {key}")
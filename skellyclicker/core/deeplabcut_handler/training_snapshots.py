@@ -0,0 +1,102 @@
+import json
+import logging
+from pathlib import Path
+from typing import Any
+
+import torch
+from deeplabcut.core.engine import Engine
+from deeplabcut.pose_estimation_pytorch.apis import utils
+from deeplabcut.pose_estimation_pytorch.runners.base import attempt_snapshot_load
+from deeplabcut.pose_estimation_pytorch.task import Task
+from deeplabcut.utils import auxiliaryfunctions
+
+logger = logging.getLogger(__name__)
+
+TRAINING_METADATA_FILE_NAME = "skellyclicker_metadata.json"
+WARM_START_SNAPSHOT_NAME = "skellyclicker-warm-start.pt"
+
+
+def get_train_folder(
+    project_config_path: str | Path,
+    iteration: int | None = None,
+    shuffle: int = 1,
+    trainingsetindex: int = 0,
+) -> Path:
+    """The folder holding a shuffle's pytorch_config.yaml and snapshots, for `iteration` or the current one."""
+    cfg = auxiliaryfunctions.read_config(project_config_path)
+    if iteration is not None:
+        cfg["iteration"] = iteration
+    train_fraction = cfg["TrainingFraction"][trainingsetindex]
+    model_folder = Path(cfg["project_path"]) / auxiliaryfunctions.get_model_folder(
+        train_fraction, shuffle, cfg, engine=Engine.PYTORCH
+    )
+    return model_folder / "train"
+
+
+def find_best_snapshot(train_folder: Path) -> Path | None:
+    """The shuffle's best snapshot (by validation metrics), else its last one, or None if it has none."""
+    model_cfg_path = train_folder / Engine.PYTORCH.pose_cfg_name
+    if not model_cfg_path.is_file():
+        return None
+    model_cfg = auxiliaryfunctions.read_plainconfig(model_cfg_path)
+    try:
+        # the last index is the best snapshot when training saved one
+        return Path(utils.get_model_snapshots(-1, train_folder, Task(model_cfg["method"]))[0].path)
+    except (ValueError, IndexError):
+        return None
+
+
+def is_warm_start_compatible(source_train_folder: Path, train_folder: Path) -> bool:
+    """Whether a snapshot trained in `source_train_folder` can initialise the model about to train in `train_folder`.
+
+    The architecture and bodyparts must match for the head weights to load.
+    """
+    source_cfg = auxiliaryfunctions.read_plainconfig(source_train_folder / Engine.PYTORCH.pose_cfg_name)
+    model_cfg = auxiliaryfunctions.read_plainconfig(train_folder / Engine.PYTORCH.pose_cfg_name)
+    for key in ("net_type", "method"):
+        if source_cfg.get(key) != model_cfg.get(key):
+            logger.warning(f"Cannot warm start: {key} changed from {source_cfg.get(key)} to {model_cfg.get(key)}")
+            return False
+    if source_cfg["metadata"]["bodyparts"] != model_cfg["metadata"]["bodyparts"]:
+        logger.warning("Cannot warm start: the project's bodyparts changed since the previous iteration")
+        return False
+    return True
+
+
+def create_warm_start_snapshot(source_snapshot_path: Path, train_folder: Path) -> Path:
+    """A copy of the source snapshot's weights only, to pass to train_network as `snapshot_path`.
+
+    Without the optimizer and scheduler state and with the epoch reset, DLC starts a fresh schedule (learning
+    rate, milestones, epoch count) from these weights rather than resuming the previous iteration's run at its
+    decayed learning rate.
+    """
+    snapshot = attempt_snapshot_load(source_snapshot_path, device="cpu")
+    warm_start_path = train_folder / WARM_START_SNAPSHOT_NAME
+    torch.save({"model": snapshot["model"], "metadata": {"epoch": 0}}, warm_start_path)
+    return warm_start_path
+
+
+def get_shortened_schedule_updates(train_folder: Path, epochs: int, full_epochs: int) -> dict[str, Any]:
+    """pytorch_cfg_updates compressing the learning rate milestones of a `full_epochs` schedule into `epochs`."""
+    model_cfg = auxiliaryfunctions.read_plainconfig(train_folder / Engine.PYTORCH.pose_cfg_name)
+    scheduler_cfg = model_cfg.get("runner", {}).get("scheduler") or {}
+    milestones = scheduler_cfg.get("params", {}).get("milestones")
+    if scheduler_cfg.get("type") != "LRListScheduler" or not milestones or epochs >= full_epochs:
+        return {}
+    scaled_milestones = [max(1, round(milestone * epochs / full_epochs)) for milestone in milestones]
+    return {"runner.scheduler.params.milestones": scaled_milestones}
+
+
+def save_training_metadata(train_folder: Path, metadata: dict[str, Any]) -> Path:
+    metadata_path = train_folder / TRAINING_METADATA_FILE_NAME
+    with open(metadata_path, "w") as f:
+        json.dump(metadata, f, indent=2)
+    return metadata_path
+
+
+def load_training_metadata(train_folder: Path) -> dict[str, Any] | None:
+    metadata_path = train_folder / TRAINING_METADATA_FILE_NAME
+    if not metadata_path.is_file():
+        return None
+    with open(metadata_path) as f:
+        return json.load(f)
@@ -0,0 +1,278 @@
+import atexit
+import queue
+import threading
+import weakref
+from pathlib import Path
+from typing import Any
+
+import cv2
+import numpy as np
+from deeplabcut.pose_estimation_pytorch.apis.videos import VideoIterator
+
+# decoded frames buffered ahead of inference, per video (a 1080p RGB frame is ~6 MB)
+DEFAULT_PREFETCH_FRAMES = 16
+
+# gaps up to this many frames are decoded through rather than seeked over, as a seek decodes from the previous
+# keyframe anyway
+MAX_GRAB_GAP_FRAMES = 32
+
+_END_OF_VIDEO = object()
+_QUEUE_POLL_SECONDS = 0.1
+
+# iterators with a running decode thread, stopped at exit so no thread is killed in the middle of an OpenCV read
+_decoding_iterators: "weakref.WeakSet[PrefetchingVideoIterator]" = weakref.WeakSet()
+
+
+class PrefetchingVideoIterator(VideoIterator):
+    """A VideoIterator that decodes frames ahead on a background thread into a bounded queue.
+
+    DLC's inference runner already preprocesses and batches frames on its own thread, but it pulls frames from
+    the iterator on that same thread, so decoding and preprocessing alternate. With this iterator the capture is
+    read on a separate thread (OpenCV releases the GIL while decoding), and the runner only takes ready frames.
+    Iterating again (e.g. detector then pose model) restarts decoding from the first frame.
+    """
+
+    def __init__(
+        self,
+        video_path: str | Path,
+        context: list[dict[str, Any]] | None = None,
+        cropping: list[int] | None = None,
+        prefetch_frames: int = DEFAULT_PREFETCH_FRAMES,
+    ) -> None:
+        super().__init__(video_path, context=context, cropping=cropping)
+        self._prefetch_frames = prefetch_frames
+        self._frames: queue.Queue | None = None
+        self._decode_thread: threading.Thread | None = None
+        self._stop_event = threading.Event()
+        self._decode_error: BaseException | None = None
+
+    def _decode(self, frames: queue.Queue, stop_event: threading.Event, crop: bool) -> None:
+        try:
+            while not stop_event.is_set():
+                frame = VideoIterator.read_frame(self, crop=crop)
+                if frame is None:
+                    break
+                # read_frame returns a reversed-channel view, make it contiguous here rather than on the runner thread
+                self._put(frames, np.ascontiguousarray(frame), stop_event)
+        except BaseException as e:
+            self._decode_error = e
+        finally:
+            self._put(frames, _END_OF_VIDEO, stop_event)
+
+    @staticmethod
+    def _put(frames: queue.Queue, item: object, stop_event: threading.Event) -> None:
+        while not stop_event.is_set():
+            try:
+                frames.put(item, timeout=_QUEUE_POLL_SECONDS)
+                return
+            except queue.Full:
+                continue
+
+    def _start_decoding(self, crop: bool) -> None:
+        self._stop_event = threading.Event()
+        self._decode_error = None
+        self._frames = queue.Queue(maxsize=self._prefetch_frames)
+        self._decode_thread = threading.Thread(
+            target=self._decode, args=(self._frames, self._stop_event, crop), daemon=True
+        )
+        self._decode_thread.start()
+        _decoding_iterators.add(self)
+
+    def _stop_decoding(self) -> None:
+        if self._decode_thread is None:
+            return
+        self._stop_event.set()
+        self._decode_thread.join()
+        self._decode_thread = None
+        self._frames = None
+        _decoding_iterators.discard(self)
+
+    def read_frame(self, shrink: int = 1, crop: bool = False) -> np.ndarray | None:
+        if shrink != 1:
+            # resized reads are not used for inference, read them directly
+            self._stop_decoding()
+            return super().read_frame(shrink=shrink, crop=crop)
+        if self._decode_thread is None:
+            self._start_decoding(crop)
+
+        frame = self._frames.get()
+        if frame is _END_OF_VIDEO:
+            self._stop_decoding()
+            if self._decode_error is not None:
+                raise self._decode_error
+            return None
+        return frame
+
+    def reset(self) -> None:
+        self._stop_decoding()
+        super().reset()
+
+    def set_to_frame(self, ind: int) -> None:
+        self._stop_decoding()
+        super().set_to_frame(ind)
+
+
+@atexit.register
+def _stop_all_decoding() -> None:
+    for video_iterator in list(_decoding_iterators):
+        video_iterator._stop_decoding()
+
+
+class SparseVideoIterator(VideoIterator):
+    """A VideoIterator over selected frames of a video, in increasing order.
+
+    Short gaps between frames are skipped by grabbing (decoding without converting) the frames in between,
+    long gaps by seeking. A seek that reports landing anywhere but the requested frame is redone from the
+    start of the video and grabbed forward, so predictions always belong to the frame numbers they claim.
+    Context (e.g. detector bounding boxes) is indexed per selected frame.
+    """
+
+    def __init__(
+        self,
+        video_path: str | Path,
+        frame_indices: list[int] | None = None,
+        context: list[dict[str, Any]] | None = None,
+        cropping: list[int] | None = None,
+    ) -> None:
+        super().__init__(video_path, context=context, cropping=cropping)
+        self.frame_indices: list[int] = []
+        self._selection_position = 0
+        self._capture_position = 0
+        self.select_frames(frame_indices or [])
+
+    def select_frames(self, frame_indices: list[int]) -> None:
+        """Set the frames to iterate over, frames outside the video are dropped. Restarts iteration."""
+        self.frame_indices = sorted(set(index for index in frame_indices if 0 <= index < len(self)))
+        self.reset()
+
+    def _move_to_frame(self, frame_index: int) -> None:
+        if frame_index < self._capture_position or frame_index - self._capture_position > MAX_GRAB_GAP_FRAMES:
+            self.video.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+            self._capture_position = int(self.video.get(cv2.CAP_PROP_POS_FRAMES))
+            if self._capture_position != frame_index:
+                self.video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                self._capture_position = 0
+        while self._capture_position < frame_index and self.video.grab():
+            self._capture_position += 1
+
+    def read_frame(self, shrink: int = 1, crop: bool = False) -> np.ndarray | None:
+        if self._selection_position >= len(self.frame_indices):
+            return None
+        frame_index = self.frame_indices[self._selection_position]
+        self._move_to_frame(frame_index)
+        frame = super().read_frame(shrink=shrink, crop=crop)
+        if frame is None:
+            return None
+        self._capture_position = frame_index + 1
+        self._selection_position += 1
+        return frame
+
+    def reset(self) -> None:
+        super().reset()
+        self._selection_position = 0
+        self._capture_position = 0
+
+
+class InterleavedVideoIterator:
+    """Iterates over frame-synchronized videos one timestep at a time: frame t of every camera, then frame t + 1.
+
+    Fed to an inference runner, consecutive frames in a batch are the same moment seen by different cameras.
+    Cameras that run out of frames drop out, `camera_indices` records the camera of every frame yielded so
+    predictions can be split back per camera.
+    """
+
+    def __init__(self, video_iterators: list[VideoIterator]) -> None:
+        self.video_iterators = video_iterators
+        self.camera_indices: list[int] = []
+
+    def __len__(self) -> int:
+        return sum(len(video_iterator) for video_iterator in self.video_iterators)
+
+    def __iter__(self):
+        self.camera_indices = []
+        frame_iterators = [iter(video_iterator) for video_iterator in self.video_iterators]
+        active_cameras = list(range(len(frame_iterators)))
+        while active_cameras:
+            for camera_index in list(active_cameras):
+                try:
+                    frame = next(frame_iterators[camera_index])
+                except StopIteration:
+                    active_cameras.remove(camera_index)
+                    continue
+                self.camera_indices.append(camera_index)
+                yield frame
+
+    def split_per_camera(self, predictions: list) -> list[list]:
+        predictions_per_camera = [[] for _ in self.video_iterators]
+        for camera_index, prediction in zip(self.camera_indices, predictions):
+            predictions_per_camera[camera_index].append(prediction)
+        return predictions_per_camera
+
+
+class FanOutVideoIterator:
+    """Decodes a video once on a background thread and hands every frame to several consumers.
+
+    Each consumer (one per model) is an iterable with its own bounded queue, so several inference runners can
+    run on their own threads over the same decoded frames. Decoding goes at the pace of the slowest consumer.
+    `stop()` ends decoding and every consumer, e.g. when one runner fails, so no thread is left waiting.
+    """
+
+    def __init__(
+        self,
+        video_iterator: VideoIterator,
+        num_consumers: int,
+        buffer_frames: int = DEFAULT_PREFETCH_FRAMES,
+    ) -> None:
+        self.video_iterator = video_iterator
+        self._queues = [queue.Queue(maxsize=buffer_frames) for _ in range(num_consumers)]
+        self._stop_event = threading.Event()
+        self._decode_error: BaseException | None = None
+        self._decode_thread: threading.Thread | None = None
+        self.consumers = [_FanOutConsumer(self, frames) for frames in self._queues]
+
+    def __len__(self) -> int:
+        return len(self.video_iterator)
+
+    def start(self) -> None:
+        self._decode_thread = threading.Thread(target=self._decode, daemon=True)
+        self._decode_thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._decode_thread is not None:
+            self._decode_thread.join()
+            self._decode_thread = None
+
+    def _decode(self) -> None:
+        try:
+            for frame in self.video_iterator:
+                # the same array goes to every consumer, runners preprocess into new arrays and never modify it
+                frame = np.ascontiguousarray(frame)
+                for frames in self._queues:
+                    PrefetchingVideoIterator._put(frames, frame, self._stop_event)
+        except BaseException as e:
+            self._decode_error = e
+        finally:
+            for frames in self._queues:
+                PrefetchingVideoIterator._put(frames, _END_OF_VIDEO, self._stop_event)
+
+
+class _FanOutConsumer:
+    def __init__(self, fan_out: FanOutVideoIterator, frames: queue.Queue) -> None:
+        self._fan_out = fan_out
+        self._frames = frames
+
+    def __len__(self) -> int:
+        return len(self._fan_out)
+
+    def __iter__(self):
+        while not self._fan_out._stop_event.is_set():
+            try:
+                frame = self._frames.get(timeout=_QUEUE_POLL_SECONDS)
+            except queue.Empty:
+                continue
+            if frame is _END_OF_VIDEO:
+                break
+            yield frame
+        if self._fan_out._decode_error is not None:
+            raise self._fan_out._decode_error
@@ -0,0 +1,233 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterator
+
+import cv2
+import numpy as np
+
+from skellyclicker import MAX_WINDOW_SIZE, VideoPathString
+from skellyclicker.core.click_data_handler.data_handler import (
+    DataHandler,
+    load_connections_for_labels,
+)
+from skellyclicker.core.video_handler.image_annotator import (
+    ImageAnnotator,
+    ImageAnnotatorConfig,
+)
+from skellyclicker.core.video_handler.video_export import (
+    LabelOverlay,
+    VideoExportConfig,
+    create_video_writer,
+    release_writer_after_error,
+    run_frame_pipeline,
+)
+from skellyclicker.core.video_handler.video_handler import (
+    MACHINE_LABELS_CONNECTION_COLOR,
+    VideoHandler,
+)
+from skellyclicker.core.video_handler.video_models import (
+    GridParameters,
+    VideoPlaybackState,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _label_overlays(
+    videos: dict[VideoPathString, VideoPlaybackState],
+    data_handler: DataHandler,
+    annotator: ImageAnnotator,
+    num_frames: int,
+) -> list[LabelOverlay | None]:
+    overlays = []
+    for video_path in videos:
+        video_name = data_handler.find_video_name(video_path)
+        if video_name is None:
+            logger.warning(f"No labels found for video {Path(video_path).name}")
+            overlays.append(None)
+            continue
+        overlays.append(
+            LabelOverlay(
+                annotator=annotator,
+                labels=data_handler.get_video_array(
+                    video_name=video_name,
+                    point_names=annotator.config.tracked_points,
+                    num_frames=num_frames,
+                ),
+            )
+        )
+    return overlays
+
+
+def _read_synchronized_frames(
+    videos: dict[VideoPathString, VideoPlaybackState], start_frame: int, end_frame: int
+) -> Iterator[tuple[int, list[np.ndarray | None]]]:
+    """Decode all videos in lockstep, seeking once to `start_frame` and reading sequentially from there."""
+    for video in videos.values():
+        video.cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    for frame_number in range(start_frame, end_frame):
+        images = []
+        for video in videos.values():
+            success, image = video.cap.read()
+            images.append(image if success else None)
+        if all(image is None for image in images):
+            return
+        yield frame_number, images
+
+
+def _render_cell(
+    grid_image: np.ndarray,
+    image: np.ndarray | None,
+    video: VideoPlaybackState,
+    video_index: int,
+    frame_number: int,
+    grid_parameters: GridParameters,
+    overlays: list[list[LabelOverlay | None]],
+) -> None:
+    if image is None:
+        return
+    for video_overlays in overlays:
+        overlay = video_overlays[video_index]
+        if overlay is not None:
+            image = overlay.draw(image, frame_number)
+
+    scaling = video.scaling_params
+    scaled_image = cv2.resize(image, (scaling.scaled_width, scaling.scaled_height))
+
+    row = video_index // grid_parameters.columns
+    col = video_index % grid_parameters.columns
+    y_start = row * grid_parameters.cell_height + scaling.y_offset
+    x_start = col * grid_parameters.cell_width + scaling.x_offset
+    # each cell writes to its own region of the grid, so cells can render concurrently
+    grid_image[
+        y_start : y_start + scaled_image.shape[0],
+        x_start : x_start + scaled_image.shape[1],
+    ] = scaled_image
+
+
+def export_grid_video(
+    video_paths: list[str],
+    output_path: str | Path,
+    labels_path: str | Path | None = None,
+    machine_labels_path: str | Path | None = None,
+    start_frame: int = 0,
+    end_frame: int | None = None,
+    max_grid_size: tuple[int, int] = MAX_WINDOW_SIZE,
+    export_config: VideoExportConfig | None = None,
+    cell_workers: int | None = None,
+    connections: list[tuple[str, str]] | None = None,
+) -> int:
+    """Render a VideoHandler-style grid of all videos with human and/or machine labels straight to a video file.
+
+    Runs without a window. Videos are decoded sequentially in lockstep, grid cells are rendered in parallel,
+    and frames go through the same pipelined encoder as the per-video exports. Returns the number of frames written.
+    """
+    if export_config is None:
+        export_config = VideoExportConfig()
+    if cell_workers is None:
+        cell_workers = min(len(video_paths), os.cpu_count() or 1)
+
+    video_paths = sorted(video_paths)
+    for path in video_paths:
+        if not Path(path).is_file():
+            raise ValueError(f"File {path} does not exist.")
+    videos, grid_parameters, frame_count = VideoHandler._load_videos(video_paths, max_grid_size)
+
+    if end_frame is None or end_frame > frame_count:
+        end_frame = frame_count
+    if start_frame < 0 or start_frame >= end_frame:
+        raise ValueError(f"Invalid frame range [{start_frame}, {end_frame}) for videos with {frame_count} frames")
+
+    if connections is None:
+        connections = []
+        for path in (machine_labels_path, labels_path):
+            if path is not None and not connections:
+                connections = load_connections_for_labels(path)
+
+    overlays: list[list[LabelOverlay | None]] = []
+    if labels_path is not None:
+        data_handler = DataHandler.from_csv(labels_path)
+        annotator = ImageAnnotator(
+            config=ImageAnnotatorConfig(
+                tracked_points=data_handler.config.tracked_point_names,
+                show_clicks=False,
+                connections=connections,
+            )
+        )
+        overlays.append(_label_overlays(videos, data_handler, annotator, frame_count))
+    if machine_labels_path is not None:
+        machine_labels_handler = DataHandler.from_file(machine_labels_path)
+        machine_labels_annotator = ImageAnnotator(
+            config=ImageAnnotatorConfig(
+                marker_type=cv2.MARKER_CROSS,
+                marker_size=10,
+                marker_thickness=1,
+                tracked_points=machine_labels_handler.config.tracked_point_names,
+                show_clicks=False,
+                connections=connections,
+                connection_color=MACHINE_LABELS_CONNECTION_COLOR,
+            )
+        )
+        overlays.append(_label_overlays(videos, machine_labels_handler, machine_labels_annotator, frame_count))
+    if not overlays:
+        logger.info("No labels provided, exporting grid without annotations")
+
+    framerate = next(iter(videos.values())).cap.get(cv2.CAP_PROP_FPS)
+    frame_size = (grid_parameters.total_width, grid_parameters.total_height)
+
+    with ThreadPoolExecutor(max_workers=cell_workers) as cell_pool:
+
+        def render(frame_number: int, images: list[np.ndarray | None]) -> np.ndarray:
+            grid_image = np.zeros(
+                (grid_parameters.total_height, grid_parameters.total_width, 3),
+                dtype=np.uint8,
+            )
+            futures = [
+                cell_pool.submit(
+                    _render_cell,
+                    grid_image,
+                    image,
+                    video,
+                    video_index,
+                    frame_number,
+                    grid_parameters,
+                    overlays,
+                )
+                for video_index, (video, image) in enumerate(zip(videos.values(), images))
+            ]
+            for future in futures:
+                future.result()
+            cv2.putText(
+                grid_image,
+                f"Frame {frame_number}",
+                (10, 30),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                0.7,
+                (255, 255, 255),
+                2,
+            )
+            return grid_image
+
+        logger.info(f"Writing grid video of frames [{start_frame}, {end_frame}) to {output_path}")
+        writer = create_video_writer(output_path, framerate, frame_size, export_config.encoder)
+        try:
+            frames_written = run_frame_pipeline(
+                frames=_read_synchronized_frames(videos, start_frame, end_frame),
+                render_frame=render,
+                writer=writer,
+                config=export_config,
+            )
+        except BaseException:
+            for video in videos.values():
+                video.cap.release()
+            release_writer_after_error(writer)
+            raise
+        for video in videos.values():
+            video.cap.release()
+        # raises if ffmpeg failed to finish the video
+        writer.release()
+
+    logger.info(f"Wrote {frames_written} grid frames to {output_path}")
+    return frames_written
@@ -1,6 +1,6 @@
 import cv2
 import numpy as np
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 
 from skellyclicker.core.video_handler.video_models import ClickData
 
@@ -37,7 +37,16 @@ FULL_HELP_TEXT = (
     "Press 'c' to toggle auto next point.\n"
     "Press 'm' to toggle machine labels visibility.\n"
     "Press 'v' to copy machine labels to labelled data.\n"
+    "Press 'b' to copy machine labels for the next 100 frames\n"
+    "in all videos.\n"
+    "Press 'p' to track the current frame's labels to the\n"
+    "neighbouring frames, 'y' to accept or 'x' to discard them.\n"
+    "Press 'z' to undo the last copy or interpolation.\n"
+    "Press 't' to interpolate the active point between\n"
+    "labeled frames in all videos.\n"
+    "Use '-' and '=' to change the machine label likelihood threshold.\n"
     "Press 'n' to toggle point name visibility.\n"
+    "Press 'o' to toggle skeleton visibility.\n"
     "Press 'h' to toggle help text.\n"
     "Press 'Esc' to quit.\n"
     "You will be prompted to save the data in the terminal."
@@ -101,9 +110,50 @@ class ImageAnnotatorConfig(BaseModel):
     show_names: bool = True
     tracked_points: list[str] = []
 
+    show_connections: bool = True
+    connections: list[tuple[str, str]] = []
+    connection_color: tuple[int, int, int] = (230, 230, 230)
+    connection_thickness: int = 1
+
 
 class ImageAnnotator(BaseModel):
     config: ImageAnnotatorConfig = ImageAnnotatorConfig()
+    _connection_indices: dict[tuple[str, ...], tuple[np.ndarray, np.ndarray]] = PrivateAttr(default_factory=dict)
+
+    def _get_connection_indices(self, point_names: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        """Parent and child row indices into a points array ordered like `point_names`, cached per ordering."""
+        key = tuple(point_names)
+        if key not in self._connection_indices:
+            point_indices = {point_name: index for index, point_name in enumerate(point_names)}
+            pairs = [
+                (point_indices[parent], point_indices[child])
+                for parent, child in self.config.connections
+                if parent in point_indices and child in point_indices
+            ]
+            pairs_array = np.array(pairs, dtype=np.intp).reshape(-1, 2)
+            self._connection_indices[key] = (pairs_array[:, 0], pairs_array[:, 1])
+        return self._connection_indices[key]
+
+    def draw_connections(self, image: np.ndarray, points: np.ndarray, point_names: list[str]) -> None:
+        """Draw skeleton segments between connected points, in place.
+
+        Endpoints are gathered from the points array in one shot and all segments are drawn with a single
+        cv2.polylines call per color (dark outline, then the connection color).
+        """
+        if not self.config.show_connections or not self.config.connections:
+            return
+        parent_indices, child_indices = self._get_connection_indices(point_names)
+        if parent_indices.size == 0:
+            return
+        segments = np.stack([points[parent_indices], points[child_indices]], axis=1)  # (connections, 2, 2)
+        segments = segments[~np.isnan(segments).any(axis=(1, 2))]
+        if segments.shape[0] == 0:
+            return
+        polylines = list(np.rint(segments).astype(np.int32))
+        cv2.polylines(image, polylines, isClosed=False, color=(1, 1, 1),
+                      thickness=self.config.connection_thickness + 2, lineType=cv2.LINE_AA)
+        cv2.polylines(image, polylines, isClosed=False, color=self.config.connection_color,
+                      thickness=self.config.connection_thickness, lineType=cv2.LINE_AA)
 
     def annotate_image_grid(self,
                             image: np.ndarray,
@@ -135,15 +185,24 @@ class ImageAnnotator(BaseModel):
             image: np.ndarray,
             active_point: str | None = None,
             click_data: dict[str, ClickData] | None = None,
+            interpolated_points: set[str] | None = None,
     ) -> np.ndarray:
         image_height, image_width = image.shape[:2]
         text_offset = int(image_height * 0.05)
 
         if click_data is None:
             click_data = {}
+        if interpolated_points is None:
+            interpolated_points = set()
         # Copy the original image for annotation
         annotated_image = image.copy()
         marker_colors = get_colors(self.config.tracked_points)
+        if self.config.show_connections and self.config.connections:
+            points = np.full((len(self.config.tracked_points), 2), np.nan, dtype=np.float32)
+            for point_index, point_name in enumerate(self.config.tracked_points):
+                if point_name in click_data:
+                    points[point_index] = (click_data[point_name].x, click_data[point_name].y)
+            self.draw_connections(annotated_image, points, self.config.tracked_points)
         # Draw a marker for each click
         for point_name, click in click_data.items():
             marker_color = marker_colors.get(point_name, (255, 0, 255))
@@ -163,6 +222,16 @@ class ImageAnnotator(BaseModel):
                 markerSize=self.config.marker_size,
                 thickness=self.config.marker_thickness,
             )
+            if point_name in interpolated_points:
+                # ring interpolated points so they stand out from clicked ones during review
+                cv2.circle(
+                    annotated_image,
+                    center=(click.x, click.y),
+                    radius=self.config.marker_size,
+                    color=marker_color,
+                    thickness=self.config.marker_thickness,
+                    lineType=cv2.LINE_AA,
+                )
             if self.config.show_names:
                 draw_doubled_text(image=annotated_image,
                                   text=point_name,
@@ -179,6 +248,8 @@ class ImageAnnotator(BaseModel):
             for tracked_point in self.config.tracked_points:
                 if tracked_point in click_data:
                     label_string += f"{tracked_point}: {click_data[tracked_point].x}, {click_data[tracked_point].y} "
+                    if tracked_point in interpolated_points:
+                        label_string += "(interpolated) "
                 else:
                     label_string += f"{tracked_point}: (?, ?) "
 
@@ -196,3 +267,49 @@ class ImageAnnotator(BaseModel):
                             line_spacing=30,
                             )
         return annotated_image
+
+    def annotate_image_with_points(
+            self,
+            image: np.ndarray,
+            points: np.ndarray,
+            point_names: list[str],
+            copy_image: bool = True,
+    ) -> np.ndarray:
+        """Draw markers from a (num_points, 2) array ordered like `point_names`, skipping NaN points.
+
+        Used for bulk export where labels are pre-sliced into arrays instead of per-frame ClickData dicts.
+        """
+        annotated_image = image.copy() if copy_image else image
+        marker_colors = get_colors(self.config.tracked_points)
+        self.draw_connections(annotated_image, points, point_names)
+        valid_points = ~np.isnan(points).any(axis=1)
+        for point_index in np.flatnonzero(valid_points):
+            point_name = point_names[point_index]
+            position = (int(points[point_index, 0]), int(points[point_index, 1]))
+            marker_color = marker_colors.get(point_name, (255, 0, 255))
+            cv2.drawMarker(
+                annotated_image,
+                position=position,
+                color=(1, 1, 1),
+                markerType=self.config.marker_type,
+                markerSize=int(self.config.marker_size * 1.3),
+                thickness=int(self.config.marker_thickness * 1.3),
+            )
+            cv2.drawMarker(
+                annotated_image,
+                position=position,
+                color=marker_color,
+                markerType=self.config.marker_type,
+                markerSize=self.config.marker_size,
+                thickness=self.config.marker_thickness,
+            )
+            if self.config.show_names:
+                draw_doubled_text(image=annotated_image,
+                                  text=point_name,
+                                  x=position[0] + self.config.marker_size,
+                                  y=position[1] - self.config.marker_size,
+                                  font_scale=self.config.text_size * .7,
+                                  color=marker_color,
+                                  thickness=1,
+                                  )
+        return annotated_image
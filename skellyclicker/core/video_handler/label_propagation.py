@@ -0,0 +1,129 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+from pydantic import BaseModel
+
+from skellyclicker.core.video_handler.video_export import read_video_frames
+
+logger = logging.getLogger(__name__)
+
+
+class LabelPropagationConfig(BaseModel):
+    """Settings for tracking labels to neighbouring frames with pyramidal Lucas-Kanade optical flow."""
+
+    num_frames: int = 10  # frames tracked in each direction from the labeled frame
+    window_size: int = 21
+    max_pyramid_level: int = 3
+    max_iterations: int = 30
+    epsilon: float = 0.01
+    # a point is dropped once tracking it back one frame lands further than this from where it started (pixels)
+    max_forward_backward_error: float = 1.5
+
+
+def _track_step(
+    previous_image: np.ndarray,
+    next_image: np.ndarray,
+    points: np.ndarray,
+    config: LabelPropagationConfig,
+) -> np.ndarray:
+    """Track points one frame with a forward-backward check, NaN for points that are lost or unreliable."""
+    tracked = np.full_like(points, np.nan)
+    valid = ~np.isnan(points).any(axis=1)
+    if not valid.any():
+        return tracked
+
+    flow_parameters = dict(
+        winSize=(config.window_size, config.window_size),
+        maxLevel=config.max_pyramid_level,
+        criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, config.max_iterations, config.epsilon),
+    )
+    start_points = points[valid].astype(np.float32).reshape(-1, 1, 2)
+    forward_points, forward_status, _ = cv2.calcOpticalFlowPyrLK(
+        previous_image, next_image, start_points, None, **flow_parameters
+    )
+    backward_points, backward_status, _ = cv2.calcOpticalFlowPyrLK(
+        next_image, previous_image, forward_points, None, **flow_parameters
+    )
+    forward_backward_error = np.linalg.norm((backward_points - start_points).reshape(-1, 2), axis=1)
+    reliable = (
+        (forward_status.ravel() == 1)
+        & (backward_status.ravel() == 1)
+        & (forward_backward_error <= config.max_forward_backward_error)
+    )
+    tracked_valid = forward_points.reshape(-1, 2)
+    tracked_valid[~reliable] = np.nan
+    tracked[valid] = tracked_valid
+    return tracked
+
+
+def track_labels_in_video(
+    video_path: str | Path,
+    frame_number: int,
+    points: np.ndarray,
+    config: LabelPropagationConfig | None = None,
+) -> tuple[int, np.ndarray]:
+    """Track a (points, 2) array of labels on `frame_number` forward and backward through one video.
+
+    The frame window is decoded once, sequentially. Returns the first frame of the window and a
+    (frames, points, 2) array covering it, with the labeled frame holding the original points.
+    """
+    if config is None:
+        config = LabelPropagationConfig()
+    if np.isnan(points).all():
+        return frame_number, np.full((0, points.shape[0], 2), np.nan, dtype=np.float32)
+
+    cap = cv2.VideoCapture(str(video_path))
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video: {video_path}")
+    first_frame = max(0, frame_number - config.num_frames)
+    try:
+        gray_images = [
+            cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            for _, image in read_video_frames(
+                cap, start_frame=first_frame, end_frame=frame_number + config.num_frames + 1
+            )
+        ]
+    finally:
+        cap.release()
+
+    labeled_position = frame_number - first_frame
+    if labeled_position >= len(gray_images):
+        logger.warning(f"Could not read frame {frame_number} from {video_path}")
+        return first_frame, np.full((0, points.shape[0], 2), np.nan, dtype=np.float32)
+
+    tracks = np.full((len(gray_images), points.shape[0], 2), np.nan, dtype=np.float32)
+    tracks[labeled_position] = points
+    for step in (1, -1):
+        position = labeled_position
+        while 0 <= position + step < len(gray_images) and not np.isnan(tracks[position]).all():
+            tracks[position + step] = _track_step(
+                gray_images[position], gray_images[position + step], tracks[position], config
+            )
+            position += step
+    return first_frame, tracks
+
+
+def propagate_labels(
+    video_paths: list[str],
+    frame_number: int,
+    points_per_video: list[np.ndarray],
+    config: LabelPropagationConfig | None = None,
+) -> list[tuple[int, np.ndarray]]:
+    """Track each video's labels on `frame_number` to its neighbouring frames, one camera per thread.
+
+    Returns a (first frame, (frames, points, 2) tracks) pair per video, see `track_labels_in_video`.
+    """
+    if config is None:
+        config = LabelPropagationConfig()
+    max_workers = max(1, min(len(video_paths), os.cpu_count() or 1))
+    # decoding and optical flow both release the GIL, so threads run the cameras in parallel
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(track_labels_in_video, video_path, frame_number, points, config)
+            for video_path, points in zip(video_paths, points_per_video)
+        ]
+        return [future.result() for future in futures]
@@ -0,0 +1,285 @@
+import logging
+import os
+import queue
+import shutil
+import subprocess
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterator, Literal
+
+import cv2
+import numpy as np
+from pydantic import BaseModel, ConfigDict
+
+from skellyclicker.core.video_handler.image_annotator import ImageAnnotator
+
+logger = logging.getLogger(__name__)
+
+_END_OF_STREAM = object()
+_QUEUE_POLL_SECONDS = 0.1
+
+
+class VideoEncoderConfig(BaseModel):
+    """Settings for the encoder used to write exported videos."""
+
+    backend: Literal["ffmpeg", "opencv"] = "ffmpeg"  # falls back to opencv if ffmpeg is not on the PATH
+
+    # ffmpeg backend
+    codec: str = "libx264"
+    preset: str | None = "veryfast"
+    crf: int = 23
+    pixel_format: str = "yuv420p"
+    threads: int = 0  # 0 lets the encoder pick based on available cores
+
+    # opencv backend
+    fourcc: str = "mp4v"
+
+
+class VideoExportConfig(BaseModel):
+    """Settings for the decode -> render -> encode export pipeline."""
+
+    encoder: VideoEncoderConfig = VideoEncoderConfig()
+    queue_size: int = 32  # frames buffered between each pipeline stage
+    render_workers: int = max(1, (os.cpu_count() or 2) // 2)
+
+
+class LabelOverlay(BaseModel):
+    """A set of pre-sliced labels for one video and the annotator used to draw them."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    annotator: ImageAnnotator
+    labels: np.ndarray  # (frames, points, 2), points ordered like annotator.config.tracked_points
+
+    def draw(self, image: np.ndarray, frame_number: int) -> np.ndarray:
+        if frame_number >= self.labels.shape[0]:
+            return image
+        return self.annotator.annotate_image_with_points(
+            image=image,
+            points=self.labels[frame_number],
+            point_names=self.annotator.config.tracked_points,
+            copy_image=False,
+        )
+
+
+class FFmpegVideoWriter:
+    """Pipes raw BGR frames into an ffmpeg subprocess, mirroring the cv2.VideoWriter write/release interface."""
+
+    def __init__(
+        self,
+        output_path: str | Path,
+        framerate: float,
+        frame_size: tuple[int, int],
+        config: VideoEncoderConfig,
+    ):
+        width, height = frame_size
+        command = [
+            shutil.which("ffmpeg") or "ffmpeg",
+            "-y",
+            "-loglevel", "error",
+            "-f", "rawvideo",
+            "-pix_fmt", "bgr24",
+            "-s", f"{width}x{height}",
+            "-r", f"{framerate}",
+            "-i", "-",
+            "-an",
+            "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2",  # yuv420p needs even dimensions
+            "-c:v", config.codec,
+            "-crf", str(config.crf),
+            "-pix_fmt", config.pixel_format,
+            "-threads", str(config.threads),
+        ]
+        if config.preset:
+            command.extend(["-preset", config.preset])
+        command.append(str(output_path))
+
+        self.output_path = str(output_path)
+        self._process = subprocess.Popen(command, stdin=subprocess.PIPE)
+
+    def write(self, frame: np.ndarray) -> None:
+        self._process.stdin.write(np.ascontiguousarray(frame).tobytes())
+
+    def release(self) -> None:
+        if self._process.stdin and not self._process.stdin.closed:
+            self._process.stdin.close()
+        return_code = self._process.wait()
+        if return_code != 0:
+            raise RuntimeError(f"ffmpeg exited with code {return_code} while writing {self.output_path}")
+
+
+def create_video_writer(
+    output_path: str | Path,
+    framerate: float,
+    frame_size: tuple[int, int],
+    config: VideoEncoderConfig | None = None,
+) -> FFmpegVideoWriter | cv2.VideoWriter:
+    if config is None:
+        config = VideoEncoderConfig()
+    if config.backend == "ffmpeg":
+        if shutil.which("ffmpeg") is not None:
+            return FFmpegVideoWriter(output_path, framerate, frame_size, config)
+        logger.warning("ffmpeg not found on PATH, falling back to OpenCV video writer")
+    fourcc = cv2.VideoWriter.fourcc(*config.fourcc)
+    return cv2.VideoWriter(str(output_path), fourcc, round(framerate, 2), frame_size)
+
+
+def release_writer_after_error(writer: FFmpegVideoWriter | cv2.VideoWriter) -> None:
+    """Release a writer while an export error propagates, logging rather than raising its own failure.
+
+    ffmpeg usually exits non-zero after a failed pipeline (e.g. a broken pipe), which must not replace the
+    original error.
+    """
+    try:
+        writer.release()
+    except Exception as e:
+        logger.warning(f"Video writer failed to close after the export failed: {e}")
+
+
+def read_video_frames(
+    cap: cv2.VideoCapture, start_frame: int = 0, end_frame: int | None = None
+) -> Iterator[tuple[int, np.ndarray]]:
+    """Yield (frame_number, frame) by decoding sequentially, seeking at most once to reach `start_frame`."""
+    if start_frame > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    frame_number = start_frame
+    while end_frame is None or frame_number < end_frame:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        yield frame_number, frame
+        frame_number += 1
+
+
+def _put_unless_stopped(target_queue: queue.Queue, item: object, stop_event: threading.Event) -> bool:
+    while not stop_event.is_set():
+        try:
+            target_queue.put(item, timeout=_QUEUE_POLL_SECONDS)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get_unless_stopped(source_queue: queue.Queue, stop_event: threading.Event) -> object:
+    while not stop_event.is_set():
+        try:
+            return source_queue.get(timeout=_QUEUE_POLL_SECONDS)
+        except queue.Empty:
+            continue
+    return _END_OF_STREAM
+
+
+def run_frame_pipeline(
+    frames: Iterator[tuple[int, object]],
+    render_frame: Callable[[int, object], np.ndarray],
+    writer: FFmpegVideoWriter | cv2.VideoWriter,
+    config: VideoExportConfig | None = None,
+) -> int:
+    """Run decode, render and encode as overlapping stages connected by bounded queues.
+
+    Decoding and encoding each get a thread, rendering runs on a pool of `render_workers` threads.
+    Frames are written in the order they were decoded. Returns the number of frames written.
+    """
+    if config is None:
+        config = VideoExportConfig()
+
+    decoded_frames: queue.Queue = queue.Queue(maxsize=config.queue_size)
+    rendered_frames: queue.Queue = queue.Queue(maxsize=config.queue_size)
+    stop_event = threading.Event()
+    errors: list[BaseException] = []
+    frames_written = 0
+
+    def decode() -> None:
+        try:
+            for item in frames:
+                if not _put_unless_stopped(decoded_frames, item, stop_event):
+                    return
+        except BaseException as e:
+            errors.append(e)
+            stop_event.set()
+        finally:
+            _put_unless_stopped(decoded_frames, _END_OF_STREAM, stop_event)
+
+    def encode() -> None:
+        nonlocal frames_written
+        try:
+            while True:
+                future = _get_unless_stopped(rendered_frames, stop_event)
+                if future is _END_OF_STREAM:
+                    return
+                writer.write(future.result())
+                frames_written += 1
+        except BaseException as e:
+            errors.append(e)
+            stop_event.set()
+
+    decode_thread = threading.Thread(target=decode, daemon=True)
+    encode_thread = threading.Thread(target=encode, daemon=True)
+    decode_thread.start()
+    encode_thread.start()
+
+    with ThreadPoolExecutor(max_workers=config.render_workers) as render_pool:
+        while True:
+            item = _get_unless_stopped(decoded_frames, stop_event)
+            if item is _END_OF_STREAM:
+                break
+            frame_number, frame = item
+            future: Future = render_pool.submit(render_frame, frame_number, frame)
+            if not _put_unless_stopped(rendered_frames, future, stop_event):
+                break
+        _put_unless_stopped(rendered_frames, _END_OF_STREAM, stop_event)
+        encode_thread.join()
+        stop_event.set()  # release the decoder if the encoder finished early
+        decode_thread.join()
+
+    if errors:
+        raise errors[0]
+    return frames_written
+
+
+def export_annotated_video(
+    video_path: str | Path,
+    output_path: str | Path,
+    overlays: list[LabelOverlay],
+    config: VideoExportConfig | None = None,
+    start_frame: int = 0,
+    end_frame: int | None = None,
+) -> int:
+    """Write a copy of `video_path` with label overlays drawn on every frame. Returns the number of frames written."""
+    if config is None:
+        config = VideoExportConfig()
+
+    cap = cv2.VideoCapture(str(video_path))
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video: {video_path}")
+    framerate = cap.get(cv2.CAP_PROP_FPS)
+    frame_size = (
+        int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+    )
+
+    def render(frame_number: int, frame: np.ndarray) -> np.ndarray:
+        for overlay in overlays:
+            frame = overlay.draw(frame, frame_number)
+        return frame
+
+    logger.info(f"Writing annotated video to {output_path}")
+    writer = create_video_writer(output_path, framerate, frame_size, config.encoder)
+    try:
+        frames_written = run_frame_pipeline(
+            frames=read_video_frames(cap, start_frame=start_frame, end_frame=end_frame),
+            render_frame=render,
+            writer=writer,
+            config=config,
+        )
+    except BaseException:
+        cap.release()
+        release_writer_after_error(writer)
+        raise
+    cap.release()
+    # raises if ffmpeg failed to finish the video
+    writer.release()
+
+    logger.info(f"Wrote {frames_written} annotated frames to {output_path}")
+    return frames_written
@@ -6,16 +6,23 @@ import cv2
 import numpy as np
 from pydantic import BaseModel
 
-from skellyclicker import VideoPathString
+from skellyclicker import DEFAULT_LIKELIHOOD_THRESHOLD, VideoPathString
 from skellyclicker.core.click_data_handler.click_handler import ClickHandler
 from skellyclicker.core.click_data_handler.data_handler import (
     DataHandler,
     DataHandlerConfig,
+    InterpolationMethod,
+    load_connections_for_labels,
+    load_connections_from_json,
 )
 from skellyclicker.core.video_handler.image_annotator import (
     ImageAnnotator,
     ImageAnnotatorConfig,
 )
+from skellyclicker.core.video_handler.label_propagation import (
+    LabelPropagationConfig,
+    propagate_labels,
+)
 from skellyclicker.core.video_handler.video_models import (
     VideoPlaybackState,
     GridParameters,
@@ -26,6 +33,9 @@ from skellyclicker.core.video_handler.video_models import (
 logger = logging.getLogger(__name__)
 from copy import deepcopy
 
+MACHINE_LABELS_CONNECTION_COLOR = (40, 170, 255)
+STAGED_LABELS_CONNECTION_COLOR = (255, 120, 255)
+
 
 class VideoHandler(BaseModel):
     video_folder: str
@@ -38,6 +48,9 @@ class VideoHandler(BaseModel):
     show_machine_labels: bool = False
     machine_labels_handler: DataHandler | None
     machine_labels_annotator: ImageAnnotator | None
+    # proposed labels (e.g. from optical flow propagation), shown until they are accepted into the data handler
+    staged_labels_handler: DataHandler | None = None
+    staged_labels_annotator: ImageAnnotator | None = None
 
     @classmethod
     def from_videos(
@@ -46,7 +59,13 @@ class VideoHandler(BaseModel):
         max_window_size: tuple[int, int],
         data_handler_path: str,
         machine_labels_path: str | None = None,
+        machine_labels_likelihood_threshold: float = DEFAULT_LIKELIHOOD_THRESHOLD,
+        connections: list[tuple[str, str]] | None = None,
+        tracked_points_path: str | None = None,
     ):
+        """Skeleton `connections` default to the labels' own (tracked points json, or the metadata next to a
+        labels csv), then those saved next to the machine labels, then those of `tracked_points_path`.
+        """
         video_paths = sorted(video_paths)
         for path in video_paths:
             if not Path(path).is_file():
@@ -62,12 +81,21 @@ class VideoHandler(BaseModel):
                 )
             )
         elif Path(data_handler_path).suffix == ".csv":
-            data_handler = DataHandler.from_csv(data_handler_path)
+            data_handler = DataHandler.from_csv(data_handler_path, connections=connections)
         else:
             raise ValueError(f"Invalid data handler file: {data_handler_path}")
 
+        connections = connections or data_handler.config.connections
+        if not connections and machine_labels_path:
+            connections = load_connections_for_labels(machine_labels_path)
+        if not connections and tracked_points_path:
+            connections = load_connections_from_json(tracked_points_path)
+        data_handler.config.connections = connections
+
         if machine_labels_path:
-            machine_labels_handler = DataHandler.from_csv(machine_labels_path)
+            machine_labels_handler = DataHandler.from_file(
+                machine_labels_path, likelihood_threshold=machine_labels_likelihood_threshold
+            )
             machine_labels_annotator = ImageAnnotator(
                 config=ImageAnnotatorConfig(
                     marker_type=cv2.MARKER_CROSS,
@@ -75,6 +103,8 @@ class VideoHandler(BaseModel):
                     marker_thickness=1,
                     tracked_points=data_handler.config.tracked_point_names,
                     show_clicks=False,
+                    connections=connections,
+                    connection_color=MACHINE_LABELS_CONNECTION_COLOR,
                 )
             )
         else:
@@ -84,6 +114,18 @@ class VideoHandler(BaseModel):
         image_annotator = ImageAnnotator(
             config=ImageAnnotatorConfig(
                 tracked_points=data_handler.config.tracked_point_names,
+                connections=connections,
+            )
+        )
+        staged_labels_annotator = ImageAnnotator(
+            config=ImageAnnotatorConfig(
+                marker_type=cv2.MARKER_CROSS,
+                marker_size=10,
+                marker_thickness=1,
+                tracked_points=data_handler.config.tracked_point_names,
+                show_clicks=False,
+                connections=connections,
+                connection_color=STAGED_LABELS_CONNECTION_COLOR,
             )
         )
 
@@ -104,6 +146,7 @@ class VideoHandler(BaseModel):
             show_machine_labels=False,
             machine_labels_handler=machine_labels_handler,
             machine_labels_annotator=machine_labels_annotator,
+            staged_labels_annotator=staged_labels_annotator,
         )
 
     @classmethod
@@ -235,18 +278,117 @@ class VideoHandler(BaseModel):
     def copy_frame_data_from_machine_labels(
         self, frame_number: int, video_index: int
     ) -> None:
-        if self.machine_labels_handler is not None:
-            machine_labels_data = self.machine_labels_handler.get_data_by_video_frame(
-                    video_index=video_index, frame_number=frame_number
-                )
-            for name, click_data in machine_labels_data.items():
-                try:
-                    self.data_handler.update_dataframe(
-                        click_data=click_data,
-                        point_name=name,
-                    )
-                except (ValueError, KeyError) as e:
-                    logger.error(f"Error updating data with point name {name}: {e}")
+        self.copy_machine_labels(frame_numbers=[frame_number], video_indices=[video_index])
+
+    def copy_machine_labels(
+        self,
+        frame_numbers: list[int] | range,
+        video_indices: list[int] | None = None,
+        point_names: list[str] | None = None,
+        likelihood_threshold: float | None = None,
+    ) -> int:
+        """Adopt machine labels into the human labels for a block of frames, videos and points (undoable)."""
+        if self.machine_labels_handler is None:
+            logger.warning("No machine labels loaded, nothing to copy")
+            return 0
+        return self.data_handler.adopt_labels(
+            source=self.machine_labels_handler,
+            frame_numbers=frame_numbers,
+            video_indices=video_indices,
+            point_names=point_names,
+            likelihood_threshold=likelihood_threshold,
+        )
+
+    def interpolate_labels(
+        self,
+        method: InterpolationMethod = "linear",
+        point_names: list[str] | None = None,
+        video_indices: list[int] | None = None,
+        start_frame: int = 0,
+        end_frame: int | None = None,
+        max_gap: int | None = None,
+    ) -> int:
+        return self.data_handler.interpolate_labels(
+            method=method,
+            point_names=point_names,
+            video_indices=video_indices,
+            start_frame=start_frame,
+            end_frame=end_frame,
+            max_gap=max_gap,
+        )
+
+    def propagate_labels(
+        self, frame_number: int, config: LabelPropagationConfig | None = None
+    ) -> int:
+        """Track the labels on `frame_number` to neighbouring frames in every video, into the staged labels.
+
+        Only points that are unlabeled on the neighbouring frames are staged. Returns the number of points staged.
+        """
+        if config is None:
+            config = LabelPropagationConfig()
+        point_names = self.data_handler.config.tracked_point_names
+        video_names = self.data_handler.config.video_names
+        points_per_video = [
+            self.data_handler.get_video_array(
+                video_name=video_name, num_frames=1, start_frame=frame_number
+            )[0]
+            for video_name in video_names
+        ]
+        tracks_per_video = propagate_labels(
+            video_paths=list(self.videos.keys()),
+            frame_number=frame_number,
+            points_per_video=points_per_video,
+            config=config,
+        )
+
+        if self.staged_labels_handler is None:
+            self.staged_labels_handler = DataHandler.from_config(self.data_handler.config)
+        points_staged = 0
+        for video_name, (first_frame, tracks) in zip(video_names, tracks_per_video):
+            if tracks.shape[0] == 0:
+                continue
+            existing_labels = self.data_handler.get_video_array(
+                video_name=video_name, num_frames=tracks.shape[0], start_frame=first_frame
+            )
+            tracks[~np.isnan(existing_labels)] = np.nan
+            self.staged_labels_handler.set_video_array(
+                video_name=video_name, labels=tracks, start_frame=first_frame, point_names=point_names
+            )
+            points_staged += int(np.count_nonzero(~np.isnan(tracks).any(axis=2)))
+        logger.info(f"Staged {points_staged} propagated points, accept or discard them to continue")
+        return points_staged
+
+    def accept_staged_labels(self) -> int:
+        """Adopt all staged labels into the human labels (undoable) and clear the staging layer."""
+        if self.staged_labels_handler is None:
+            logger.info("No staged labels to accept")
+            return 0
+        staged_frames = self.staged_labels_handler.get_nonempty_frames()
+        points_accepted = 0
+        if staged_frames:
+            points_accepted = self.data_handler.adopt_labels(
+                source=self.staged_labels_handler,
+                frame_numbers=range(staged_frames[0], staged_frames[-1] + 1),
+            )
+        self.staged_labels_handler = None
+        return points_accepted
+
+    def discard_staged_labels(self) -> None:
+        if self.staged_labels_handler is not None:
+            logger.info("Discarded staged labels")
+        self.staged_labels_handler = None
+
+    def undo_last_edit(self) -> None:
+        self.data_handler.undo_last_edit()
+
+    def change_machine_labels_likelihood_threshold(self, change: float) -> None:
+        if self.machine_labels_handler is None or self.machine_labels_handler.likelihoods is None:
+            logger.warning("No machine label likelihoods loaded, cannot change likelihood threshold")
+            return
+        self.machine_labels_handler.set_likelihood_threshold(
+            self.machine_labels_handler.likelihood_threshold + change
+        )
+        print(f"Machine labels likelihood threshold: {self.machine_labels_handler.likelihood_threshold:.2f}")
 
     def create_grid_image(
         self, frame_number: int, annotate_images: bool = True
@@ -278,6 +420,9 @@ class VideoHandler(BaseModel):
                         click_data=self.data_handler.get_data_by_video_frame(
                             video_index=video_index, frame_number=frame_number
                         ),
+                        interpolated_points=self.data_handler.get_interpolated_points(
+                            video_index=video_index, frame_number=frame_number
+                        ),
                     )
                     if (
                         self.show_machine_labels
@@ -290,6 +435,16 @@ class VideoHandler(BaseModel):
                                 video_index=video_index, frame_number=frame_number
                             ),
                         )
+                    if (
+                        self.staged_labels_handler is not None
+                        and self.staged_labels_annotator is not None
+                    ):
+                        image = self.staged_labels_annotator.annotate_single_image(
+                            image,
+                            click_data=self.staged_labels_handler.get_data_by_video_frame(
+                                video_index=video_index, frame_number=frame_number
+                            ),
+                        )
 
                 if zoom_state.scale > 1.0:
                     # Calculate zoomed dimensions
@@ -8,7 +8,13 @@ import cv2
 import numpy as np
 from pydantic import BaseModel, ConfigDict
 
-from skellyclicker import MAX_WINDOW_SIZE, POSITION_EPSILON
+from skellyclicker import (
+    DEFAULT_LIKELIHOOD_THRESHOLD,
+    LIKELIHOOD_THRESHOLD_STEP,
+    MAX_WINDOW_SIZE,
+    POSITION_EPSILON,
+)
+from skellyclicker.core.video_handler.label_propagation import LabelPropagationConfig
 from skellyclicker.core.video_handler.video_handler import VideoHandler
 
 logger = logging.getLogger(__name__)
@@ -39,6 +45,8 @@ class VideoViewer(BaseModel):
     show_help: bool = False
     auto_next_point: bool = True
     show_names: bool = True
+    bulk_copy_frames: int = 100  # frames ahead of the current frame adopted by a bulk machine label copy
+    propagation_config: LabelPropagationConfig = LabelPropagationConfig()
     video_thread: threading.Thread | None = None
     model_config = ConfigDict(arbitrary_types_allowed=True)
     should_continue: bool = True
@@ -63,6 +71,8 @@ class VideoViewer(BaseModel):
         max_window_size: tuple[int, int] = MAX_WINDOW_SIZE,
         data_handler_path: str = str(TRACKED_POINTS_JSON_PATH),
         machine_labels_path: str | None = None,
+        machine_labels_likelihood_threshold: float = DEFAULT_LIKELIHOOD_THRESHOLD,
+        connections: list[tuple[str, str]] | None = None,
     ):
         return cls(
             video_handler=VideoHandler.from_videos(
@@ -70,6 +80,9 @@ class VideoViewer(BaseModel):
                 max_window_size=max_window_size,
                 data_handler_path=data_handler_path,
                 machine_labels_path=machine_labels_path,
+                machine_labels_likelihood_threshold=machine_labels_likelihood_threshold,
+                connections=connections,
+                tracked_points_path=str(TRACKED_POINTS_JSON_PATH),
             ),
             video_folder=str(Path(video_paths[0]).parent),
             max_window_size=max_window_size,
@@ -118,6 +131,26 @@ class VideoViewer(BaseModel):
                 * self.video_handler.grid_parameters.columns
                 + self.active_cell[0],
             )
+        elif key == ord("b"):
+            self.video_handler.copy_machine_labels(
+                frame_numbers=range(
+                    self.frame_number, min(self.frame_number + self.bulk_copy_frames, self.frame_count)
+                ),
+            )
+        elif key == ord("t"):
+            self.video_handler.interpolate_labels(
+                point_names=[self.video_handler.data_handler.active_point],
+            )
+        elif key == ord("p"):
+            self.video_handler.propagate_labels(
+                frame_number=self.frame_number, config=self.propagation_config
+            )
+        elif key == ord("y"):
+            self.video_handler.accept_staged_labels()
+        elif key == ord("x"):
+            self.video_handler.discard_staged_labels()
+        elif key == ord("z"):
+            self.video_handler.undo_last_edit()
         elif key == ord("m"):
             self.video_handler.show_machine_labels = (
                 not self.video_handler.show_machine_labels
@@ -125,6 +158,10 @@ class VideoViewer(BaseModel):
             print(
                 f"Machine labels visibility: {self.video_handler.show_machine_labels}"
             )
+        elif key == ord("-"):
+            self.video_handler.change_machine_labels_likelihood_threshold(-LIKELIHOOD_THRESHOLD_STEP)
+        elif key == ord("="):
+            self.video_handler.change_machine_labels_likelihood_threshold(LIKELIHOOD_THRESHOLD_STEP)
         elif key == ord("n"):
             self.video_handler.image_annotator.config.show_names = (
                 not self.video_handler.image_annotator.config.show_names
@@ -133,6 +170,11 @@ class VideoViewer(BaseModel):
                 self.video_handler.machine_labels_annotator.config.show_names = (
                     self.video_handler.image_annotator.config.show_names
                 )
+        elif key == ord("o"):
+            show_connections = not self.video_handler.image_annotator.config.show_connections
+            self.video_handler.image_annotator.config.show_connections = show_connections
+            if self.video_handler.machine_labels_annotator is not None:
+                self.video_handler.machine_labels_annotator.config.show_connections = show_connections
         elif key == ord(","):
             self.video_handler.image_annotator.config.show_clicks = (
                 not self.video_handler.image_annotator.config.show_clicks
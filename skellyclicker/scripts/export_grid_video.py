@@ -0,0 +1,58 @@
+import argparse
+import logging
+from pathlib import Path
+
+from skellyclicker.core.video_handler.grid_video_export import export_grid_video
+from skellyclicker.core.video_handler.video_export import VideoEncoderConfig, VideoExportConfig
+
+logging.getLogger('PIL').setLevel(logging.WARNING)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Render all cameras of a recording as a labeled grid video, without opening a window."
+    )
+    parser.add_argument("video_folder", type=Path, help="folder containing the synchronized .mp4 videos")
+    parser.add_argument("-o", "--output", type=Path, default=None,
+                        help="output video path (default: <video_folder>/../annotated_videos/grid.mp4)")
+    parser.add_argument("-l", "--labels", type=Path, default=None, help="skellyclicker (human) labels csv")
+    parser.add_argument("-m", "--machine-labels", type=Path, default=None, help="skellyclicker machine labels csv")
+    parser.add_argument("--start", type=int, default=0, help="first frame to render")
+    parser.add_argument("--end", type=int, default=None, help="frame to stop before (default: end of video)")
+    parser.add_argument("--width", type=int, default=1920, help="maximum grid width in pixels")
+    parser.add_argument("--height", type=int, default=1080, help="maximum grid height in pixels")
+    parser.add_argument("--encoder-threads", type=int, default=0, help="ffmpeg encoder threads (0 = auto)")
+    parser.add_argument("--opencv-encoder", action="store_true", help="use the OpenCV writer instead of ffmpeg")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    video_paths = sorted(str(path) for path in args.video_folder.glob("*.mp4"))
+    if not video_paths:
+        raise FileNotFoundError(f"No .mp4 videos found in {args.video_folder}")
+
+    output_path = args.output
+    if output_path is None:
+        output_path = args.video_folder.parent / "annotated_videos" / "grid.mp4"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    export_config = VideoExportConfig(
+        encoder=VideoEncoderConfig(
+            backend="opencv" if args.opencv_encoder else "ffmpeg",
+            threads=args.encoder_threads,
+        )
+    )
+
+    export_grid_video(
+        video_paths=video_paths,
+        output_path=output_path,
+        labels_path=args.labels,
+        machine_labels_path=args.machine_labels,
+        start_frame=args.start,
+        end_frame=args.end,
+        max_grid_size=(args.width, args.height),
+        export_config=export_config,
+    )
+    print(f"Saved grid video to {output_path}")
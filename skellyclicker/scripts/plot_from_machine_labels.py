@@ -1,8 +1,12 @@
-import cv2
 from pathlib import Path
 
 from skellyclicker.core.click_data_handler.data_handler import DataHandler
 from skellyclicker.core.video_handler.image_annotator import ImageAnnotator, ImageAnnotatorConfig
+from skellyclicker.core.video_handler.video_export import (
+    LabelOverlay,
+    VideoExportConfig,
+    export_annotated_video,
+)
 
 if __name__=='__main__':
     labels_path = Path("/home/scholl-lab/ferret_recordings/session_2025-07-11_ferret_757_EyeCamera_P43_E15__1/clips/0m_37s-1m_37s/eye_data/dlc_output/eye_model_v2_model_outputs_iteration_0/skellyclicker_machine_labels_iteration_0.csv")
@@ -22,48 +26,34 @@ if __name__=='__main__':
     output_path.mkdir(exist_ok=True)
 
 
-    data_handler = DataHandler.from_csv(labels_path)
+    data_handler = DataHandler.from_file(labels_path)
+    tracked_points = sorted(data_handler.tracked_points)
 
     annotator_config = ImageAnnotatorConfig(
         marker_thickness=3,
         show_names=False, 
-        tracked_points=sorted(data_handler.tracked_points), 
+        tracked_points=tracked_points, 
         show_clicks=False, 
         show_help=False
     )
     image_annotator = ImageAnnotator(config=annotator_config)
+    export_config = VideoExportConfig()
 
     for video in video_paths:
-        video_name = video.stem
-        cap = cv2.VideoCapture(str(video))
+        video_name = data_handler.find_video_name(video)
+        if video_name is None:
+            print(f"no labels found for {video.name}, skipping")
+            continue
+        labels = data_handler.get_video_array(video_name=video_name, point_names=tracked_points)
 
-        framerate = cap.get(cv2.CAP_PROP_FPS)
-        framesize = (
-            int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
-            int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
-        )
-        fourcc = cv2.VideoWriter.fourcc(*"mp4v")  # need to deal with higher frame rates
         print(f"writing video to {str(output_path / video.name)}")
-
-        video_writer_object = cv2.VideoWriter(
-            str(output_path / video.name), fourcc, round(framerate, 2), framesize
+        export_annotated_video(
+            video_path=video,
+            output_path=output_path / video.name,
+            overlays=[LabelOverlay(annotator=image_annotator, labels=labels)],
+            config=export_config,
         )
 
-        frame_number = -1
-        while True:
-            ret, frame = cap.read()
-            frame_number += 1
-            if not ret:
-                print(f"failed to read frame {frame_number}")
-                break
-
-            click_data = data_handler.get_data_by_video_name_and_frame(video_name=video_name, frame_number=frame_number)
-
-            annotated_frame = image_annotator.annotate_single_image(image=frame,  click_data=click_data)
-            video_writer_object.write(annotated_frame)
-        video_writer_object.release()
-        cap.release()
-
 
 
     # df = pd.read_csv(labels_path)
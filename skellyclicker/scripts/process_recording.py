@@ -2,7 +2,7 @@ import shutil
 import sys
 from pathlib import Path
 
-from skellyclicker.core.deeplabcut_handler.deeplabcut_handler import DeeplabcutHandler
+from skellyclicker.core.deeplabcut_handler.deeplabcut_handler import DeeplabcutHandler, analyze_videos_with_models
 
 import matplotlib as plt
 import logging
@@ -28,16 +28,20 @@ def clean_dlc_output_folder(dlc_output_folder: Path):
             print(f"Removing existinng file {file}")
             file.unlink()
 
-def process_recording(video_folder: Path, deeplabcut_folder: Path | str, output_folder: Path | None = None, suffix: str = ""):
-    if output_folder is None:
-        output_folder = video_folder.parent
-    deeplabcut_folder = Path(deeplabcut_folder)
+def prepare_output_folders(deeplabcut_folder: Path, output_folder: Path, suffix: str = "") -> tuple[Path, Path]:
     dlc_output_folder = output_folder / "dlc_output"
     annotated_videos_folder = output_folder / "annotated_videos" / f"annotated_videos_{deeplabcut_folder.stem}{suffix}"
     dlc_output_folder.mkdir(exist_ok=True, parents=True)
     annotated_videos_folder.mkdir(exist_ok=True, parents=True)
     analyze_videos_output = dlc_output_folder / f"{deeplabcut_folder.stem}{suffix}"
     clean_dlc_output_folder(analyze_videos_output)
+    return analyze_videos_output, annotated_videos_folder
+
+def process_recording(video_folder: Path, deeplabcut_folder: Path | str, output_folder: Path | None = None, suffix: str = ""):
+    if output_folder is None:
+        output_folder = video_folder.parent
+    deeplabcut_folder = Path(deeplabcut_folder)
+    analyze_videos_output, annotated_videos_folder = prepare_output_folders(deeplabcut_folder, output_folder, suffix)
     deeplabcut_config = deeplabcut_folder / "config.yaml"
     handler = DeeplabcutHandler.load_deeplabcut_project(project_config_path=str(deeplabcut_config))
     video_paths = [str(path) for path in video_folder.glob("*.mp4")]
@@ -47,6 +51,32 @@ def process_recording(video_folder: Path, deeplabcut_folder: Path | str, output_
     annotated_video_paths = list(analyze_videos_output.glob("*.mp4"))
     copy_files(files = annotated_video_paths, destination=annotated_videos_folder)
 
+def process_recording_with_models(video_folder: Path, deeplabcut_folders: list[Path | str], output_folder: Path | None = None, suffix: str = ""):
+    """Like process_recording for several models at once, each video is decoded once and fed to every model."""
+    if output_folder is None:
+        output_folder = video_folder.parent
+    deeplabcut_folders = [Path(deeplabcut_folder) for deeplabcut_folder in deeplabcut_folders]
+    output_folders = [
+        prepare_output_folders(deeplabcut_folder, output_folder, suffix) for deeplabcut_folder in deeplabcut_folders
+    ]
+    handlers = [
+        DeeplabcutHandler.load_deeplabcut_project(project_config_path=str(deeplabcut_folder / "config.yaml"))
+        for deeplabcut_folder in deeplabcut_folders
+    ]
+    video_paths = [str(path) for path in video_folder.glob("*.mp4")]
+    print(f"VIDEO PATHS in {video_folder}: \n{video_paths}")
+    analyze_videos_with_models(
+        handlers=handlers,
+        video_paths=video_paths,
+        output_folders=[analyze_videos_output for analyze_videos_output, _ in output_folders],
+        annotate_videos=True,
+        filter_videos=True,
+    )
+
+    for analyze_videos_output, annotated_videos_folder in output_folders:
+        annotated_video_paths = list(analyze_videos_output.glob("*.mp4"))
+        copy_files(files = annotated_video_paths, destination=annotated_videos_folder)
+
 def run_all_models(recording_path: Path, include_eye: bool, include_body: bool = True, include_toy: bool = True):
     mocap_video_path = recording_path / "mocap_data" / "synchronized_corrected_videos"
     if not mocap_video_path.exists():
@@ -64,11 +94,21 @@ def run_all_models(recording_path: Path, include_eye: bool, include_body: bool =
         print("eye videos processed")
     else:
         best_mocap_model_folder = "/home/scholl-lab/deeplabcut_data/head_body_noeyecam_v0"
+    mocap_model_folders = []
     if include_body:
+        mocap_model_folders.append(best_mocap_model_folder)
+    if include_toy:
+        mocap_model_folders.append(best_toy_model_folder)
+    if len(mocap_model_folders) > 1:
+        # the eye model runs on other videos, but body and toy models share every mocap video decode
+        print("Processing mocap videos with body and toy models...")
+        process_recording_with_models(video_folder=mocap_video_path, deeplabcut_folders=mocap_model_folders)
+        print("mocap videos processed with body and toy models")
+    elif include_body:
         print("Processing mocap videos...")
         process_recording(video_folder=mocap_video_path, deeplabcut_folder=best_mocap_model_folder)
         print("mocap videos processed") 
-    if include_toy:
+    elif include_toy:
         print("Processing mocap videos with toy model...")
         process_recording(video_folder=mocap_video_path, deeplabcut_folder=best_toy_model_folder)
         print("toy model processed")
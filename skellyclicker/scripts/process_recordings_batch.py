@@ -0,0 +1,303 @@
+import argparse
+import hashlib
+import json
+import logging
+import sqlite3
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+from pydantic import BaseModel
+
+logging.getLogger('PIL').setLevel(logging.WARNING)
+
+JOB_STATES = ("pending", "running", "done", "failed")
+DEFAULT_DATABASE_NAME = "skellyclicker_jobs.sqlite"
+LOG_FOLDER_NAME = "skellyclicker_job_logs"
+
+
+class ManifestModel(BaseModel):
+    """One model of the manifest and where its videos are in each recording.
+
+    `video_folders` are relative to the recording folder, the first one that exists is used (e.g. corrected
+    videos, falling back to the raw synchronized ones). Outputs go to `output_folder` in the recording, or next
+    to the video folder like process_recording.
+    """
+
+    name: str
+    project_folder: str
+    video_folders: list[str]
+    output_folder: str | None = None
+    suffix: str = ""
+
+    def find_video_folder(self, recording_folder: Path) -> Path | None:
+        for video_folder in self.video_folders:
+            if (recording_folder / video_folder).is_dir():
+                return recording_folder / video_folder
+        return None
+
+
+class ModelManifest(BaseModel):
+    """JSON file listing the models to run on every recording, e.g.
+
+    {"models": [{"name": "eye", "project_folder": "/data/eye_model_v3", "video_folders": ["eye_data/eye_videos"],
+                 "output_folder": "eye_data"},
+                {"name": "body", "project_folder": "/data/head_body_v2",
+                 "video_folders": ["mocap_data/synchronized_corrected_videos", "mocap_data/synchronized_videos"]}]}
+    """
+
+    models: list[ManifestModel]
+
+    @classmethod
+    def load(cls, manifest_path: str | Path) -> "ModelManifest":
+        manifest = cls.model_validate_json(Path(manifest_path).read_text())
+        names = [model.name for model in manifest.models]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Model names in {manifest_path} must be unique, got {names}")
+        return manifest
+
+    def get_model(self, name: str) -> ManifestModel:
+        for model in self.models:
+            if model.name == name:
+                return model
+        raise KeyError(f"No model named {name} in the manifest")
+
+
+class JobQueue:
+    """Recording x model jobs and their state, persisted in a SQLite file so an interrupted batch resumes.
+
+    Worker threads mark their job running, the scheduling thread records how it ended. The connection is shared
+    between them, a lock serializes every use of it.
+    """
+
+    def __init__(self, database_path: str | Path) -> None:
+        self.database_path = Path(database_path)
+        self._connection = sqlite3.connect(self.database_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._connection:
+            self._connection.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    recording TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    state TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    log_path TEXT,
+                    updated_at TEXT,
+                    PRIMARY KEY (recording, model)
+                )"""
+            )
+
+    def add_jobs(self, recordings: list[Path], model_names: list[str]) -> None:
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO jobs (recording, model, updated_at) VALUES (?, ?, ?)",
+                [
+                    (str(recording.resolve()), model_name, datetime.now().isoformat())
+                    for recording in recordings
+                    for model_name in model_names
+                ],
+            )
+
+    def reset(self, recordings: list[Path], model_names: list[str], from_states: tuple[str, ...]) -> int:
+        """Put this batch's jobs in `from_states` back to pending, other batches' jobs are left alone.
+
+        Returns how many were reset.
+        """
+        updated_at = datetime.now().isoformat()
+        with self._lock, self._connection:
+            cursor = self._connection.executemany(
+                f"""UPDATE jobs SET state = 'pending', updated_at = ?
+                   WHERE recording = ? AND model = ? AND state IN ({','.join('?' * len(from_states))})""",
+                [
+                    (updated_at, str(recording.resolve()), model_name, *from_states)
+                    for recording in recordings
+                    for model_name in model_names
+                ],
+            )
+        return cursor.rowcount
+
+    def pending_jobs(self, recordings: list[Path], model_names: list[str]) -> list[tuple[str, str]]:
+        wanted = {(str(recording.resolve()), model_name) for recording in recordings for model_name in model_names}
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT recording, model FROM jobs WHERE state = 'pending' ORDER BY recording, model"
+            ).fetchall()
+        return [row for row in rows if row in wanted]
+
+    def set_state(self, recording: str, model: str, state: str, error: str | None = None,
+                  log_path: Path | None = None) -> None:
+        if state not in JOB_STATES:
+            raise ValueError(f"Unknown job state {state}, expected one of {JOB_STATES}")
+        with self._lock, self._connection:
+            self._connection.execute(
+                """UPDATE jobs SET state = ?, error = ?, log_path = COALESCE(?, log_path), updated_at = ?,
+                   attempts = attempts + (? = 'running') WHERE recording = ? AND model = ?""",
+                (state, error, str(log_path) if log_path else None, datetime.now().isoformat(), state,
+                 recording, model),
+            )
+
+    def summary(self) -> dict[str, int]:
+        with self._lock:
+            rows = self._connection.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()
+        return {state: count for state, count in rows}
+
+    def failed_jobs(self) -> list[tuple[str, str, str | None, str | None]]:
+        with self._lock:
+            return self._connection.execute(
+                "SELECT recording, model, error, log_path FROM jobs WHERE state = 'failed' ORDER BY recording, model"
+            ).fetchall()
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+def run_job(recording: str, model: ManifestModel) -> None:
+    """Process one recording with one model, as process_recording does. Runs in the job's own process."""
+    from skellyclicker.scripts.process_recording import process_recording
+
+    recording_folder = Path(recording)
+    video_folder = model.find_video_folder(recording_folder)
+    if video_folder is None:
+        raise FileNotFoundError(f"None of {model.video_folders} exist in {recording_folder}")
+    output_folder = recording_folder / model.output_folder if model.output_folder is not None else None
+    process_recording(
+        video_folder=video_folder,
+        deeplabcut_folder=model.project_folder,
+        output_folder=output_folder,
+        suffix=model.suffix,
+    )
+
+
+def get_job_log_path(log_folder: Path, recording: str, model_name: str) -> Path:
+    """A log file unique to the job.
+
+    Many recording folders are named full_recording, so the name includes the recording's parent folder and a
+    hash of its resolved path.
+    """
+    recording_path = Path(recording)
+    recording_hash = hashlib.sha1(str(recording_path.resolve()).encode()).hexdigest()[:8]
+    return log_folder / f"{recording_path.parent.name}_{recording_path.name}_{recording_hash}_{model_name}.log"
+
+
+def _run_job_process(recording: str, model_name: str, manifest_path: Path, log_path: Path) -> None:
+    """Run a job in a fresh Python process so a crash, or GPU memory it holds, doesn't outlive it."""
+    command = [
+        sys.executable, "-m", "skellyclicker.scripts.process_recordings_batch",
+        "--run-job", recording, model_name, "--manifest", str(manifest_path),
+    ]
+    with open(log_path, "w") as log_file:
+        result = subprocess.run(command, stdout=log_file, stderr=subprocess.STDOUT)
+    if result.returncode != 0:
+        # the last lines of the log are usually the traceback
+        tail = log_path.read_text(errors="replace").strip().splitlines()[-3:]
+        raise RuntimeError(f"exit code {result.returncode}: {' | '.join(tail)}")
+
+
+def run_batch(
+    recordings: list[Path],
+    manifest_path: Path,
+    database_path: Path,
+    workers: int = 1,
+    retry_failed: bool = True,
+    rerun_done: bool = False,
+) -> dict[str, int]:
+    """Run every recording x model job that isn't done yet on a pool of `workers` job processes.
+
+    Jobs left running by an interrupted batch are rerun, failed ones too unless `retry_failed` is off. Returns
+    the number of jobs in each state.
+    """
+    manifest = ModelManifest.load(manifest_path)
+    model_names = [model.name for model in manifest.models]
+    queue = JobQueue(database_path)
+    log_folder = database_path.parent / LOG_FOLDER_NAME
+    log_folder.mkdir(parents=True, exist_ok=True)
+    try:
+        queue.add_jobs(recordings, model_names)
+        reset_states = ("running",) + (("failed",) if retry_failed else ()) + (("done",) if rerun_done else ())
+        queue.reset(recordings, model_names, reset_states)
+        jobs = queue.pending_jobs(recordings, model_names)
+        print(f"{len(jobs)} jobs to run ({len(recordings)} recordings x {len(model_names)} models), "
+              f"{workers} at a time")
+
+        def run(recording: str, model_name: str) -> None:
+            log_path = get_job_log_path(log_folder, recording, model_name)
+            queue.set_state(recording, model_name, "running", log_path=log_path)
+            print(f"Started {model_name} on {recording}")
+            _run_job_process(recording, model_name, manifest_path, log_path)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(run, recording, model_name): (recording, model_name)
+                       for recording, model_name in jobs}
+            for future in as_completed(futures):
+                recording, model_name = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    queue.set_state(recording, model_name, "failed", error=str(e))
+                    print(f"FAILED {model_name} on {recording}: {e}")
+                else:
+                    queue.set_state(recording, model_name, "done")
+                    print(f"Finished {model_name} on {recording}")
+
+        for recording, model_name, error, log_path in queue.failed_jobs():
+            print(f"Failed: {model_name} on {recording} ({error}), see {log_path}")
+        return queue.summary()
+    finally:
+        queue.close()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Run every model of a manifest on many recordings, resuming where an interrupted batch left off."
+    )
+    parser.add_argument("recordings", type=Path, nargs="*", help="recording folders (full_recording or clips/<clip>)")
+    parser.add_argument("-m", "--manifest", type=Path, required=True, help="model manifest json, see ModelManifest")
+    parser.add_argument("-d", "--database", type=Path, default=None,
+                        help=f"job state database (default: {DEFAULT_DATABASE_NAME} next to the manifest)")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="jobs run at the same time")
+    parser.add_argument("--skip-failed", action="store_true", help="don't retry jobs that failed in an earlier run")
+    parser.add_argument("--rerun-done", action="store_true", help="run jobs that already completed again")
+    parser.add_argument("--status", action="store_true", help="print the job states and exit")
+    parser.add_argument("--run-job", nargs=2, metavar=("RECORDING", "MODEL"), help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    if args.run_job is not None:
+        recording, model_name = args.run_job
+        run_job(recording, ModelManifest.load(args.manifest).get_model(model_name))
+        sys.exit(0)
+
+    database_path = args.database or args.manifest.parent / DEFAULT_DATABASE_NAME
+    if args.status:
+        job_queue = JobQueue(database_path)
+        print(json.dumps(job_queue.summary(), indent=2))
+        for recording, model_name, error, log_path in job_queue.failed_jobs():
+            print(f"Failed: {model_name} on {recording} ({error}), see {log_path}")
+        job_queue.close()
+        sys.exit(0)
+
+    missing_recordings = [recording for recording in args.recordings if not recording.is_dir()]
+    if missing_recordings:
+        print(f"Error: recording folders do not exist: {missing_recordings}")
+        sys.exit(1)
+    if not args.recordings:
+        print("Error: no recording folders given")
+        sys.exit(1)
+
+    summary = run_batch(
+        recordings=args.recordings,
+        manifest_path=args.manifest.resolve(),
+        database_path=database_path,
+        workers=args.workers,
+        retry_failed=not args.skip_failed,
+        rerun_done=args.rerun_done,
+    )
+    print(f"Jobs: {summary}")
+    sys.exit(1 if summary.get("failed") else 0)
@@ -0,0 +1,45 @@
+import argparse
+import logging
+
+from skellyclicker.core.deeplabcut_handler.inference_client import (
+    INFERENCE_SERVER_ENV_VAR,
+    USE_INFERENCE_SERVER_ENV_VAR,
+    InferenceClient,
+    get_server_address,
+)
+from skellyclicker.core.deeplabcut_handler.inference_server import InferenceServer
+from skellyclicker.core.deeplabcut_handler.runner_cache import DEFAULT_MAX_MODEL_MEMORY_BYTES
+
+logging.getLogger('PIL').setLevel(logging.WARNING)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Keep DeepLabCut models loaded between analysis jobs. The UI and process_recording submit "
+                    f"their jobs to this server while it runs if ${USE_INFERENCE_SERVER_ENV_VAR} is set to 1."
+    )
+    parser.add_argument("address", nargs="?", default=None,
+                        help=f"Unix socket path or localhost host:port (default: ${INFERENCE_SERVER_ENV_VAR} "
+                             f"or {get_server_address()})")
+    parser.add_argument("--max-model-memory-gb", type=float, default=DEFAULT_MAX_MODEL_MEMORY_BYTES / 1e9,
+                        help="unload least recently used models above this estimated memory use")
+    parser.add_argument("--stop", action="store_true", help="shut down the server running at the address")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args()
+
+    if args.stop:
+        client = InferenceClient.connect(args.address)
+        if client is None:
+            print(f"No inference server running at {args.address or get_server_address()}")
+        else:
+            client.shutdown()
+            print(f"Stopped the inference server at {client.address}")
+    else:
+        InferenceServer(
+            address=args.address,
+            max_model_memory_bytes=int(args.max_model_memory_gb * 1e9),
+        ).serve_forever()
@@ -111,14 +111,14 @@ class SkellyClickerUIController:
     def load_machine_labels_csv(self) -> None:
         machine_labels_file = filedialog.askopenfilename(
             title="Select Machine Labels CSV File",
-            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
+            filetypes=[("Machine labels", "*.csv *.h5"), ("All files", "*.*")],
             initialdir="/home/scholl-lab/ferret_recordings"
         )
         if (
             machine_labels_file
             and Path(machine_labels_file).exists()
             and Path(machine_labels_file).is_file()
-            and Path(machine_labels_file).suffix == ".csv"
+            and Path(machine_labels_file).suffix in (".csv", ".h5")
         ):
             self.ui_model.machine_labels_path = machine_labels_file
             print(f"Machine labels CSV loaded from: {machine_labels_file}")
@@ -161,16 +161,24 @@ class SkellyClickerUIController:
                 self.video_viewer.stop()
                 print("Previous video viewer stopped")
 
+            # the loaded project's skeleton, labels csvs don't store connections themselves
+            connections = None
+            if self.deeplabcut_handler is not None and self.deeplabcut_handler.connections:
+                connections = [connection.as_tuple for connection in self.deeplabcut_handler.connections]
             if self.ui_model.csv_saved_path:
                 self.video_viewer = VideoViewer.from_videos(
                     video_paths=self.ui_model.video_files,
                     data_handler_path=self.ui_model.csv_saved_path,
                     machine_labels_path=self.ui_model.machine_labels_path,
+                    machine_labels_likelihood_threshold=self.ui_model.machine_labels_likelihood_threshold,
+                    connections=connections,
                 )
             else:
                 self.video_viewer = VideoViewer.from_videos(
                     video_paths=self.ui_model.video_files,
                     machine_labels_path=self.ui_model.machine_labels_path,
+                    machine_labels_likelihood_threshold=self.ui_model.machine_labels_likelihood_threshold,
+                    connections=connections,
                 )
             self.ui_model.tracked_point_names = (
                 self.video_viewer.video_handler.data_handler.config.tracked_point_names
@@ -191,6 +199,10 @@ class SkellyClickerUIController:
                 "Confirm your choice: Click 'yes' to prevent data loss or 'no' to discard the labeled data:",
             )
         save_path = self.video_viewer.video_handler.close(save_data=save_data)
+        machine_labels_handler = self.video_viewer.video_handler.machine_labels_handler
+        if machine_labels_handler is not None and machine_labels_handler.likelihoods is not None:
+            # keep the threshold chosen in the viewer for the next session
+            self.ui_model.machine_labels_likelihood_threshold = machine_labels_handler.likelihood_threshold
 
         if save_data and save_path:
             self.ui_model.csv_saved_path = save_path
@@ -229,6 +241,8 @@ class SkellyClickerUIController:
             save_epochs=self.ui_model.training_save_epochs,
             batch_size=self.ui_model.training_batch_size,
             hflip_augmentation=self.ui_model.hflip_augmentation,
+            warm_start=self.ui_model.warm_start_training,
+            early_stopping=self.ui_model.early_stopping_training,
         )
         self.deeplabcut_handler.train_model(
             labels_csv_path=self.ui_model.csv_saved_path,
@@ -426,6 +440,14 @@ class SkellyClickerUIController:
         self.ui_model.filter_predictions = self.ui_view.deeplabcut_filter_predictions_var.get()
         print(f"Filter predictions set to: {self.ui_model.filter_predictions}")
 
+    def on_warm_start_training_toggle(self) -> None:
+        self.ui_model.warm_start_training = self.ui_view.deeplabcut_warm_start_var.get()
+        print(f"Warm start training set to: {self.ui_model.warm_start_training}")
+
+    def on_early_stopping_training_toggle(self) -> None:
+        self.ui_model.early_stopping_training = self.ui_view.deeplabcut_early_stopping_var.get()
+        print(f"Early stopping set to: {self.ui_model.early_stopping_training}")
+
     def on_training_epochs_change(self) -> None:
         try:
             training_epochs = int(self.ui_view.deeplabcut_epochs_var.get())
@@ -1,11 +1,14 @@
 from typing import List
 from pydantic import BaseModel
 
+from skellyclicker import DEFAULT_LIKELIHOOD_THRESHOLD
+
 
 class SkellyClickerUIModel(BaseModel):
     session_saved_path: str | None = None
     csv_saved_path: str | None = None
     machine_labels_path: str | None = None
+    machine_labels_likelihood_threshold: float = DEFAULT_LIKELIHOOD_THRESHOLD  # hide machine labels below this
     is_playing: bool = False
     project_path: str | None = None
     video_files: List[str] | None = None
@@ -24,4 +27,6 @@ class SkellyClickerUIModel(BaseModel):
     training_batch_size: int = 1
     filter_predictions: bool = False
     hflip_augmentation: bool = False
+    warm_start_training: bool = False
+    early_stopping_training: bool = False
     
@@ -73,6 +73,10 @@ class SkellyClickerUIView:
     annotate_videos_checkbox: tk.Checkbutton = None
     deeplabcut_filter_predictions_var: tk.BooleanVar = field(default_factory=tk.BooleanVar)
     deeplabcut_filter_predictions_checkbox: tk.Checkbutton = None
+    deeplabcut_warm_start_var: tk.BooleanVar = field(default_factory=tk.BooleanVar)
+    deeplabcut_warm_start_checkbox: tk.Checkbutton = None
+    deeplabcut_early_stopping_var: tk.BooleanVar = field(default_factory=tk.BooleanVar)
+    deeplabcut_early_stopping_checkbox: tk.Checkbutton = None
 
     deeplabcut_options_frame: tk.Frame = None
     current_iteration_var: tk.StringVar = field(default_factory=lambda: tk.StringVar(value="None"))
@@ -237,6 +241,12 @@ class SkellyClickerUIView:
         self.deeplabcut_filter_predictions_checkbox = tk.Checkbutton(self.deeplabcut_options_frame, text="Filter Predictions", variable=self.deeplabcut_filter_predictions_var)
         self.deeplabcut_filter_predictions_checkbox.pack(side=tk.LEFT, padx=5)
 
+        self.deeplabcut_warm_start_checkbox = tk.Checkbutton(self.deeplabcut_options_frame, text="Warm Start Training", variable=self.deeplabcut_warm_start_var)
+        self.deeplabcut_warm_start_checkbox.pack(side=tk.LEFT, padx=5)
+
+        self.deeplabcut_early_stopping_checkbox = tk.Checkbutton(self.deeplabcut_options_frame, text="Early Stopping", variable=self.deeplabcut_early_stopping_var)
+        self.deeplabcut_early_stopping_checkbox.pack(side=tk.LEFT, padx=5)
+
         self.current_iteration_header_label = tk.Label(self.deeplabcut_options_frame, text="Current Iteration:")
         self.current_iteration_header_label.pack(side=tk.LEFT, padx=5)
         self.current_iteration_header_label.pack(fill=tk.X)
@@ -49,6 +49,8 @@ class SkellyClickerUi:
         ui_view.analyze_videos_button.config(command=ui_controller.analyze_videos)
         ui_view.annotate_videos_checkbox.config(command=ui_controller.on_annotate_videos_toggle)
         ui_view.deeplabcut_filter_predictions_checkbox.config(command=ui_controller.on_filter_predictions_toggle)
+        ui_view.deeplabcut_warm_start_checkbox.config(command=ui_controller.on_warm_start_training_toggle)
+        ui_view.deeplabcut_early_stopping_checkbox.config(command=ui_controller.on_early_stopping_training_toggle)
         ui_view.deeplabcut_epochs_spinbox.config(command=ui_controller.on_training_epochs_change)
         ui_view.deeplabcut_save_epochs_spinbox.config(command=ui_controller.on_training_save_epochs_change)
         ui_view.deeplabcut_batch_size_spinbox.config(command=ui_controller.on_training_batch_size_change)
@@ -0,0 +1,65 @@
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+BODYPARTS = ["nose", "tail"]
+FRAME_SIZE = (64, 48)  # width, height
+
+
+@pytest.fixture(scope="session")
+def pose_runner_settings(tmp_path_factory) -> dict:
+    """Runner settings of a randomly initialized single animal ResNet-50 model, saved as a snapshot."""
+    pytest.importorskip("deeplabcut")
+    import torch
+    from deeplabcut.pose_estimation_pytorch.config.make_pose_config import make_pytorch_pose_config
+    from deeplabcut.pose_estimation_pytorch.models import PoseModel
+
+    model_folder = tmp_path_factory.mktemp("model")
+    project_config = {
+        "Task": "test",
+        "scorer": "tester",
+        "date": "Jan1",
+        "project_path": str(model_folder),
+        "multianimalproject": False,
+        "bodyparts": BODYPARTS,
+        "uniquebodyparts": [],
+        "multianimalbodyparts": [],
+        "individuals": ["animal"],
+        "identity": None,
+        "skeleton": [],
+    }
+    model_cfg = make_pytorch_pose_config(project_config, model_folder / "pytorch_config.yaml", net_type="resnet_50")
+    model_cfg["model"]["backbone"]["pretrained"] = False
+    model_cfg["device"] = "cpu"
+
+    torch.manual_seed(0)
+    snapshot_path = model_folder / "snapshot-001.pt"
+    torch.save({"model": PoseModel.build(model_cfg["model"]).state_dict()}, snapshot_path)
+    return dict(
+        model_cfg=model_cfg,
+        snapshot_path=snapshot_path,
+        max_individuals=1,
+        batch_size=4,
+        transform=None,
+        dynamic=None,
+        detector_snapshot_path=None,
+        detector_batch_size=None,
+    )
+
+
+@pytest.fixture
+def sample_frames() -> list[np.ndarray]:
+    random_state = np.random.RandomState(0)
+    return [random_state.randint(0, 255, (FRAME_SIZE[1], FRAME_SIZE[0], 3), dtype=np.uint8) for _ in range(8)]
+
+
+@pytest.fixture
+def sample_video(tmp_path, sample_frames) -> Path:
+    video_path = tmp_path / "sample.mp4"
+    writer = cv2.VideoWriter(str(video_path), cv2.VideoWriter_fourcc(*"mp4v"), 30, FRAME_SIZE)
+    for frame in sample_frames:
+        writer.write(frame)
+    writer.release()
+    return video_path
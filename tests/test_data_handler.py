@@ -0,0 +1,162 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from skellyclicker.core.click_data_handler.data_handler import (
+    SKELLYCLICKER_METADATA_FILE_NAME,
+    DataHandler,
+    load_connections_from_json,
+)
+
+
+@pytest.fixture
+def labels_csv(tmp_path):
+    """Human labels of two points on two videos, clicked on frames 0 and 4 of 6."""
+    rows = []
+    for video in ("cam0", "cam1"):
+        for frame in range(6):
+            clicked = frame in (0, 4)
+            rows.append(
+                {
+                    "video": video,
+                    "frame": frame,
+                    "nose_x": 10.0 + frame if clicked else np.nan,
+                    "nose_y": 20.0 if clicked else np.nan,
+                    "tail_x": 30.0 if clicked else np.nan,
+                    "tail_y": 40.0 + 2 * frame if clicked else np.nan,
+                }
+            )
+    labels_path = tmp_path / "labels.csv"
+    pd.DataFrame(rows).to_csv(labels_path, index=False)
+    return labels_path
+
+
+def test_labels_csv_uses_given_connections(labels_csv):
+    data_handler = DataHandler.from_csv(labels_csv, connections=[("nose", "tail")])
+
+    assert data_handler.config.connections == [("nose", "tail")]
+
+
+def test_labels_csv_reads_connections_from_metadata_next_to_it(labels_csv):
+    metadata = {"connections": [{"parent": "nose", "child": "tail"}]}
+    (labels_csv.parent / SKELLYCLICKER_METADATA_FILE_NAME).write_text(json.dumps(metadata))
+
+    data_handler = DataHandler.from_csv(labels_csv)
+
+    assert data_handler.config.connections == [("nose", "tail")]
+
+
+def test_labels_csv_without_metadata_has_no_connections(labels_csv):
+    assert DataHandler.from_csv(labels_csv).config.connections == []
+
+
+def test_load_connections_from_tracked_points_json(tmp_path):
+    json_path = tmp_path / "tracked_points.json"
+    json_path.write_text(json.dumps({"tracked_point_names": ["nose", "tail"], "connections": [["nose", "tail"]]}))
+
+    assert load_connections_from_json(json_path) == [("nose", "tail")]
+    assert load_connections_from_json(tmp_path / "missing.json") == []
+
+
+@pytest.fixture
+def machine_labels_csv(tmp_path):
+    """Machine labels on every frame of both videos, the tail is confident only on odd frames."""
+    rows = []
+    for video in ("cam0", "cam1"):
+        for frame in range(6):
+            rows.append(
+                {
+                    "video": video,
+                    "frame": frame,
+                    "nose_x": 100.0 + frame,
+                    "nose_y": 200.0,
+                    "nose_likelihood": 0.9,
+                    "tail_x": 300.0,
+                    "tail_y": 400.0 + frame,
+                    "tail_likelihood": 0.9 if frame % 2 else 0.1,
+                }
+            )
+    labels_path = tmp_path / "machine_labels.csv"
+    pd.DataFrame(rows).to_csv(labels_path, index=False)
+    return labels_path
+
+
+def test_interpolate_labels_fills_gaps_between_keyframes(labels_csv):
+    data_handler = DataHandler.from_csv(labels_csv)
+
+    points_filled = data_handler.interpolate_labels(method="linear")
+
+    # frames 1-3 of 2 points on 2 videos, frame 5 has no keyframe after it
+    assert points_filled == 3 * 2 * 2
+    cam0 = data_handler.dataframe.loc["cam0"]
+    np.testing.assert_allclose(cam0.loc[0:4, "nose_x"], [10, 11, 12, 13, 14])
+    np.testing.assert_allclose(cam0.loc[0:4, "tail_y"], [40, 42, 44, 46, 48])
+    assert np.isnan(cam0.loc[5, "nose_x"])
+    assert data_handler.get_interpolated_points(video_index=0, frame_number=2) == {"nose", "tail"}
+    assert data_handler.get_interpolated_points(video_index=0, frame_number=4) == set()
+
+
+def test_interpolate_labels_skips_gaps_over_max_gap(labels_csv):
+    data_handler = DataHandler.from_csv(labels_csv)
+
+    assert data_handler.interpolate_labels(max_gap=2) == 0
+    assert data_handler.dataframe["nose_x"].isna().sum() == 2 * 4
+
+
+def test_undo_restores_labels_and_interpolated_flags(labels_csv):
+    data_handler = DataHandler.from_csv(labels_csv)
+    original = data_handler.dataframe.copy()
+    data_handler.interpolate_labels()
+
+    assert data_handler.undo_last_edit()
+
+    pd.testing.assert_frame_equal(data_handler.dataframe, original)
+    assert data_handler.get_interpolated_points(video_index=0, frame_number=2) == set()
+    assert not data_handler.undo_last_edit()
+
+
+def test_interpolated_flags_are_saved_next_to_the_labels(labels_csv, tmp_path):
+    data_handler = DataHandler.from_csv(labels_csv)
+    data_handler.interpolate_labels()
+    saved_path = tmp_path / "saved_labels.csv"
+
+    data_handler.save_csv(saved_path)
+
+    reloaded = DataHandler.from_csv(saved_path)
+    assert reloaded.get_interpolated_points(video_index=1, frame_number=3) == {"nose", "tail"}
+    assert reloaded.get_interpolated_points(video_index=1, frame_number=0) == set()
+
+
+def test_adopt_labels_copies_confident_machine_labels(labels_csv, machine_labels_csv):
+    data_handler = DataHandler.from_csv(labels_csv)
+    machine_labels = DataHandler.from_csv(machine_labels_csv, likelihood_threshold=0.0)
+
+    points_copied = data_handler.adopt_labels(
+        machine_labels, frame_numbers=range(1, 4), video_indices=[0], likelihood_threshold=0.5
+    )
+
+    # the nose on frames 1-3, the tail only on frames 1 and 3
+    assert points_copied == 3 + 2
+    cam0 = data_handler.dataframe.loc["cam0"]
+    np.testing.assert_allclose(cam0.loc[1:3, "nose_x"], [101, 102, 103])
+    np.testing.assert_allclose(cam0.loc[1:3, "tail_y"], [401, np.nan, 403])
+    assert data_handler.dataframe.loc["cam1"].loc[1:3].isna().all().all()
+
+
+def test_adopt_labels_can_be_undone(labels_csv, machine_labels_csv):
+    data_handler = DataHandler.from_csv(labels_csv)
+    original = data_handler.dataframe.copy()
+
+    data_handler.adopt_labels(DataHandler.from_csv(machine_labels_csv), frame_numbers=range(6))
+    data_handler.undo_last_edit()
+
+    pd.testing.assert_frame_equal(data_handler.dataframe, original)
+
+
+def test_nonempty_frames_include_frames_with_only_the_first_point(labels_csv):
+    data_handler = DataHandler.from_csv(labels_csv)
+    data_handler.dataframe.loc[("cam1", 2), ["nose_x", "nose_y"]] = [1.0, 2.0]
+
+    assert data_handler.get_nonempty_frames() == [0, 2, 4]
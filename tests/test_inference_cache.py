@@ -0,0 +1,108 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from skellyclicker.core.deeplabcut_handler.file_fingerprints import fingerprint_file, hash_settings
+from skellyclicker.core.deeplabcut_handler.inference_cache import InferenceCache
+
+OUTPUT_PREFIX = "videoDLC_scorer"
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    snapshot_path = tmp_path / "snapshot-100.pt"
+    snapshot_path.write_bytes(b"model weights")
+    return snapshot_path
+
+
+@pytest.fixture
+def video(tmp_path):
+    video_path = tmp_path / "videos" / "cam0.mp4"
+    video_path.parent.mkdir()
+    video_path.write_bytes(b"video frames")
+    return video_path
+
+
+def write_outputs(output_path: Path, contents: bytes = b"predictions") -> None:
+    output_path.mkdir(parents=True, exist_ok=True)
+    for suffix in (".h5", ".csv", "_full.pickle", "_meta.pickle"):
+        (output_path / f"{OUTPUT_PREFIX}{suffix}").write_bytes(contents + suffix.encode())
+
+
+def test_hash_settings_is_independent_of_key_order():
+    assert hash_settings({"batch_size": 8, "device": "cpu"}) == hash_settings({"device": "cpu", "batch_size": 8})
+    assert hash_settings({"batch_size": 8}) != hash_settings({"batch_size": 16})
+    with pytest.raises(TypeError):
+        hash_settings({"transform": object()})
+
+
+def test_fingerprint_follows_content_not_name(video):
+    renamed = video.with_name("renamed.mp4")
+    renamed.write_bytes(video.read_bytes())
+    fingerprint = fingerprint_file(video)
+
+    assert fingerprint_file(renamed) == fingerprint
+    video.write_bytes(b"re-encoded frames")
+    assert fingerprint_file(video) != fingerprint
+
+
+def test_stored_outputs_are_restored_for_the_same_video(tmp_path, snapshot, video):
+    cache = InferenceCache.create(tmp_path / "cache", [snapshot], {"batch_size": 8})
+    assert not cache.restore(video, tmp_path / "output", OUTPUT_PREFIX)
+    write_outputs(tmp_path / "first_run")
+    cache.store(video, tmp_path / "first_run", OUTPUT_PREFIX)
+
+    assert cache.restore(video, tmp_path / "output", "renamedDLC_scorer")
+
+    restored = sorted(path.name for path in (tmp_path / "output").iterdir())
+    # the _meta.pickle describes the run, it is not cached
+    assert restored == ["renamedDLC_scorer.csv", "renamedDLC_scorer.h5", "renamedDLC_scorer_full.pickle"]
+    assert (tmp_path / "output" / "renamedDLC_scorer.h5").read_bytes() == b"predictions.h5"
+
+
+@pytest.mark.parametrize("changed", ["video", "snapshot", "settings"])
+def test_changed_video_model_or_settings_miss(tmp_path, snapshot, video, changed):
+    cache = InferenceCache.create(tmp_path / "cache", [snapshot], {"batch_size": 8})
+    write_outputs(tmp_path / "first_run")
+    cache.store(video, tmp_path / "first_run", OUTPUT_PREFIX)
+
+    settings = {"batch_size": 8}
+    if changed == "video":
+        video.write_bytes(b"re-encoded frames")
+    elif changed == "snapshot":
+        snapshot.write_bytes(b"retrained weights")
+    else:
+        settings = {"batch_size": 16}
+    cache = InferenceCache.create(tmp_path / "cache", [snapshot], settings)
+
+    assert not cache.restore(video, tmp_path / "output", OUTPUT_PREFIX)
+    assert not (tmp_path / "output").exists()
+
+
+def test_missing_outputs_are_not_cached(tmp_path, snapshot, video):
+    cache = InferenceCache.create(tmp_path / "cache", [snapshot], {})
+
+    cache.store(video, tmp_path / "empty_run", OUTPUT_PREFIX)
+
+    assert not cache.entry_folder(video).exists()
+
+
+def test_prune_deletes_least_recently_used_entries(tmp_path, snapshot):
+    cache = InferenceCache.create(tmp_path / "cache", [snapshot], {})
+    videos = []
+    for index in range(3):
+        video = tmp_path / f"cam{index}.mp4"
+        video.write_bytes(f"video {index}".encode())
+        write_outputs(tmp_path / f"run{index}")
+        cache.store(video, tmp_path / f"run{index}", OUTPUT_PREFIX)
+        os.utime(cache.entry_folder(video), (index, index))
+        videos.append(video)
+    entry_size = sum(path.stat().st_size for path in cache.entry_folder(videos[0]).iterdir())
+    # using the oldest entry makes the second one the least recently used
+    cache.restore(videos[0], tmp_path / "output", OUTPUT_PREFIX)
+    cache.max_size_bytes = 2 * entry_size
+
+    assert cache.prune() == 1
+
+    assert [cache.entry_folder(video).exists() for video in videos] == [True, False, True]
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from skellyclicker.core.deeplabcut_handler.inference_checkpoints import (
+    InferenceProgress,
+    append_chunk,
+    get_checkpoint_paths,
+    read_chunk_file,
+    start_or_resume_progress,
+    write_chunked_predictions,
+)
+
+BODYPARTS = ["nose", "tail"]
+OUTPUT_PREFIX = "videoDLC_scorer"
+
+
+@pytest.fixture
+def video(tmp_path):
+    video_path = tmp_path / "video.mp4"
+    video_path.write_bytes(b"not really a video")
+    return video_path
+
+
+def make_chunk(start: int, num_frames: int) -> np.ndarray:
+    frames = np.arange(start, start + num_frames, dtype=np.float32)
+    return np.broadcast_to(frames[:, None, None], (num_frames, len(BODYPARTS), 3)).copy()
+
+
+def start(video, output_path, num_frames=10, dlc_scorer="DLC_scorer", snapshot_hash="snapshot", restart=False):
+    return start_or_resume_progress(
+        video, dlc_scorer, snapshot_hash, BODYPARTS, num_frames, output_path, OUTPUT_PREFIX, restart=restart
+    )
+
+
+def test_appended_chunks_are_checkpointed(video, tmp_path):
+    progress = start(video, tmp_path)
+
+    append_chunk(make_chunk(0, 4), progress, tmp_path, OUTPUT_PREFIX)
+    append_chunk(make_chunk(4, 3), progress, tmp_path, OUTPUT_PREFIX)
+
+    chunk_path, progress_path = get_checkpoint_paths(tmp_path, OUTPUT_PREFIX)
+    assert InferenceProgress.load(progress_path).completed_frames == 7
+    np.testing.assert_array_equal(read_chunk_file(chunk_path, len(BODYPARTS)), make_chunk(0, 7))
+
+
+def test_resume_continues_after_the_saved_frames(video, tmp_path):
+    append_chunk(make_chunk(0, 4), start(video, tmp_path), tmp_path, OUTPUT_PREFIX)
+
+    progress = start(video, tmp_path)
+
+    assert progress.completed_frames == 4
+    append_chunk(make_chunk(4, 6), progress, tmp_path, OUTPUT_PREFIX)
+    chunk_path, _ = get_checkpoint_paths(tmp_path, OUTPUT_PREFIX)
+    np.testing.assert_array_equal(read_chunk_file(chunk_path, len(BODYPARTS)), make_chunk(0, 10))
+
+
+def test_resume_truncates_a_chunk_written_after_the_last_checkpoint(video, tmp_path):
+    append_chunk(make_chunk(0, 4), start(video, tmp_path), tmp_path, OUTPUT_PREFIX)
+    chunk_path, _ = get_checkpoint_paths(tmp_path, OUTPUT_PREFIX)
+    # a chunk flushed before the process died, without its progress saved
+    with open(chunk_path, "ab") as chunk_file:
+        make_chunk(4, 2).tofile(chunk_file)
+
+    progress = start(video, tmp_path)
+
+    assert progress.completed_frames == 4
+    assert len(read_chunk_file(chunk_path, len(BODYPARTS))) == 4
+
+
+@pytest.mark.parametrize("changed", ["video", "scorer", "snapshot", "num_frames", "restart"])
+def test_progress_for_another_video_or_model_or_a_restart_starts_over(video, tmp_path, changed):
+    append_chunk(make_chunk(0, 4), start(video, tmp_path), tmp_path, OUTPUT_PREFIX)
+    if changed == "video":
+        video.write_bytes(b"a re-encoded video")
+
+    progress = start(
+        video,
+        tmp_path,
+        num_frames=20 if changed == "num_frames" else 10,
+        dlc_scorer="DLC_retrained" if changed == "scorer" else "DLC_scorer",
+        # retraining to the same number of epochs keeps the scorer name, only the snapshot contents change
+        snapshot_hash="retrained snapshot" if changed == "snapshot" else "snapshot",
+        restart=changed == "restart",
+    )
+
+    assert progress.completed_frames == 0
+    chunk_path, _ = get_checkpoint_paths(tmp_path, OUTPUT_PREFIX)
+    assert chunk_path.stat().st_size == 0
+
+
+def test_write_chunked_predictions_writes_dlc_outputs(video, tmp_path):
+    progress = start(video, tmp_path)
+    append_chunk(make_chunk(0, 10), progress, tmp_path, OUTPUT_PREFIX)
+
+    output_h5 = write_chunked_predictions(progress, tmp_path, OUTPUT_PREFIX, save_as_csv=True, rows_per_write=3)
+
+    chunk_path, progress_path = get_checkpoint_paths(tmp_path, OUTPUT_PREFIX)
+    assert not chunk_path.exists()
+    assert InferenceProgress.load(progress_path).complete
+    predictions = pd.read_hdf(output_h5, "df_with_missing")
+    assert list(predictions.index) == list(range(10))
+    assert predictions.columns.get_level_values("bodyparts").unique().tolist() == BODYPARTS
+    np.testing.assert_array_equal(predictions[("DLC_scorer", "tail", "y")], np.arange(10))
+    csv_predictions = pd.read_csv(output_h5.with_suffix(".csv"), header=[0, 1, 2], index_col=0)
+    np.testing.assert_allclose(csv_predictions.to_numpy(), predictions.to_numpy())
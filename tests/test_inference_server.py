@@ -0,0 +1,89 @@
+import os
+
+import pytest
+
+pytest.importorskip("deeplabcut")
+
+from skellyclicker.core.deeplabcut_handler import inference_server
+from skellyclicker.core.deeplabcut_handler.inference_client import (
+    USE_INFERENCE_SERVER_ENV_VAR,
+    InferenceClient,
+    is_inference_server_requested,
+)
+from skellyclicker.core.deeplabcut_handler.inference_server import _MessageWriter
+from skellyclicker.core.deeplabcut_handler.runner_cache import InferenceRunnerCache
+
+
+def test_message_writer_sends_lines_as_logs():
+    messages = []
+    writer = _MessageWriter(messages.append)
+
+    writer.write("first line\nsecond ")
+    writer.write("line\n\n")
+    writer.write("unfinished")
+    writer.flush()
+
+    assert messages == [
+        {"type": "log", "message": "first line"},
+        {"type": "log", "message": "second line"},
+        {"type": "log", "message": "unfinished"},
+    ]
+
+
+def test_message_writer_throttles_progress_redraws(monkeypatch):
+    messages = []
+    writer = _MessageWriter(messages.append)
+    monkeypatch.setattr(inference_server.time, "monotonic", lambda: 100.0)
+
+    # tqdm redraws its bar after a carriage return and ends with a newline on close
+    for step in range(100):
+        writer.write(f"\r{step}%")
+    writer.write("\r100%\n")
+
+    assert messages == [{"type": "progress", "message": "0%"}, {"type": "log", "message": "100%"}]
+
+
+def test_inference_server_is_opt_in(monkeypatch):
+    monkeypatch.delenv(USE_INFERENCE_SERVER_ENV_VAR, raising=False)
+    assert not is_inference_server_requested()
+
+    monkeypatch.setenv(USE_INFERENCE_SERVER_ENV_VAR, "1")
+    assert is_inference_server_requested()
+
+
+def test_client_sends_resolved_paths(monkeypatch, tmp_path):
+    requests = []
+
+    def fake_request(self, request, timeout=None):
+        requests.append(request)
+        yield {"type": "done", "csv_path": "labels.csv"}
+
+    monkeypatch.setattr(InferenceClient, "_request", fake_request)
+    monkeypatch.chdir(tmp_path)
+
+    InferenceClient("unused.sock").analyze("project/config.yaml", ["videos/cam0.mp4"], "output")
+
+    assert requests[0]["project_config_path"] == str(tmp_path / "project" / "config.yaml")
+    assert requests[0]["video_paths"] == [str(tmp_path / "videos" / "cam0.mp4")]
+    assert requests[0]["output_folder"] == str(tmp_path / "output")
+
+
+def test_runner_cache_prepares_backend_once_per_snapshot(tmp_path):
+    snapshot_path = tmp_path / "snapshot-001.pt"
+    snapshot_path.write_bytes(b"weights")
+    cache = InferenceRunnerCache()
+    calls = []
+
+    def prepare_backend():
+        calls.append(1)
+        return "onnx", None
+
+    key_settings = {"snapshot_path": str(snapshot_path), "device": "cpu"}
+    assert cache.get_or_prepare_backend(key_settings, prepare_backend) == ("onnx", None)
+    assert cache.get_or_prepare_backend(key_settings, prepare_backend) == ("onnx", None)
+    assert len(calls) == 1
+
+    # retraining in place writes a newer snapshot
+    os.utime(snapshot_path, ns=(0, snapshot_path.stat().st_mtime_ns + 1_000_000_000))
+    cache.get_or_prepare_backend(key_settings, prepare_backend)
+    assert len(calls) == 2
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from skellyclicker.core.click_data_handler.data_handler import DataHandler
+from skellyclicker.core.deeplabcut_handler.merge_predictions import (
+    PLOT_FOLDER_NAME,
+    find_dlc_outputs,
+    merge_dlc_outputs,
+    read_dlc_predictions,
+)
+from skellyclicker.core.deeplabcut_handler.prediction_filters import PredictionFilterConfig
+
+SCORER = "DLC_Resnet50_testshuffle1_snapshot_010"
+BODYPARTS = ["nose", "tail"]
+NUM_FRAMES = 30
+
+
+def write_dlc_output(h5_path, values: np.ndarray) -> None:
+    columns = pd.MultiIndex.from_product(
+        [[SCORER], BODYPARTS, ["x", "y", "likelihood"]], names=["scorer", "bodyparts", "coords"]
+    )
+    pd.DataFrame(values.reshape(len(values), -1), columns=columns).to_hdf(
+        h5_path, key="df_with_missing", format="table", mode="w"
+    )
+
+
+def make_values(seed: int) -> np.ndarray:
+    random_state = np.random.RandomState(seed)
+    values = random_state.uniform(0, 100, (NUM_FRAMES, len(BODYPARTS), 3))
+    values[..., 2] = 0.9
+    return values
+
+
+@pytest.fixture
+def output_folder(tmp_path):
+    write_dlc_output(tmp_path / f"cam0{SCORER}.h5", make_values(0))
+    write_dlc_output(tmp_path / f"cam1{SCORER}.h5", make_values(1))
+    # left over from a run of an earlier version, which filtered with DLC's filterpredictions
+    write_dlc_output(tmp_path / f"cam0{SCORER}_filtered.h5", make_values(2))
+    write_dlc_output(tmp_path / f"cam0{SCORER}_sparse.h5", make_values(3)[:5])
+    return tmp_path
+
+
+def test_find_dlc_outputs_picks_full_or_sparse_outputs(output_folder):
+    assert [path.name for path in find_dlc_outputs(output_folder)] == [f"cam0{SCORER}.h5", f"cam1{SCORER}.h5"]
+    assert [path.name for path in find_dlc_outputs(output_folder, sparse=True)] == [f"cam0{SCORER}_sparse.h5"]
+
+
+def test_read_dlc_predictions_keeps_frames_and_values(output_folder):
+    predictions = read_dlc_predictions(output_folder / f"cam1{SCORER}.h5")
+
+    assert predictions.video_name == "cam1"
+    assert predictions.bodyparts == BODYPARTS
+    np.testing.assert_array_equal(predictions.frames, np.arange(NUM_FRAMES))
+    np.testing.assert_allclose(predictions.values, make_values(1), rtol=1e-6)
+
+
+def test_merged_csv_and_h5_hold_the_same_labels(output_folder):
+    csv_path, h5_path = output_folder / "labels.csv", output_folder / "labels.h5"
+
+    assert merge_dlc_outputs(output_folder, csv_path=csv_path, h5_path=h5_path) == 2
+
+    from_csv, from_h5 = DataHandler.from_file(csv_path), DataHandler.from_file(h5_path)
+    assert from_h5.config.video_names == ["cam0", "cam1"]
+    assert from_h5.dataframe.shape == (2 * NUM_FRAMES, 2 * len(BODYPARTS))
+    np.testing.assert_allclose(
+        from_csv.unthresholded_dataframe.to_numpy(), from_h5.unthresholded_dataframe.to_numpy(), rtol=1e-6
+    )
+
+
+def test_merge_filters_predictions(output_folder):
+    h5_path = output_folder / "labels.h5"
+
+    merge_dlc_outputs(output_folder, h5_path=h5_path, filter_config=PredictionFilterConfig(window_length=5))
+
+    merged = DataHandler.from_file(h5_path).unthresholded_dataframe.loc["cam0"]
+    assert not np.allclose(merged["nose_x"].to_numpy(), make_values(0)[:, 0, 0])
+
+
+def test_merge_plots_the_filtered_trajectories(output_folder):
+    pytest.importorskip("deeplabcut")
+    plot_config = {"pcutoff": 0.6, "colormap": "rainbow", "alphavalue": 0.7}
+
+    merge_dlc_outputs(
+        output_folder,
+        h5_path=output_folder / "labels.h5",
+        filter_config=PredictionFilterConfig(),
+        plot_config=plot_config,
+    )
+
+    for video_name in ("cam0", "cam1"):
+        plot_folder = output_folder / PLOT_FOLDER_NAME / video_name
+        assert {path.name for path in plot_folder.glob("*.png")} == {
+            "trajectory.png", "plot.png", "plot-likelihood.png", "hist.png"
+        }
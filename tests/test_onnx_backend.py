@@ -0,0 +1,78 @@
+import functools
+
+import pytest
+
+pytest.importorskip("deeplabcut")
+pytest.importorskip("onnxruntime")
+
+from skellyclicker.core.deeplabcut_handler.analyze_videos_dlc import build_inference_runners, prepare_onnx_backend
+from skellyclicker.core.deeplabcut_handler.onnx_backend import (
+    ONNX_PARITY_LIKELIHOOD_TOLERANCE,
+    ONNX_PARITY_PIXEL_TOLERANCE,
+    export_snapshot_to_onnx,
+    get_onnx_path,
+    preprocess_frames,
+    verify_onnx_parity,
+)
+
+
+def test_preprocess_frames_builds_one_batch(pose_runner_settings, sample_frames):
+    pose_runner, _ = build_inference_runners(**pose_runner_settings)
+
+    inputs = preprocess_frames(pose_runner, sample_frames[:3])
+
+    height, width = sample_frames[0].shape[:2]
+    assert tuple(inputs.shape) == (3, 3, height, width)
+
+
+def test_onnx_predictions_match_pytorch(pose_runner_settings, sample_frames):
+    torch_runner, _ = build_inference_runners(**pose_runner_settings)
+    export_snapshot_to_onnx(torch_runner, pose_runner_settings["snapshot_path"], sample_frame=sample_frames[0])
+    onnx_runner, _ = build_inference_runners(**{**pose_runner_settings, "backend": "onnx"})
+
+    pixel_difference, likelihood_difference = verify_onnx_parity(torch_runner, onnx_runner, sample_frames)
+
+    assert pixel_difference <= ONNX_PARITY_PIXEL_TOLERANCE
+    assert likelihood_difference <= ONNX_PARITY_LIKELIHOOD_TOLERANCE
+
+
+def test_prepare_onnx_backend_exports_and_uses_onnx(pose_runner_settings, sample_video):
+    backend, quantization = prepare_onnx_backend({**pose_runner_settings, "backend": "onnx"}, sample_video)
+
+    assert (backend, quantization) == ("onnx", None)
+    assert get_onnx_path(pose_runner_settings["snapshot_path"]).is_file()
+
+
+def test_prepare_onnx_backend_falls_back_to_pytorch_on_unreadable_video(pose_runner_settings, tmp_path):
+    backend, quantization = prepare_onnx_backend(
+        {**pose_runner_settings, "backend": "onnx"}, tmp_path / "missing.mp4"
+    )
+
+    assert (backend, quantization) == ("pytorch", None)
+
+
+def test_calibrated_backends_are_stored_and_found_separately(
+    pose_runner_settings, sample_frames, sample_video, tmp_path, monkeypatch
+):
+    from skellyclicker.core.deeplabcut_handler import analyze_videos_dlc
+
+    quick_calibration = functools.partial(
+        analyze_videos_dlc.calibrate_inference, candidate_batch_sizes=(1, 2), max_workers=1, num_frames=4
+    )
+    monkeypatch.setattr(analyze_videos_dlc, "calibrate_inference", quick_calibration)
+    torch_runner, _ = build_inference_runners(**pose_runner_settings)
+    export_snapshot_to_onnx(torch_runner, pose_runner_settings["snapshot_path"], sample_frame=sample_frames[0])
+    config = tmp_path / "config.yaml"
+    backend_settings = {
+        "pytorch": pose_runner_settings,
+        "onnx": {**pose_runner_settings, "backend": "onnx"},
+    }
+
+    calibrated = {
+        backend: analyze_videos_dlc.get_inference_tuning(config, runner_settings, sample_video, calibrate=True)
+        for backend, runner_settings in backend_settings.items()
+    }
+
+    assert calibrated["onnx"].model != calibrated["pytorch"].model
+    for backend, runner_settings in backend_settings.items():
+        assert analyze_videos_dlc.get_inference_tuning(config, runner_settings, sample_video) == calibrated[backend]
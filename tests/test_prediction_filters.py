@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from skellyclicker.core.deeplabcut_handler.prediction_filters import PredictionFilterConfig, filter_prediction_array
+
+
+def make_predictions(x: list[float], likelihood: list[float]) -> np.ndarray:
+    """(frames, 1 point, 3) predictions moving along x, with y fixed at 5."""
+    return np.stack([x, np.full(len(x), 5.0), likelihood], axis=-1)[:, None, :].astype(np.float32)
+
+
+def test_median_filter_removes_a_single_frame_spike():
+    values = make_predictions([0, 1, 2, 50, 4, 5, 6], [0.9] * 7)
+
+    filtered = filter_prediction_array(values, PredictionFilterConfig(window_length=3))
+
+    assert filtered.dtype == np.float32
+    assert filtered.shape == values.shape
+    np.testing.assert_allclose(filtered[:, 0, 0], [0.5, 1, 2, 4, 5, 5, 5.5])
+    np.testing.assert_allclose(filtered[:, 0, 2], values[:, 0, 2])
+
+
+def test_unconfident_points_are_interpolated_within_max_gap():
+    values = make_predictions([0, 1, 99, 99, 4, 5], [0.9, 0.9, 0.1, 0.1, 0.9, 0.9])
+    config = PredictionFilterConfig(filter_type="none", likelihood_threshold=0.5, max_gap=2,
+                                    interpolated_likelihood=0.25)
+
+    filtered = filter_prediction_array(values, config)
+
+    np.testing.assert_allclose(filtered[:, 0, 0], [0, 1, 2, 3, 4, 5])
+    np.testing.assert_allclose(filtered[:, 0, 2], [0.9, 0.9, 0.25, 0.25, 0.9, 0.9])
+
+
+@pytest.mark.parametrize(
+    "config",
+    [
+        PredictionFilterConfig(filter_type="none", likelihood_threshold=0.5, max_gap=1),
+        PredictionFilterConfig(filter_type="none", likelihood_threshold=0.5, interpolate_gaps=False),
+    ],
+)
+def test_gaps_that_cannot_be_filled_stay_missing(config):
+    values = make_predictions([0, 1, 99, 99, 4, 5], [0.9, 0.9, 0.1, 0.1, 0.9, 0.9])
+
+    filtered = filter_prediction_array(values, config)
+
+    assert np.isnan(filtered[2:4, 0, :2]).all()
+    np.testing.assert_allclose(filtered[[0, 1, 4, 5], 0, 0], [0, 1, 4, 5])
+
+
+def test_gaps_at_the_edges_are_not_extrapolated():
+    values = make_predictions([99, 1, 2, 3, 99], [0.1, 0.9, 0.9, 0.9, np.nan])
+    config = PredictionFilterConfig(filter_type="none", likelihood_threshold=0.5)
+
+    filtered = filter_prediction_array(values, config)
+
+    assert np.isnan(filtered[[0, 4], 0, 0]).all()
+
+
+def test_savgol_filter_keeps_gaps_and_smooths_around_them():
+    x = np.arange(9, dtype=float)
+    values = make_predictions(list(x), [0.9] * 9)
+    values[4, 0, :2] = np.nan
+
+    filtered = filter_prediction_array(values, PredictionFilterConfig(filter_type="savgol", window_length=5))
+
+    assert np.isnan(filtered[4, 0, :2]).all()
+    # a line is preserved by a Savitzky-Golay filter
+    np.testing.assert_allclose(np.delete(filtered[:, 0, 0], 4), np.delete(x, 4), atol=1e-5)
+
+
+def test_cameras_and_points_are_filtered_independently():
+    camera_0 = make_predictions([0, 1, 50, 3, 4], [0.9] * 5)
+    camera_1 = make_predictions([10, 11, 12, 13, 14], [0.9] * 5)
+    values = np.stack([camera_0, camera_1], axis=1)
+
+    filtered = filter_prediction_array(values, PredictionFilterConfig(window_length=3))
+
+    assert filtered.shape == values.shape
+    np.testing.assert_allclose(filtered[:, 0, 0, 0], [0.5, 1, 3, 4, 3.5])
+    np.testing.assert_allclose(filtered[:, 1, 0, 0], [10.5, 11, 12, 13, 13.5])
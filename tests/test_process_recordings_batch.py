@@ -0,0 +1,44 @@
+import pytest
+
+from skellyclicker.scripts.process_recordings_batch import JobQueue
+
+MODEL_NAMES = ["eye", "body"]
+
+
+@pytest.fixture
+def job_queue(tmp_path):
+    job_queue = JobQueue(tmp_path / "jobs.sqlite")
+    yield job_queue
+    job_queue.close()
+
+
+@pytest.fixture
+def recordings(tmp_path):
+    recordings = [tmp_path / "session_a", tmp_path / "session_b"]
+    for recording in recordings:
+        recording.mkdir()
+    return recordings
+
+
+def test_reset_only_touches_the_batch_jobs(job_queue, recordings):
+    job_queue.add_jobs(recordings, MODEL_NAMES)
+    for recording in recordings:
+        for model_name in MODEL_NAMES:
+            job_queue.set_state(str(recording.resolve()), model_name, "done")
+
+    assert job_queue.reset(recordings[:1], MODEL_NAMES, ("done",)) == 2
+
+    assert job_queue.summary() == {"done": 2, "pending": 2}
+    assert job_queue.pending_jobs(recordings, MODEL_NAMES) == [
+        (str(recordings[0].resolve()), model_name) for model_name in sorted(MODEL_NAMES)
+    ]
+
+
+def test_reset_only_touches_the_given_states(job_queue, recordings):
+    job_queue.add_jobs(recordings, MODEL_NAMES[:1])
+    job_queue.set_state(str(recordings[0].resolve()), "eye", "failed", error="crashed")
+    job_queue.set_state(str(recordings[1].resolve()), "eye", "done")
+
+    assert job_queue.reset(recordings, MODEL_NAMES, ("failed",)) == 1
+
+    assert job_queue.summary() == {"done": 1, "pending": 1}
@@ -0,0 +1,63 @@
+import cv2
+import pytest
+
+pytest.importorskip("deeplabcut")
+pytest.importorskip("onnxruntime")
+
+from skellyclicker.core.deeplabcut_handler.analyze_videos_dlc import build_inference_runners, prepare_onnx_backend
+from skellyclicker.core.deeplabcut_handler.quantization import (
+    QuantizationReport,
+    get_quantization_report_path,
+    load_labeled_frames,
+)
+
+
+@pytest.fixture
+def project_folder(tmp_path, sample_frames):
+    labeled_data_folder = tmp_path / "project" / "labeled-data" / "sample"
+    labeled_data_folder.mkdir(parents=True)
+    for frame_number, frame in enumerate(sample_frames):
+        cv2.imwrite(str(labeled_data_folder / f"img{frame_number:03d}.png"), cv2.cvtColor(frame, cv2.COLOR_RGB2BGR))
+    return tmp_path / "project"
+
+
+def test_load_labeled_frames_spreads_over_folders(project_folder, sample_frames):
+    frames = load_labeled_frames(project_folder, max_frames=4)
+
+    assert len(frames) == 4
+    assert (frames[0] == sample_frames[0]).all()
+
+
+@pytest.mark.parametrize("mode", ["dynamic", "static"])
+def test_quantized_model_runs_and_reports_its_error(pose_runner_settings, sample_video, sample_frames,
+                                                     project_folder, mode):
+    backend, quantization = prepare_onnx_backend(
+        {**pose_runner_settings, "backend": "onnx", "quantization": mode},
+        sample_video,
+        project_path=project_folder,
+    )
+
+    assert (backend, quantization) == ("onnx", mode)
+    report = QuantizationReport.model_validate_json(
+        get_quantization_report_path(pose_runner_settings["snapshot_path"], mode).read_text()
+    )
+    bodyparts = pose_runner_settings["model_cfg"]["metadata"]["bodyparts"]
+    assert report.mode == mode
+    assert set(report.bodypart_errors) == set(bodyparts)
+
+    quantized_runner, _ = build_inference_runners(
+        **{**pose_runner_settings, "backend": "onnx", "quantization": mode}
+    )
+    predictions = quantized_runner.inference(sample_frames[:2])
+    assert predictions[0]["bodyparts"].shape == (1, len(bodyparts), 3)
+
+
+def test_quantized_model_over_error_limit_is_not_used(pose_runner_settings, sample_video, project_folder):
+    backend, quantization = prepare_onnx_backend(
+        {**pose_runner_settings, "backend": "onnx", "quantization": "dynamic"},
+        sample_video,
+        project_path=project_folder,
+        max_quantized_pixel_error=-1.0,
+    )
+
+    assert (backend, quantization) == ("onnx", None)
@@ -0,0 +1,50 @@
+import pytest
+
+from skellyclicker.core.video_handler import video_export
+from skellyclicker.core.video_handler.video_export import export_annotated_video
+
+
+class FailingReleaseWriter:
+    """A writer that fails to close, like ffmpeg exiting non-zero."""
+
+    def __init__(self) -> None:
+        self.frames = []
+        self.released = False
+
+    def write(self, frame) -> None:
+        self.frames.append(frame)
+
+    def release(self) -> None:
+        self.released = True
+        raise RuntimeError("ffmpeg exited with code 1")
+
+
+class FailingOverlay:
+    def draw(self, frame, frame_number):
+        raise ValueError("render failed")
+
+
+class PassThroughOverlay:
+    def draw(self, frame, frame_number):
+        return frame
+
+
+@pytest.fixture
+def writer(monkeypatch) -> FailingReleaseWriter:
+    writer = FailingReleaseWriter()
+    monkeypatch.setattr(video_export, "create_video_writer", lambda *args, **kwargs: writer)
+    return writer
+
+
+def test_pipeline_error_is_not_replaced_by_the_writer_error(sample_video, tmp_path, writer):
+    with pytest.raises(ValueError, match="render failed"):
+        export_annotated_video(sample_video, tmp_path / "annotated.mp4", [FailingOverlay()])
+
+    assert writer.released
+
+
+def test_writer_error_is_raised_after_a_successful_pipeline(sample_video, tmp_path, writer):
+    with pytest.raises(RuntimeError, match="ffmpeg exited"):
+        export_annotated_video(sample_video, tmp_path / "annotated.mp4", [PassThroughOverlay()])
+
+    assert len(writer.frames) == 8